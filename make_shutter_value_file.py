@@ -1,6 +1,8 @@
 import argparse
+import time
 import numpy as np
 from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.detector import get_detector
 
 parser = argparse.ArgumentParser(description="Generate ShutterValue.txt file used by the MCP detector")
 parser.add_argument('--verbose', '-v', default=0, action='count',
@@ -28,6 +30,26 @@ parser.add_argument('--default_mode', '-d',
                     default=0,
                     action='count',
                     help='Generate default shutter value file')
+parser.add_argument('--detector',
+                    default='mcp',
+                    help='name of the detector (clock cycle table, time bins and limits), ex: mcp or timepix')
+parser.add_argument('--time_bin',
+                    default=None,
+                    type=float,
+                    help='time bin in micros (first time bin of the detector by default, 10.24 for the MCP)')
+parser.add_argument('--bin_lookup',
+                    default=0,
+                    action='count',
+                    help='also write the tof and lambda of every bin (ShutterValues.npy) in the output folder')
+parser.add_argument('--profile',
+                    default=0,
+                    action='count',
+                    help='write the cProfile, tracemalloc and stage timing reports in the output folder')
+parser.add_argument('--watch',
+                    default=None,
+                    help='JSON file (or folder of JSON files) of the epics_chopper_wavelength_range, '
+                         'detector_offset and source_frequency PVs. The shutter value file is regenerated each '
+                         'time they change the plan')
 
 args = parser.parse_args()
 
@@ -46,6 +68,10 @@ else:
 resonance_mode = True if args.resonance_mode else False
 default_mode = True if args.default_mode else False
 
+time_bin = args.time_bin
+if time_bin is None:
+    time_bin = get_detector(args.detector).time_bins[0]
+
 if epics_chopper_wavelength_range:
     epics_chopper_wavelength_range = epics_chopper_wavelength_range.split(",")
 else:
@@ -61,11 +87,42 @@ if list_wavelength_dead_time:
 	list_wavelength_dead_time = list_wavelength_dead_time.split(",")
 	list_wavelength_dead_time = [np.float32(_value) for _value in list_wavelength_dead_time]
 
+if args.watch:
+    from shutter_value_generator.watch import ShutterValueWatcher, FileProvider
+    initial_values = {'detector_offset': detector_offset}
+    if epics_chopper_wavelength_range:
+        initial_values['epics_chopper_wavelength_range'] = epics_chopper_wavelength_range
+    o_watcher = ShutterValueWatcher(provider=FileProvider(path=args.watch),
+                                    output_folder=output_folder,
+                                    detector_sample_distance=detector_sample_distance,
+                                    time_bin=time_bin,
+                                    list_lambda_dead_time=list_wavelength_dead_time,
+                                    initial_values=initial_values,
+                                    detector=args.detector)
+    o_watcher.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        o_watcher.stop()
+    raise SystemExit
+
 o_make = MakeShutterValueFile(output_folder=output_folder,
                               detector_sample_distance=detector_sample_distance,
                               detector_offset=detector_offset,
                               resonance_mode=resonance_mode,
                               default_mode=default_mode,
                               epics_chopper_wavelength_range=epics_chopper_wavelength_range,
+                              detector=args.detector,
+                              time_bin=time_bin,
+                              bin_lookup=True if args.bin_lookup else False,
                               verbose=verbose)
-o_make.run(list_lambda_dead_time=list_wavelength_dead_time)
+if args.profile:
+    from pathlib import Path
+    from shutter_value_generator import instrumentation
+    sink = instrumentation.enable_instrumentation(instrumentation.PrometheusTextSink())
+    instrumentation.run_with_profile(function=lambda: o_make.run(list_lambda_dead_time=list_wavelength_dead_time),
+                                     output_folder=output_folder)
+    sink.write(filename=Path(output_folder) / instrumentation.METRICS_FILE_NAME)
+else:
+    o_make.run(list_lambda_dead_time=list_wavelength_dead_time)
@@ -0,0 +1,284 @@
+import threading
+import numpy as np
+from collections import namedtuple, OrderedDict
+from functools import lru_cache
+
+from shutter_value_generator.core import make_plan_config, compute_plan, get_tof_frames, convert_lambda_to_tof
+from shutter_value_generator.core import TimeBinMicros, SourceFrequency
+from shutter_value_generator.detector import DEFAULT_DETECTOR, get_detector, get_bin_width, get_list_detectors
+from shutter_value_generator.feasibility import Feasibility
+
+try:
+	import ipywidgets as widgets
+except ImportError:
+	widgets = None
+
+DEBOUNCE_TIME = 0.15  # s - widget events closer than this trigger one recomputation
+CACHE_SIZE = 256  # number of plans kept by compute_dashboard_plan
+
+# usage in a notebook:
+#     %matplotlib widget
+#     from notebooks.planning_dashboard import PlanningDashboard
+#     PlanningDashboard().display()
+
+DashboardState = namedtuple('DashboardState', ['detector_sample_distance',
+                                               'detector_offset',
+                                               'source_frequency',
+                                               'time_bin',
+                                               'list_lambda_dead_time',
+                                               'list_wavelength_requested',
+                                               'epics_chopper_wavelength_range',
+                                               'detector'])
+
+DashboardResult = namedtuple('DashboardResult', ['shutter_values_string',
+                                                 'list_tof_frames',
+                                                 'list_number_of_bins',
+                                                 'max_bins_per_frame',
+                                                 'list_is_feasible',
+                                                 'error'])
+
+
+def parse_list_values(text=''):
+	"""
+	:param text: comma separated values, ex: '1.5, 2.5'
+	:return: tuple of floats, ValueError if one value is not a number
+	"""
+	return tuple(float(_value) for _value in text.replace(';', ',').split(',') if _value.strip())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compute_dashboard_plan(state=None):
+	"""
+	plan, bins and feasibility of the requested edges, cached on the (immutable) state
+
+	:param state: DashboardState
+	:return: DashboardResult, error holds the message when the plan can not be made
+	"""
+	try:
+		config = make_plan_config(detector_sample_distance=state.detector_sample_distance,
+		                          detector_offset=state.detector_offset,
+		                          source_frequency=state.source_frequency,
+		                          time_bin=state.time_bin,
+		                          epics_chopper_wavelength_range=state.epics_chopper_wavelength_range,
+		                          detector=state.detector)
+		plan = compute_plan(config=config, list_lambda_dead_time=state.list_lambda_dead_time)
+	except (ValueError, AttributeError) as error:
+		return DashboardResult('', (), (), 0, (), str(error))
+
+	list_tof_frames = np.array(plan.list_tof_frames, dtype=float).reshape(-1, 2)
+	o_detector = get_detector(state.detector)
+	bin_width = get_bin_width(divider=np.maximum(plan.list_divider, 0), time_bin=state.time_bin,
+	                          detector=o_detector) * 1e-6
+	list_number_of_bins = np.maximum(np.ceil((list_tof_frames[:, 1] - list_tof_frames[:, 0]) / bin_width - 1e-9), 0)
+
+	list_is_feasible = ()
+	if state.list_wavelength_requested:
+		o_feasibility = Feasibility(detector_sample_distance=state.detector_sample_distance,
+		                            detector_offset=state.detector_offset,
+		                            source_frequency=state.source_frequency,
+		                            epics_chopper_wavelength_range=state.epics_chopper_wavelength_range)
+		report = o_feasibility.run(list_wavelength_requested=state.list_wavelength_requested,
+		                           list_tof_frames=list_tof_frames)
+		list_is_feasible = tuple(bool(_is_feasible) for _is_feasible in report['is_feasible'])
+
+	return DashboardResult(shutter_values_string=plan.shutter_values_string,
+	                       list_tof_frames=tuple(map(tuple, list_tof_frames.tolist())),
+	                       list_number_of_bins=tuple(int(_number) for _number in list_number_of_bins),
+	                       max_bins_per_frame=o_detector.max_bins_per_frame,
+	                       list_is_feasible=list_is_feasible,
+	                       error=None)
+
+
+def convert_lambda_to_tof_ms(wavelength=None, state=None):
+	return convert_lambda_to_tof(list_wavelength=wavelength, detector_offset=state.detector_offset,
+	                             detector_sample_distance=state.detector_sample_distance) * 1e-3
+
+
+def make_traces(state=None, result=None):
+	"""
+	:return: {trace name: (x, y)} in ms of tof, segments of the vertical lines are separated by nan
+	"""
+	traces = OrderedDict()
+	list_tof_frames = np.array(result.list_tof_frames, dtype=float).reshape(-1, 2) * 1e3
+	x_frames = np.repeat(list_tof_frames, 2, axis=1).ravel()
+	y_frames = np.tile([0, 1, 1, 0], len(list_tof_frames)).astype(float)
+	traces['frames'] = (x_frames, y_frames)
+
+	tof_dead_time = convert_lambda_to_tof_ms(wavelength=state.list_lambda_dead_time, state=state)
+	traces['dead_times'] = (np.repeat(tof_dead_time, 3), np.tile([0, 1.1, np.nan], len(tof_dead_time)))
+
+	tof_requested = convert_lambda_to_tof_ms(wavelength=state.list_wavelength_requested, state=state)
+	is_feasible = np.array(result.list_is_feasible, dtype=bool)
+	if len(is_feasible) != len(tof_requested):
+		is_feasible = np.zeros(len(tof_requested), dtype=bool)
+	traces['feasible_edges'] = (tof_requested[is_feasible], np.full(np.count_nonzero(is_feasible), 0.5))
+	traces['infeasible_edges'] = (tof_requested[~is_feasible], np.full(np.count_nonzero(~is_feasible), 0.5))
+	return traces
+
+
+def get_changed_traces(previous_traces=None, traces=None):
+	"""
+	:return: names of the traces of traces that are not in previous_traces or have different data
+	"""
+	if previous_traces is None:
+		return list(traces.keys())
+	list_changed = []
+	for _name, (_x, _y) in traces.items():
+		if _name not in previous_traces:
+			list_changed.append(_name)
+			continue
+		_previous_x, _previous_y = previous_traces[_name]
+		if not (np.array_equal(_x, _previous_x, equal_nan=True) and np.array_equal(_y, _previous_y, equal_nan=True)):
+			list_changed.append(_name)
+	return list_changed
+
+
+def make_summary(result=None):
+	"""
+	:return: html summary of the bins per frame and of the feasibility of the requested edges
+	"""
+	if result.error is not None:
+		return "<b style='color:red'>{}</b>".format(result.error)
+	lines = ["<b>{} frames, {} bins</b>".format(len(result.list_tof_frames), sum(result.list_number_of_bins))]
+	for _index, _number_of_bins in enumerate(result.list_number_of_bins):
+		_color = 'red' if _number_of_bins > result.max_bins_per_frame else 'black'
+		lines.append("<span style='color:{}'>frame {}: {} bins</span>".format(_color, _index, _number_of_bins))
+	if result.list_is_feasible:
+		lines.append("edges measurable: {} / {}".format(sum(result.list_is_feasible), len(result.list_is_feasible)))
+	return "<br>".join(lines)
+
+
+class Debouncer:
+	"""
+	calls function once, debounce_time after the last of a burst of calls
+	"""
+
+	def __init__(self, function=None, debounce_time=DEBOUNCE_TIME):
+		self.function = function
+		self.debounce_time = debounce_time
+		self.lock = threading.Lock()
+		self.timer = None
+
+	def __call__(self, *args):
+		with self.lock:
+			if self.timer is not None:
+				self.timer.cancel()
+			self.timer = threading.Timer(self.debounce_time, self.function, args)
+			self.timer.daemon = True
+			self.timer.start()
+
+	def cancel(self):
+		with self.lock:
+			if self.timer is not None:
+				self.timer.cancel()
+
+
+class PlanningDashboard:
+
+	def __init__(self, detector_sample_distance=25, detector_offset=3000, source_frequency=SourceFrequency.sixty_hertz,
+	             time_bin=TimeBinMicros.ten_twenty_four, list_lambda_dead_time="1.5, 2.5",
+	             list_wavelength_requested="", epics_chopper_wavelength_range="0.5, 6", detector=DEFAULT_DETECTOR,
+	             debounce_time=DEBOUNCE_TIME):
+		"""
+		ipywidgets dashboard (needs ipywidgets and matplotlib, '%matplotlib widget' for live plots)
+
+		:param detector_sample_distance: in m
+		:param detector_offset: in micros
+		:param source_frequency: 60 or 30 Hz
+		:param time_bin: in micros
+		:param list_lambda_dead_time: comma separated lambda (Angstroms)
+		:param list_wavelength_requested: comma separated Bragg edges (Angstroms)
+		:param epics_chopper_wavelength_range: 'min, max' in Angstroms
+		:param detector: name of the detector
+		:param debounce_time: s between the last widget event and the recomputation
+		"""
+		if widgets is None:
+			raise ImportError("The planning dashboard needs ipywidgets (pip install ipywidgets)")
+		import matplotlib.pyplot as plt
+
+		self.detector_sample_distance = widgets.FloatSlider(value=detector_sample_distance, min=5, max=50, step=0.01,
+		                                                    description='distance (m)', continuous_update=True)
+		self.detector_offset = widgets.FloatSlider(value=detector_offset, min=0, max=20000, step=1,
+		                                           description='offset (µs)', continuous_update=True)
+		self.source_frequency = widgets.Dropdown(options=[SourceFrequency.sixty_hertz, SourceFrequency.thirty_hertz],
+		                                         value=source_frequency, description='frequency (Hz)')
+		self.detector = widgets.Dropdown(options=get_list_detectors(), value=detector, description='detector')
+		self.time_bin = widgets.Dropdown(options=list(get_detector(detector).time_bins), value=time_bin,
+		                                 description='time bin (µs)')
+		self.list_lambda_dead_time = widgets.Text(value=list_lambda_dead_time, description='dead times (Å)')
+		self.list_wavelength_requested = widgets.Text(value=list_wavelength_requested, description='edges (Å)')
+		self.epics_chopper_wavelength_range = widgets.Text(value=epics_chopper_wavelength_range,
+		                                                   description='chopper (Å)')
+		self.summary = widgets.HTML()
+		self.shutter_values = widgets.Textarea(layout=widgets.Layout(width='100%', height='120px'))
+
+		self.figure, self.axis = plt.subplots(figsize=(9, 3))
+		self.axis.set_xlabel("TOF (ms)")
+		self.axis.set_yticks([])
+		self.axis.set_ylim(0, 1.2)
+		self.lines = OrderedDict()
+		self.lines['frames'], = self.axis.plot([], [], '-', color='tab:blue', label='frames')
+		self.lines['dead_times'], = self.axis.plot([], [], '--', color='gray', label='dead times')
+		self.lines['feasible_edges'], = self.axis.plot([], [], 'o', color='tab:green', label='measurable edges')
+		self.lines['infeasible_edges'], = self.axis.plot([], [], 'x', color='tab:red', label='not measurable edges')
+		self.axis.legend(loc='upper right', fontsize='small')
+		self.traces = None
+
+		self.detector.observe(self.on_detector_change, names='value')
+		self.debouncer = Debouncer(function=self.update, debounce_time=debounce_time)
+		for _widget in self.get_list_input_widgets():
+			_widget.observe(self.debouncer, names='value')
+
+	def get_list_input_widgets(self):
+		return [self.detector_sample_distance, self.detector_offset, self.source_frequency, self.detector,
+		        self.time_bin, self.list_lambda_dead_time, self.list_wavelength_requested,
+		        self.epics_chopper_wavelength_range]
+
+	def on_detector_change(self, change=None):
+		self.time_bin.options = list(get_detector(change['new']).time_bins)
+
+	def get_state(self):
+		"""
+		:return: DashboardState of the current widget values, ValueError if a text input is not a list of numbers
+		"""
+		return DashboardState(detector_sample_distance=self.detector_sample_distance.value,
+		                      detector_offset=self.detector_offset.value,
+		                      source_frequency=self.source_frequency.value,
+		                      time_bin=self.time_bin.value,
+		                      list_lambda_dead_time=parse_list_values(self.list_lambda_dead_time.value),
+		                      list_wavelength_requested=parse_list_values(self.list_wavelength_requested.value),
+		                      epics_chopper_wavelength_range=parse_list_values(
+				                      self.epics_chopper_wavelength_range.value),
+		                      detector=self.detector.value)
+
+	def update(self, *args):
+		try:
+			state = self.get_state()
+		except ValueError as error:
+			self.summary.value = "<b style='color:red'>{}</b>".format(error)
+			return
+
+		result = compute_dashboard_plan(state=state)
+		self.summary.value = make_summary(result=result)
+		if result.error is not None:
+			return
+		self.shutter_values.value = result.shutter_values_string
+
+		# only the traces whose data changed are sent to the plot
+		traces = make_traces(state=state, result=result)
+		list_changed = get_changed_traces(previous_traces=self.traces, traces=traces)
+		for _name in list_changed:
+			self.lines[_name].set_data(*traces[_name])
+		self.traces = traces
+		if list_changed:
+			tof_frames = get_tof_frames(source_frequency=state.source_frequency)
+			self.axis.set_xlim(0, tof_frames[-1][1] * 1e3 * 1.05)
+			self.figure.canvas.draw_idle()
+
+	def display(self):
+		from IPython.display import display
+
+		self.update()
+		display(widgets.VBox([widgets.HBox([widgets.VBox(self.get_list_input_widgets()), self.summary]),
+		                      self.figure.canvas,
+		                      self.shutter_values]))
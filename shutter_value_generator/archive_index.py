@@ -0,0 +1,192 @@
+import io
+import re
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.writer import write_file_atomically
+
+SHUTTER_VALUES_FILE_PATTERN = "ShutterValues*.txt"
+SHUTTER_VALUES_FILE_NAME_REGEX = re.compile(r"ShutterValues_(\d+)_hz_(-?\d+)_micros\.txt$")
+INDEX_FINGERPRINTS_FILE_NAME = "shutter_values_index.npy"
+INDEX_METADATA_FILE_NAME = "shutter_values_index.csv"
+MAX_NUMBER_OF_FRAMES = 16  # frames kept in the fingerprint, the others are ignored
+NUMBER_OF_NEAREST_PLANS = 5
+CHUNK_SIZE = 100000  # plans compared at once
+
+FINGERPRINT_DTYPE = np.dtype([('frames', np.float64, (MAX_NUMBER_OF_FRAMES, 2)),  # [start, stop] in ms
+                              ('divider', np.int16, (MAX_NUMBER_OF_FRAMES,)),
+                              ('time_bin', np.float64)])
+
+LIST_METADATA_COLUMNS = ['file_name', 'source_frequency', 'detector_offset', 'number_of_frames', 'size', 'mtime']
+
+
+def make_fingerprint(shutter_values=None):
+	"""
+	:param shutter_values: rows [start(s), stop(s), divider, time bin]
+	:return: FINGERPRINT_DTYPE record, frames that do not exist have a start and stop of 0 and a divider of -1
+	"""
+	shutter_values = np.atleast_2d(np.asarray(shutter_values, dtype=float))[:MAX_NUMBER_OF_FRAMES]
+	number_of_frames = len(shutter_values)
+	fingerprint = np.zeros((), dtype=FINGERPRINT_DTYPE)
+	fingerprint['divider'] = -1
+	fingerprint['frames'][:number_of_frames] = shutter_values[:, 0:2] * 1e3
+	fingerprint['divider'][:number_of_frames] = shutter_values[:, 2]
+	fingerprint['time_bin'] = shutter_values[0, 3] if number_of_frames else np.nan
+	return fingerprint
+
+
+def calculate_distance(list_frames=None, frames=None):
+	"""
+	duration covered by only one of the two plans: total length of the frames of both plans minus twice the
+	length of their overlap
+
+	:param list_frames: array (plan, frame, [start, stop]) in ms of the indexed plans
+	:param frames: array (frame, [start, stop]) in ms of the plan looked for
+	:return: distance in ms to each plan
+	"""
+	list_frames = np.asarray(list_frames, dtype=float)
+	frames = np.atleast_2d(np.asarray(frames, dtype=float))
+	length = np.maximum(list_frames[..., 1] - list_frames[..., 0], 0).sum(axis=-1)
+	frames_length = np.maximum(frames[:, 1] - frames[:, 0], 0).sum()
+
+	# frames of a plan do not overlap each other, the overlap of the plans is the sum of the overlap of each pair.
+	# It is added frame by frame of the plan looked for, the arrays stay the size of list_frames
+	overlap = np.zeros(length.shape)
+	for _start, _stop in frames:
+		overlap += np.maximum(np.minimum(list_frames[..., 1], _stop) - np.maximum(list_frames[..., 0], _start),
+		                      0).sum(axis=-1)
+	return length + frames_length - 2 * overlap
+
+
+class ShutterValuesArchive:
+
+	def __init__(self, index_folder=None):
+		"""
+		:param index_folder: folder of the INDEX_FINGERPRINTS_FILE_NAME and INDEX_METADATA_FILE_NAME files
+		"""
+		if index_folder is None:
+			raise AttributeError("define the folder of the index!")
+		self.index_folder = Path(index_folder)
+		self.fingerprints = None
+		self.metadata = None
+
+	@staticmethod
+	def parse_file_name(file_name=''):
+		"""
+		:param file_name: ShutterValues_<source frequency>_hz_<detector offset>_micros.txt as created by step 3
+		:return: source frequency (Hz) and detector offset (micros), None if the name does not follow the pattern
+		"""
+		match = SHUTTER_VALUES_FILE_NAME_REGEX.search(Path(file_name).name)
+		if match is None:
+			return None, None
+		return int(match.group(1)), int(match.group(2))
+
+	@staticmethod
+	def _index_file(arguments):
+		filename, archive_folder = arguments
+		# a file that can not be read (permissions, removed during the scan, ...) is reported like a parse error
+		try:
+			shutter_values = MakeShutterValueFile.read_shutter_values_file(filename=filename)
+			if shutter_values.size == 0 or shutter_values.shape[1] != 4:
+				raise ValueError("expected 4 columns")
+			stat = filename.stat()
+		except (ValueError, OSError) as error:
+			return None, None, "{}: {}".format(filename, error)
+
+		source_frequency, detector_offset = ShutterValuesArchive.parse_file_name(filename)
+		metadata = {'file_name': str(filename.relative_to(archive_folder)),
+		            'source_frequency': source_frequency,
+		            'detector_offset': detector_offset,
+		            'number_of_frames': len(shutter_values),
+		            'size': stat.st_size,
+		            'mtime': stat.st_mtime}
+		return make_fingerprint(shutter_values=shutter_values), metadata, None
+
+	def build(self, archive_folder=None, max_workers=None):
+		"""
+		scan the archive tree for shutter value files, parsed in parallel, and write the index
+
+		:param archive_folder: root of the archive, searched recursively
+		:param max_workers: number of threads reading the files
+		:return: list of the files that could not be parsed
+		"""
+		archive_folder = Path(archive_folder)
+		list_filename = sorted(archive_folder.rglob(SHUTTER_VALUES_FILE_PATTERN))
+		with ThreadPoolExecutor(max_workers=max_workers) as executor:
+			list_results = list(executor.map(ShutterValuesArchive._index_file,
+			                                 [(_filename, archive_folder) for _filename in list_filename]))
+
+		list_fingerprints = [_fingerprint for _fingerprint, _, _error in list_results if _error is None]
+		list_metadata = [_metadata for _, _metadata, _error in list_results if _error is None]
+		list_errors = [_error for _, _, _error in list_results if _error is not None]
+
+		fingerprints = np.array(list_fingerprints, dtype=FINGERPRINT_DTYPE).reshape(-1)
+		metadata = pd.DataFrame(list_metadata, columns=LIST_METADATA_COLUMNS)
+
+		self.index_folder.mkdir(parents=True, exist_ok=True)
+		buffer = io.BytesIO()
+		np.save(buffer, fingerprints)
+		write_file_atomically(filename=self.index_folder / INDEX_FINGERPRINTS_FILE_NAME, data=buffer.getvalue())
+		write_file_atomically(text=metadata.to_csv(index=False),
+		                      filename=self.index_folder / INDEX_METADATA_FILE_NAME)
+
+		self.fingerprints = None
+		self.metadata = None
+		return list_errors
+
+	def load(self):
+		"""
+		memory map the fingerprints and read the metadata table (once)
+		"""
+		if self.fingerprints is None:
+			fingerprints_file_name = self.index_folder / INDEX_FINGERPRINTS_FILE_NAME
+			if not fingerprints_file_name.exists():
+				raise ValueError("No index in {}, build it first!".format(self.index_folder))
+			fingerprints = np.load(str(fingerprints_file_name), mmap_mode='r')
+			# numpy refuses to memory map an empty array
+			self.fingerprints = fingerprints if fingerprints.size else np.zeros(0, dtype=FINGERPRINT_DTYPE)
+			self.metadata = pd.read_csv(self.index_folder / INDEX_METADATA_FILE_NAME)
+		return self.fingerprints, self.metadata
+
+	def find_nearest_plans(self, list_tof_frames=None, shutter_values=None,
+	                       number_of_plans=NUMBER_OF_NEAREST_PLANS, source_frequency=None, time_bin=None):
+		"""
+		:param list_tof_frames: frames [[start, stop], ...] in s of the new plan (final_list_tof_frames)
+		:param shutter_values: or its rows [start(s), stop(s), divider, time bin]
+		:param number_of_plans: number of plans returned
+		:param source_frequency: only keep the plans at this frequency (Hz)
+		:param time_bin: only keep the plans with this time bin (micros)
+		:return: metadata of the nearest plans with their distance (ms of tof covered by only one of the two
+		plans), closest first
+		"""
+		if shutter_values is not None:
+			list_tof_frames = np.atleast_2d(np.asarray(shutter_values, dtype=float))[:, 0:2]
+		if list_tof_frames is None:
+			raise AttributeError("Provide the list of tof frames or the shutter values rows!")
+		frames = np.atleast_2d(np.asarray(list_tof_frames, dtype=float)) * 1e3
+
+		fingerprints, metadata = self.load()
+		is_selected = np.ones(len(fingerprints), dtype=bool)
+		if source_frequency is not None:
+			is_selected &= (metadata['source_frequency'] == source_frequency).to_numpy()
+		if time_bin is not None:
+			is_selected &= np.isclose(fingerprints['time_bin'], time_bin)
+		list_index = np.flatnonzero(is_selected)
+
+		distance = np.concatenate([np.zeros(0)] +
+		                          [calculate_distance(list_frames=fingerprints['frames'][_list_index], frames=frames)
+		                           for _list_index in np.array_split(list_index,
+		                                                             max(1, int(np.ceil(len(list_index) /
+		                                                                                CHUNK_SIZE))))])
+		number_of_plans = min(number_of_plans, len(list_index))
+		if number_of_plans == 0:
+			return metadata.iloc[[]].assign(distance=[])
+		nearest = np.argpartition(distance, number_of_plans - 1)[:number_of_plans]
+		nearest = nearest[np.argsort(distance[nearest], kind='stable')]
+
+		nearest_plans = metadata.iloc[list_index[nearest]].copy()
+		nearest_plans['distance'] = distance[nearest]
+		return nearest_plans.reset_index(drop=True)
@@ -0,0 +1,107 @@
+import io
+import numpy as np
+from pathlib import Path
+
+from shutter_value_generator.core import convert_tof_to_lambda
+from shutter_value_generator.detector import DEFAULT_DETECTOR, get_detector, get_bin_width
+from shutter_value_generator.writer import write_file_atomically
+
+BIN_LOOKUP_FILE_EXTENSION = '.npy'
+
+# one record per bin recorded, tof in s and lambda in Angstroms
+BIN_LOOKUP_DTYPE = np.dtype([('frame_index', np.int16),
+                             ('divider', np.int16),
+                             ('tof_start', np.float64),
+                             ('tof_center', np.float64),
+                             ('tof_stop', np.float64),
+                             ('lambda_start', np.float64),
+                             ('lambda_center', np.float64),
+                             ('lambda_stop', np.float64)])
+
+
+def read_shutter_values_string(shutter_values_string=''):
+	"""
+	:return: rows [start(s), stop(s), divider, time bin]
+	"""
+	return np.loadtxt(io.StringIO(shutter_values_string), ndmin=2)
+
+
+def get_bin_lookup_file_name(shutter_value_file_name=''):
+	"""
+	:return: name of the lookup table written next to the shutter value file (ShutterValues.txt ->
+	ShutterValues.npy)
+	"""
+	return Path(shutter_value_file_name).with_suffix(BIN_LOOKUP_FILE_EXTENSION).name
+
+
+def make_bin_lookup(shutter_values=None, detector_sample_distance=None, detector_offset=None,
+                    detector=DEFAULT_DETECTOR):
+	"""
+	:param shutter_values: rows [start(s), stop(s), divider, time bin]
+	:param detector_sample_distance: in m
+	:param detector_offset: in micros
+	:param detector: name of the detector that records the plan
+	:return: BIN_LOOKUP_DTYPE array, one record per bin in the order they are recorded. The last bin of a frame
+	stops at the end of the frame
+	"""
+	if detector_sample_distance is None:
+		raise AttributeError("define a detector sample distance in meters!")
+	if detector_offset is None:
+		raise AttributeError("define a detector offset in micros!")
+
+	shutter_values = np.atleast_2d(np.asarray(shutter_values, dtype=float))
+	bin_width = get_bin_width(divider=shutter_values[:, 2], time_bin=shutter_values[:, 3],
+	                          detector=get_detector(detector)) * 1e-6
+	number_of_bins = np.maximum(np.ceil((shutter_values[:, 1] - shutter_values[:, 0]) / bin_width - 1e-9),
+	                            0).astype(int)
+
+	frame_index = np.repeat(np.arange(len(shutter_values)), number_of_bins)
+	bin_index = np.arange(len(frame_index)) - np.repeat(np.cumsum(number_of_bins) - number_of_bins, number_of_bins)
+
+	lookup = np.empty(len(frame_index), dtype=BIN_LOOKUP_DTYPE)
+	lookup['frame_index'] = frame_index
+	lookup['divider'] = shutter_values[frame_index, 2]
+	lookup['tof_start'] = shutter_values[frame_index, 0] + bin_index * bin_width[frame_index]
+	lookup['tof_stop'] = np.minimum(lookup['tof_start'] + bin_width[frame_index], shutter_values[frame_index, 1])
+	lookup['tof_center'] = (lookup['tof_start'] + lookup['tof_stop']) / 2
+
+	for _position in ['start', 'center', 'stop']:
+		lookup['lambda_' + _position] = convert_tof_to_lambda(tof=lookup['tof_' + _position],
+		                                                      detector_offset=detector_offset,
+		                                                      detector_sample_distance=detector_sample_distance,
+		                                                      input_units='s')
+	return lookup
+
+
+def write_bin_lookup(lookup=None, filename=''):
+	"""
+	:param lookup: BIN_LOOKUP_DTYPE array
+	:param filename: .npy (can be memory mapped) or .npz (one array per field, compressed)
+	"""
+	buffer = io.BytesIO()
+	if Path(filename).suffix == '.npz':
+		np.savez_compressed(buffer, **{_field: lookup[_field] for _field in BIN_LOOKUP_DTYPE.names})
+	else:
+		np.save(buffer, lookup)
+	write_file_atomically(filename=filename, data=buffer.getvalue())
+
+
+def load_bin_lookup(filename=''):
+	"""
+	:param filename: file written by write_bin_lookup
+	:return: BIN_LOOKUP_DTYPE array, memory mapped read only for the .npy files
+	"""
+	if Path(filename).suffix == '.npz':
+		with np.load(filename) as data:
+			list_missing = [_field for _field in BIN_LOOKUP_DTYPE.names if _field not in data.files]
+			if list_missing:
+				raise ValueError("{} does not define {}".format(filename, ", ".join(list_missing)))
+			lookup = np.empty(len(data['frame_index']), dtype=BIN_LOOKUP_DTYPE)
+			for _field in BIN_LOOKUP_DTYPE.names:
+				lookup[_field] = data[_field]
+		return lookup
+
+	lookup = np.load(str(filename), mmap_mode='r')
+	if lookup.dtype != BIN_LOOKUP_DTYPE:
+		raise ValueError("{} is not a bin lookup table".format(filename))
+	return lookup
@@ -0,0 +1,163 @@
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+
+from shutter_value_generator.make_shutter_value_file import SourceFrequency
+from shutter_value_generator.core import convert_lambda_to_tof, convert_tof_to_lambda
+from shutter_value_generator.make_shutter_value_file import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+
+WAVELENGTH_MIN = 0.1  # Angstroms
+WAVELENGTH_MAX = 30.  # Angstroms
+WAVELENGTH_STEP = 0.001  # Angstroms
+
+# distance in m from the moderator, opening angle and phase in degrees, speed in Hz
+DiskChopper = namedtuple('DiskChopper', ['distance', 'opening_angle', 'phase', 'speed'])
+
+# wavelength grid (Angstroms) and boolean masks over it
+ChopperTransmission = namedtuple('ChopperTransmission', ['wavelength', 'transmitted', 'overlap', 'clean'])
+
+
+def convert_lambda_to_time_of_arrival(wavelength, distance):
+	"""
+	:param wavelength: Angstroms
+	:param distance: m
+	:return: time (s) for the neutron to travel the distance
+	"""
+	return convert_lambda_to_tof(list_wavelength=wavelength, detector_offset=0, detector_sample_distance=distance,
+	                             output_units='s')
+
+
+def is_chopper_open(chopper, time):
+	"""
+	the opening starts to cross the beam when the disk angle reaches the phase
+
+	:param chopper: DiskChopper
+	:param time: s since the pulse (array)
+	:return: boolean array
+	"""
+	angle = np.mod(360. * chopper.speed * time - chopper.phase, 360.)
+	return angle < chopper.opening_angle
+
+
+@lru_cache(maxsize=128)
+def calculate_transmission(choppers, detector_sample_distance, source_frequency,
+                           wavelength_min=WAVELENGTH_MIN,
+                           wavelength_max=WAVELENGTH_MAX,
+                           wavelength_step=WAVELENGTH_STEP):
+	"""
+	transmission of the chopper cascade over a wavelength grid. Results are cached per configuration, the
+	arrays returned are read only.
+
+	:param choppers: tuple of DiskChopper
+	:param detector_sample_distance: flight path to the detector in m
+	:param source_frequency: 60 or 30 Hz
+	:return: ChopperTransmission
+	"""
+	wavelength = np.arange(wavelength_min, wavelength_max + wavelength_step / 2., wavelength_step)
+	period = 1. / source_frequency
+
+	def _transmitted_by_pulse(pulse_index):
+		_mask = np.ones(len(wavelength), dtype=bool)
+		for _chopper in choppers:
+			_time = convert_lambda_to_time_of_arrival(wavelength, _chopper.distance) - pulse_index * period
+			_mask &= is_chopper_open(_chopper, _time)
+		return _mask
+
+	time_at_detector = convert_lambda_to_time_of_arrival(wavelength, detector_sample_distance)
+	transmitted = _transmitted_by_pulse(0) & (time_at_detector < period)
+	overlap = _transmitted_by_pulse(1) & (time_at_detector >= period) & (time_at_detector < 2 * period)
+
+	# neutrons of the previous pulse land on the same time as the current pulse wavelength shifted by
+	# one period
+	wavelength_shift = convert_tof_to_lambda(tof=period, detector_offset=0,
+	                                         detector_sample_distance=detector_sample_distance, input_units='s')
+	index_shifted = np.round((wavelength + wavelength_shift - wavelength_min) / wavelength_step).astype(int)
+	inside_grid = index_shifted < len(wavelength)
+	contaminated = np.zeros(len(wavelength), dtype=bool)
+	contaminated[inside_grid] = overlap[index_shifted[inside_grid]]
+	clean = transmitted & ~contaminated
+
+	for _array in (wavelength, transmitted, overlap, clean):
+		_array.flags.writeable = False
+	return ChopperTransmission(wavelength=wavelength, transmitted=transmitted, overlap=overlap, clean=clean)
+
+
+class ChopperCascade:
+
+	def __init__(self, list_choppers=None, detector_sample_distance=None,
+	             source_frequency=SourceFrequency.sixty_hertz,
+	             wavelength_min=WAVELENGTH_MIN,
+	             wavelength_max=WAVELENGTH_MAX,
+	             wavelength_step=WAVELENGTH_STEP):
+		"""
+		:param list_choppers: list of DiskChopper
+		:param detector_sample_distance: flight path to the detector in m
+		:param source_frequency: 60 or 30 Hz
+		:param wavelength_min: first wavelength of the grid (Angstroms)
+		:param wavelength_max: last wavelength of the grid (Angstroms)
+		:param wavelength_step: step of the grid (Angstroms)
+		"""
+		if not list_choppers:
+			raise AttributeError("Provide at least one DiskChopper!")
+		if detector_sample_distance is None:
+			raise AttributeError("define a detector sample distance in meters!")
+
+		self.list_choppers = tuple(DiskChopper(*[float(_value) for _value in _chopper])
+		                           for _chopper in list_choppers)
+		self.detector_sample_distance = float(detector_sample_distance)
+		self.source_frequency = float(source_frequency)
+		self.wavelength_min = float(wavelength_min)
+		self.wavelength_max = float(wavelength_max)
+		self.wavelength_step = float(wavelength_step)
+
+	def get_transmission(self):
+		return calculate_transmission(self.list_choppers,
+		                              self.detector_sample_distance,
+		                              self.source_frequency,
+		                              wavelength_min=self.wavelength_min,
+		                              wavelength_max=self.wavelength_max,
+		                              wavelength_step=self.wavelength_step)
+
+	def get_wavelength_bands(self, mask_name='clean'):
+		"""
+		:param mask_name: 'transmitted' (current pulse), 'overlap' (previous pulse) or 'clean'
+		:return: list of [min, max] wavelength (Angstroms) of the contiguous bands
+		"""
+		transmission = self.get_transmission()
+		return ChopperCascade.make_list_bands(wavelength=transmission.wavelength,
+		                                      mask=getattr(transmission, mask_name))
+
+	def get_wavelength_range(self):
+		"""
+		:return: [min, max] of the clean transmitted wavelength (Angstroms), same format as
+		epics_chopper_wavelength_range
+		"""
+		list_bands = self.get_wavelength_bands()
+		if not list_bands:
+			raise ValueError("The chopper settings do not transmit any neutron!")
+		return [list_bands[0][0], list_bands[-1][1]]
+
+	def is_wavelength_transmitted(self, list_wavelength_requested=None,
+	                              margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:param list_wavelength_requested: Bragg edges (Angstroms)
+		:param margin: the full [edge - margin, edge + margin] range must be clean
+		:return: boolean array, one per requested wavelength
+		"""
+		transmission = self.get_transmission()
+		wavelength = transmission.wavelength
+		requested = np.asarray(list_wavelength_requested, dtype=float)
+
+		number_of_blocked = np.concatenate([[0], np.cumsum(~transmission.clean)])
+		left = np.searchsorted(wavelength, requested - margin, side='left')
+		right = np.searchsorted(wavelength, requested + margin, side='right')
+		inside_grid = (requested - margin >= wavelength[0]) & (requested + margin <= wavelength[-1])
+		return inside_grid & (number_of_blocked[right] - number_of_blocked[left] == 0)
+
+	@staticmethod
+	def make_list_bands(wavelength=None, mask=None):
+		mask = np.asarray(mask, dtype=np.int8)
+		steps = np.diff(np.concatenate([[0], mask, [0]]))
+		list_start = np.where(steps == 1)[0]
+		list_stop = np.where(steps == -1)[0] - 1
+		return [[wavelength[_start], wavelength[_stop]] for _start, _stop in zip(list_start, list_stop)]
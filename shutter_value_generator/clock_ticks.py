@@ -0,0 +1,114 @@
+import numpy as np
+
+# all the tof are held as int64 numbers of ticks of CLOCK_TICK_NS. A bin at divider 0 lasts 1 tick with the
+# 5.12 micros time bin and 2 ticks with the 10.24 micros time bin, each divider doubles the width of the bins
+CLOCK_TICK_NS = 5
+FINEST_TIME_BIN = 5.12  # micros
+NS_PER_S = 1000000000
+
+
+def convert_seconds_to_ticks(tof=None):
+	"""
+	:param tof: value or array in s
+	:return: int64 value or array of ticks, rounded to the closest tick
+	"""
+	return np.rint(np.asarray(tof, dtype=float) * (NS_PER_S / CLOCK_TICK_NS)).astype(np.int64)
+
+
+def convert_ticks_to_seconds(ticks=None):
+	"""
+	:param ticks: int64 value or array
+	:return: value or array in s, the closest float to the exact decimal value (ex: 1160000 ticks -> 5.8e-3)
+	"""
+	return np.asarray(ticks, dtype=np.int64) / (NS_PER_S / CLOCK_TICK_NS)
+
+
+def get_ticks_per_bin(divider=0, time_bin=FINEST_TIME_BIN):
+	"""
+	:param divider: clock divider (value or array), negative dividers (frame too long for the clock table)
+	are not snapped
+	:param time_bin: 10.24 or 5.12 micros
+	:return: int64 width of the bins in ticks
+	"""
+	divider = np.asarray(divider, dtype=np.int64)
+	ticks_per_bin = np.left_shift(np.int64(int(round(time_bin / FINEST_TIME_BIN))), np.maximum(divider, 0))
+	return np.where(divider < 0, 1, ticks_per_bin).astype(np.int64)
+
+
+def convert_bin_width_to_ticks(bin_width=None):
+	"""
+	:param bin_width: value or array in micros
+	:return: int64 width of the bins in ticks (at least 1)
+	"""
+	ticks_per_bin = np.rint(np.asarray(bin_width, dtype=float) * 1000 / CLOCK_TICK_NS).astype(np.int64)
+	return np.maximum(ticks_per_bin, 1)
+
+
+def snap_list_tof_frames(list_tof_frames=None, list_divider=None, time_bin=FINEST_TIME_BIN, list_bin_width=None):
+	"""
+	move the start of each frame up and its stop down to the closest multiple of the bin width of its divider
+
+	:param list_tof_frames: int64 array of [start, stop] in ticks
+	:param list_divider: divider of each frame
+	:param time_bin: 10.24 or 5.12 micros
+	:param list_bin_width: or directly the bin width (micros) of each frame, for the detectors other than the MCP
+	:return: int64 array of [start, stop] in ticks
+	"""
+	list_tof_frames = np.asarray(list_tof_frames, dtype=np.int64).reshape(-1, 2)
+	if list_bin_width is None:
+		ticks_per_bin = get_ticks_per_bin(divider=list_divider, time_bin=time_bin)
+	else:
+		ticks_per_bin = convert_bin_width_to_ticks(bin_width=list_bin_width)
+	start = -(-list_tof_frames[:, 0] // ticks_per_bin) * ticks_per_bin
+	stop = (list_tof_frames[:, 1] // ticks_per_bin) * ticks_per_bin
+	return np.column_stack([start, stop])
+
+
+def format_ticks(ticks=None):
+	"""
+	exact decimal representation in s, without float round off (ex: 540000 ticks -> '0.0027')
+
+	:param ticks: int64 array
+	:return: list of strings
+	"""
+	list_strings = []
+	for _ns in (np.asarray(ticks, dtype=np.int64).ravel() * CLOCK_TICK_NS).tolist():
+		_sign = '-' if _ns < 0 else ''
+		_seconds, _fraction = divmod(abs(_ns), NS_PER_S)
+		if _fraction:
+			list_strings.append("{}{}.{}".format(_sign, _seconds, "{:09d}".format(_fraction).rstrip('0')))
+		else:
+			list_strings.append("{}{}".format(_sign, _seconds))
+	return list_strings
+
+
+def format_shutter_values_string(list_tof_frames_ticks=None, list_divider=None, time_bin=FINEST_TIME_BIN):
+	"""
+	:param list_tof_frames_ticks: int64 array of [start, stop] in ticks, already snapped
+	:param list_divider: divider of each frame
+	:param time_bin: 10.24 or 5.12 micros
+	:return: shutter values string
+	"""
+	list_tof_frames_ticks = np.asarray(list_tof_frames_ticks, dtype=np.int64).reshape(-1, 2)
+	list_start = format_ticks(list_tof_frames_ticks[:, 0])
+	list_stop = format_ticks(list_tof_frames_ticks[:, 1])
+	return "\n".join(["{}\t{}\t{}\t{}".format(_start, _stop, _divider, time_bin)
+	                  for _start, _stop, _divider in zip(list_start, list_stop, list_divider)])
+
+
+def make_shutter_values_string(list_tof_frames=None, list_divider=None, time_bin=FINEST_TIME_BIN,
+                               list_bin_width=None):
+	"""
+	:param list_tof_frames: frames [[start, stop], ...] in s
+	:param list_divider: divider of each frame
+	:param time_bin: 10.24 or 5.12 micros
+	:param list_bin_width: bin width (micros) of each frame, computed from the MCP clock when not provided
+	:return: shutter values string, frames snapped to the bins of their divider
+	"""
+	list_tof_frames_ticks = snap_list_tof_frames(list_tof_frames=convert_seconds_to_ticks(list_tof_frames),
+	                                             list_divider=list_divider,
+	                                             time_bin=time_bin,
+	                                             list_bin_width=list_bin_width)
+	return format_shutter_values_string(list_tof_frames_ticks=list_tof_frames_ticks,
+	                                    list_divider=list_divider,
+	                                    time_bin=time_bin)
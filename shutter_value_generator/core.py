@@ -0,0 +1,464 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import namedtuple
+from functools import lru_cache
+
+from shutter_value_generator.instrumentation import span, count
+from shutter_value_generator import clock_ticks, intervals
+from shutter_value_generator.detector import DEFAULT_DETECTOR, get_detector, get_bin_width, get_range
+
+# pure functions computing the shutter values from an immutable PlanConfig. Nothing here is modified once
+# built, plans can be computed from many threads or processes at the same time.
+
+CLOCK_CYCLE_FILE = 'clock_cycle.txt'
+SHUTTER_VALUE_FILENAME = "ShutterValues.txt"
+
+MN = 1.674927471e-27  # kg - neutron mass
+H = 6.62607004e-34  # J s - Planck constant
+COEFF = (H / MN) * 1e6
+
+TOF_FRAMES = ((1e-6, 2.5e-3),
+              (2.9e-3, 5.8e-3),
+              (6.2e-3, 15.9e-3))
+
+TOF_FRAMES_30_HZ = ((1e-6, 2.5e-3),
+                    (2.9e-3, 5.8e-3),
+                    (6.2e-3, 15.9e-3),
+                    (16.3e-3, 25.9e-3),
+                    (26.3e-3, 31.8e-3))
+
+DEFAULT_list_lambda_dead_time = (float(np.mean([TOF_FRAMES[0][1], TOF_FRAMES[1][0]])),
+                                 float(np.mean([TOF_FRAMES[1][1], TOF_FRAMES[2][0]])))
+MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME = 0.3  # Angstroms
+MIN_LAMBDA_PEAK_VALUE_INTERVAL = 0.3  # Angstroms
+MIN_TOF_BETWEEN_FRAMES = TOF_FRAMES[1][0] - TOF_FRAMES[0][1]
+
+RESONANCE_SHUTTER_VALUES = "1e-6\t320e-6\t3\t0.16"
+DEFAULT_SHUTTER_VALUES = "1e-6\t2.5e-3\t5\t10.24\n2.9e-3\t5.8e-3\t6\t10.24\n6.2e-3\t15.9e-3\t7\t10.24"
+
+
+class TimeBinMicros:
+	ten_twenty_four = 10.24
+	five_twelve = 5.12
+
+
+class SourceFrequency:
+	sixty_hertz = 60
+	thirty_hertz = 30
+
+
+PlanConfig = namedtuple('PlanConfig', ['source_frequency',
+                                       'detector_sample_distance',
+                                       'detector_offset',
+                                       'resonance_mode',
+                                       'list_resonance_energy',
+                                       'list_resonance_isotopes',
+                                       'default_mode',
+                                       'time_bin',
+                                       'epics_chopper_wavelength_range',
+                                       'detector'])
+
+ShutterPlan = namedtuple('ShutterPlan', ['shutter_values_string',
+                                         'list_tof_dead_time',
+                                         'list_tof_frames',
+                                         'list_divider',
+                                         'list_tof_frames_ticks'])
+
+
+@lru_cache(maxsize=None)
+def read_clock_cycle_table(full_file_name):
+	"""
+	the clock cycle table is parsed once and kept in memory, it must not be modified by the callers
+	"""
+	return pd.read_csv(full_file_name,
+	                   names=['Clock', 'Divided', 'TimeBin(micros)', 'Range(ms)'],
+	                   skiprows=1)
+
+
+def get_clock_cycle_file_name():
+	full_file_name = Path(__file__).parent / CLOCK_CYCLE_FILE
+	assert Path(full_file_name).exists()
+	return str(full_file_name)
+
+
+def get_clock_cycle_table(detector=DEFAULT_DETECTOR):
+	"""
+	:param detector: name of the detector
+	:return: ClockCycleTable of read-only arrays (clock in MHz, divider, time bin in micros and range in ms for
+	the reference time bin of the detector)
+	"""
+	return get_detector(detector).clock_cycle_table
+
+
+def _freeze(value=None):
+	if value is None or np.isscalar(value):
+		return value
+	return tuple(value)
+
+
+def make_plan_config(source_frequency=SourceFrequency.sixty_hertz,
+                     detector_sample_distance=None,
+                     detector_offset=None,
+                     resonance_mode=False,
+                     list_resonance_energy=None,
+                     list_resonance_isotopes=None,
+                     default_mode=False,
+                     time_bin=TimeBinMicros.ten_twenty_four,
+                     epics_chopper_wavelength_range=None,
+                     detector=DEFAULT_DETECTOR):
+	"""
+	check the plan parameters (see MakeShutterValueFile) and freeze them in a PlanConfig
+
+	:return: PlanConfig
+	"""
+	if resonance_mode and default_mode:
+		raise AttributeError("You can not have default and resonance mode turned on at the same time!")
+
+	_detector = get_detector(detector)
+
+	if not (resonance_mode or default_mode):
+		if detector_sample_distance is None:
+			raise AttributeError("define a detector sample distance in meters!")
+
+		if detector_offset is None:
+			raise AttributeError("define a detector offset in micros!")
+
+		if epics_chopper_wavelength_range is None:
+			raise AttributeError(
+					"Provides the maximum range of wavelength in Angstroms the chopper are set up for! ["
+					"min_value, max_value]")
+		if not type(epics_chopper_wavelength_range) in (list, tuple):
+			raise AttributeError(
+					"Provides the maximum range of wavelength in Angstroms the chopper are set up for! ["
+					"min_value, max_value]")
+		if len(epics_chopper_wavelength_range) != 2:
+			raise AttributeError(
+					"Provides the maximum range of wavelength in Angstroms the chopper are set up for! ["
+					"min_value, max_value]")
+
+		if not np.any(np.isclose(time_bin, _detector.time_bins)):
+			raise AttributeError("Time bin must be {} micros with the {} detector".format(
+					" or ".join("{:g}".format(_time_bin) for _time_bin in _detector.time_bins), detector))
+
+	return PlanConfig(source_frequency=source_frequency,
+	                  detector_sample_distance=detector_sample_distance,
+	                  detector_offset=detector_offset,
+	                  resonance_mode=resonance_mode,
+	                  list_resonance_energy=_freeze(list_resonance_energy),
+	                  list_resonance_isotopes=_freeze(list_resonance_isotopes),
+	                  default_mode=default_mode,
+	                  time_bin=time_bin,
+	                  epics_chopper_wavelength_range=_freeze(epics_chopper_wavelength_range),
+	                  detector=detector)
+
+
+def get_tof_frames(source_frequency=SourceFrequency.sixty_hertz):
+	if source_frequency == SourceFrequency.sixty_hertz:
+		return TOF_FRAMES
+	return TOF_FRAMES_30_HZ
+
+
+def convert_lambda_to_tof(list_wavelength=None, detector_offset=None, detector_sample_distance=None,
+                          output_units='micros'):
+	"""
+	the arguments are broadcast together (ex: one distance and offset per row of a 2D array of wavelength)
+
+	:param list_wavelength: value or array in Angstroms
+	:param detector_offset: in micros
+	:param detector_sample_distance: in m
+	:param output_units: 's' or 'micros'
+	:return: array of tof
+	"""
+	tof = np.asarray(list_wavelength, dtype=float) * (np.asarray(detector_sample_distance, dtype=float) * 100) / \
+	      COEFF - detector_offset
+	if output_units == 's':
+		return tof * 1e-6
+	return tof
+
+
+def convert_tof_to_lambda(tof=None, detector_offset=None, detector_sample_distance=None, input_units='micros'):
+	"""
+	inverse of convert_lambda_to_tof
+
+	:param tof: value or array
+	:param detector_offset: in micros
+	:param detector_sample_distance: in m
+	:param input_units: 's' or 'micros'
+	:return: array of lambda in Angstroms
+	"""
+	tof = np.asarray(tof, dtype=float)
+	if input_units == 's':
+		tof = tof * 1e6
+	return (tof + detector_offset) * COEFF / (np.asarray(detector_sample_distance, dtype=float) * 100)
+
+
+def list_lambda_dead_time_too_close(list_lambda_dead_time=None):
+	lambda_offset = np.array(list_lambda_dead_time[1:]) - np.array(list_lambda_dead_time[0:-1])
+	for _offset in lambda_offset:
+		if _offset <= MIN_LAMBDA_PEAK_VALUE_INTERVAL:
+			return True
+	return False
+
+
+def check_list_lambda_dead_time(list_lambda_dead_time=None):
+	# user needs to provide at least 2 dead_time_lambda
+	if not type(list_lambda_dead_time) in (list, tuple):
+		raise ValueError("list_lambda_dead_time must be a list of at least 2 elements!")
+
+	if len(list_lambda_dead_time) < 2:
+		raise ValueError("list_lambda_dead_time should contain at least 2 dead lambda values!")
+
+	if list_lambda_dead_time_too_close(list_lambda_dead_time=list_lambda_dead_time):
+		raise ValueError("Make sure the list of lambda dead time are at least {}Angstroms from each "
+		                 "other".format(MIN_LAMBDA_PEAK_VALUE_INTERVAL))
+
+
+def make_list_tof_frames_ticks(list_tof_dead_time=None, source_frequency=SourceFrequency.sixty_hertz):
+	"""
+	the dead times (MIN_TOF_BETWEEN_FRAMES each side) are merged with the readout gaps of the source frequency
+	and with each other when less than MIN_TOF_BETWEEN_FRAMES apart, the frames are what is left in between. The
+	frames are at least MIN_TOF_BETWEEN_FRAMES long and apart. Everything is computed in integer clock ticks
+
+	:param list_tof_dead_time: dead times in s, in any order
+	:param source_frequency: 60 or 30 Hz
+	:return: int64 array of frames [start, stop] in ticks, sorted
+	"""
+	_tof_frames = clock_ticks.convert_seconds_to_ticks(get_tof_frames(source_frequency=source_frequency))
+	min_ticks_between_frames = clock_ticks.convert_seconds_to_ticks(MIN_TOF_BETWEEN_FRAMES)
+	list_tof_dead_time = clock_ticks.convert_seconds_to_ticks(list_tof_dead_time).reshape(-1)
+	list_dead_intervals = np.column_stack([list_tof_dead_time - min_ticks_between_frames,
+	                                       list_tof_dead_time + min_ticks_between_frames])
+	# the cuts before and after the frames of the source go beyond all the dead intervals
+	lowest_tick = np.min(list_dead_intervals, initial=_tof_frames[0, 0]) - 1
+	highest_tick = np.max(list_dead_intervals, initial=_tof_frames[-1, 1]) + 1
+	list_cuts = intervals.union([[lowest_tick, _tof_frames[0, 0]]],
+	                            intervals.get_gaps(_tof_frames),
+	                            list_dead_intervals,
+	                            [[_tof_frames[-1, 1], highest_tick]])
+	return intervals.get_gaps(intervals.merge(list_cuts, min_gap=min_ticks_between_frames))
+
+
+def make_list_tof_frames(list_tof_dead_time=None, source_frequency=SourceFrequency.sixty_hertz):
+	"""
+	see make_list_tof_frames_ticks
+
+	:return: tuple of frames (start, stop) in s, sorted
+	"""
+	list_tof_frames = clock_ticks.convert_ticks_to_seconds(make_list_tof_frames_ticks(
+			list_tof_dead_time=list_tof_dead_time, source_frequency=source_frequency))
+	return tuple((float(_start), float(_stop)) for _start, _stop in list_tof_frames)
+
+
+def get_above_closest_divided(delta_tof=0, time_bin=TimeBinMicros.ten_twenty_four, detector=DEFAULT_DETECTOR):
+	"""
+	smallest divider (finest bins) whose range can hold the frame, without more than max_bins_per_frame bins
+
+	:param delta_tof: in s
+	:param time_bin: one of the time bins of the detector (10.24 or 5.12 micros for the MCP). The divider is
+	selected on the range of the clock cycle table, a smaller time bin gives narrower bins
+	:param detector: name of the detector
+	:return: divider, -1 if the frame is longer than the range of the largest divider
+	"""
+	_detector = get_detector(detector)
+	list_divider = _detector.clock_cycle_table.divider
+	list_bin_width = get_bin_width(divider=list_divider, time_bin=time_bin, detector=_detector) * 1e-6
+	is_valid = (delta_tof <= get_range(detector=_detector)) & \
+	           (np.ceil(delta_tof / list_bin_width - 1e-9) <= _detector.max_bins_per_frame)
+	index = np.flatnonzero(is_valid)
+	if len(index) > 0:
+		return int(list_divider[index[0]])
+	return -1
+
+
+def snap_list_tof_frames(list_tof_frames_ticks=None, time_bin=TimeBinMicros.ten_twenty_four,
+                         detector=DEFAULT_DETECTOR):
+	"""
+	:param list_tof_frames_ticks: int64 array of frames [start, stop] in ticks
+	:param time_bin: one of the time bins of the detector
+	:param detector: name of the detector
+	:return: int64 array of the frames snapped to the bins of their divider (the start moves up and the stop
+	down) and the divider of each frame
+	"""
+	list_tof_frames_ticks = np.asarray(list_tof_frames_ticks, dtype=np.int64).reshape(-1, 2)
+	with span('divider_lookup'):
+		list_delta_tof = clock_ticks.convert_ticks_to_seconds(list_tof_frames_ticks[:, 1] - list_tof_frames_ticks[:, 0])
+		list_divider = tuple(get_above_closest_divided(delta_tof=_delta_tof, time_bin=time_bin, detector=detector)
+		                     for _delta_tof in list_delta_tof.tolist())
+		list_bin_width = get_list_bin_width(list_divider=list_divider, time_bin=time_bin, detector=detector)
+	list_tof_frames_ticks = clock_ticks.snap_list_tof_frames(list_tof_frames=list_tof_frames_ticks,
+	                                                         list_divider=list_divider,
+	                                                         time_bin=time_bin,
+	                                                         list_bin_width=list_bin_width)
+	return list_tof_frames_ticks, list_divider
+
+
+def make_shutter_values_string(list_tof_frames=None, time_bin=TimeBinMicros.ten_twenty_four,
+                               detector=DEFAULT_DETECTOR):
+	"""
+	:param list_tof_frames: frames (start, stop) in s
+	:param time_bin: one of the time bins of the detector
+	:param detector: name of the detector
+	:return: shutter values string and the divider of each frame
+	"""
+	list_tof_frames_ticks, list_divider = snap_list_tof_frames(
+			list_tof_frames_ticks=clock_ticks.convert_seconds_to_ticks(list_tof_frames),
+			time_bin=time_bin,
+			detector=detector)
+	with span('formatting'):
+		shutter_values_string = clock_ticks.format_shutter_values_string(list_tof_frames_ticks=list_tof_frames_ticks,
+		                                                                 list_divider=list_divider,
+		                                                                 time_bin=time_bin)
+	return shutter_values_string, list_divider
+
+
+def make_shutter_plan(list_tof_frames_ticks=None, list_tof_dead_time=None, time_bin=TimeBinMicros.ten_twenty_four,
+                      detector=DEFAULT_DETECTOR):
+	"""
+	the frames are snapped to the bins of their divider once, the shutter values string and the frames of the
+	plan (list_tof_frames in s) are both derived from the snapped ticks, they hold what the detector receives
+
+	:param list_tof_frames_ticks: int64 array of frames [start, stop] in ticks
+	:param list_tof_dead_time: dead times of the plan in s, or None
+	:param time_bin: one of the time bins of the detector
+	:param detector: name of the detector
+	:return: ShutterPlan, list_tof_frames_ticks holds the snapped frames (start, stop) as integer ticks
+	"""
+	list_tof_frames_ticks, list_divider = snap_list_tof_frames(list_tof_frames_ticks=list_tof_frames_ticks,
+	                                                           time_bin=time_bin,
+	                                                           detector=detector)
+	with span('formatting'):
+		shutter_values_string = clock_ticks.format_shutter_values_string(list_tof_frames_ticks=list_tof_frames_ticks,
+		                                                                 list_divider=list_divider,
+		                                                                 time_bin=time_bin)
+	list_tof_frames = tuple((float(_start), float(_stop))
+	                        for _start, _stop in clock_ticks.convert_ticks_to_seconds(list_tof_frames_ticks))
+	# the plan only holds tuples, it can be compared and shared between threads
+	list_tof_frames_ticks = tuple((int(_start), int(_stop)) for _start, _stop in list_tof_frames_ticks)
+	if list_tof_dead_time is not None:
+		list_tof_dead_time = tuple(float(_tof) for _tof in list_tof_dead_time)
+	return ShutterPlan(shutter_values_string=shutter_values_string,
+	                   list_tof_dead_time=list_tof_dead_time,
+	                   list_tof_frames=list_tof_frames,
+	                   list_divider=list_divider,
+	                   list_tof_frames_ticks=list_tof_frames_ticks)
+
+
+def get_list_bin_width(list_divider=None, time_bin=TimeBinMicros.ten_twenty_four, detector=DEFAULT_DETECTOR):
+	"""
+	:return: array of the bin width (micros) of each frame, 0 for the frames too long for the clock cycle table
+	"""
+	list_divider = np.asarray(list_divider, dtype=int)
+	list_bin_width = get_bin_width(divider=np.maximum(list_divider, 0), time_bin=time_bin,
+	                               detector=get_detector(detector))
+	return np.where(list_divider < 0, 0, list_bin_width)
+
+
+def check_detector_limits(list_tof_frames=None, list_divider=None, time_bin=TimeBinMicros.ten_twenty_four,
+                          detector=DEFAULT_DETECTOR):
+	"""
+	raise a ValueError if the plan has more rows or a frame more bins than the detector can record
+	"""
+	_detector = get_detector(detector)
+	if len(list_tof_frames) > _detector.max_rows:
+		raise ValueError("The plan has {} frames, the {} detector accepts {} at most!".format(
+				len(list_tof_frames), detector, _detector.max_rows))
+	list_bin_width = get_list_bin_width(list_divider=list_divider, time_bin=time_bin, detector=detector) * 1e-6
+	for (_start, _stop), _bin_width in zip(list_tof_frames, list_bin_width):
+		if _bin_width == 0:
+			raise ValueError("Frame [{}, {}] s is too long for the {} detector!".format(_start, _stop, detector))
+		if np.ceil((_stop - _start) / _bin_width - 1e-9) > _detector.max_bins_per_frame:
+			raise ValueError("Frame [{}, {}] s has more than {} bins!".format(_start, _stop,
+			                                                                  _detector.max_bins_per_frame))
+
+
+def is_resonance_plan_defined(config=None):
+	return ((config.list_resonance_energy is not None) or (config.list_resonance_isotopes is not None)) and \
+	       (config.detector_sample_distance is not None)
+
+
+def compute_resonance_plan(config=None, list_lambda_dead_time=None):
+	"""
+	frames around the resonances of interest, followed by the Bragg edge frames defined by
+	list_lambda_dead_time if provided. The dead times and the limits of the detector are checked as in
+	compute_plan (ValueError)
+	"""
+	from shutter_value_generator.resonance import ResonancePlanner
+
+	if list_lambda_dead_time is not None:
+		check_list_lambda_dead_time(list_lambda_dead_time=list_lambda_dead_time)
+
+	detector_offset = 0 if config.detector_offset is None else config.detector_offset
+	o_planner = ResonancePlanner(detector_sample_distance=config.detector_sample_distance,
+	                             detector_offset=detector_offset,
+	                             source_frequency=config.source_frequency,
+	                             time_bin=config.time_bin,
+	                             detector=config.detector)
+	list_resonance_energy = config.list_resonance_energy
+	if list_resonance_energy is None:
+		list_resonance_energy = o_planner.get_list_resonance_energy(list_isotopes=config.list_resonance_isotopes)
+
+	list_tof_dead_time = None
+	if list_lambda_dead_time is None:
+		list_tof_frames = o_planner.make_list_tof_frames(list_resonance_energy=list_resonance_energy)
+	else:
+		list_tof_dead_time = convert_lambda_to_tof(list_wavelength=list_lambda_dead_time,
+		                                           detector_offset=detector_offset,
+		                                           detector_sample_distance=config.detector_sample_distance,
+		                                           output_units='s')
+		list_tof_frames = o_planner.make_combined_list_tof_frames(
+				list_resonance_energy=list_resonance_energy,
+				list_tof_bragg_frames=make_list_tof_frames(list_tof_dead_time=list_tof_dead_time,
+				                                           source_frequency=config.source_frequency))
+	plan = make_shutter_plan(list_tof_frames_ticks=clock_ticks.convert_seconds_to_ticks(list_tof_frames),
+	                         list_tof_dead_time=list_tof_dead_time,
+	                         time_bin=config.time_bin,
+	                         detector=config.detector)
+	check_detector_limits(list_tof_frames=plan.list_tof_frames,
+	                      list_divider=plan.list_divider,
+	                      time_bin=config.time_bin,
+	                      detector=config.detector)
+	return plan
+
+
+def compute_plan(config=None, list_lambda_dead_time=None):
+	"""
+	side effect free computation of the shutter values
+
+	:param config: PlanConfig (see make_plan_config)
+	:param list_lambda_dead_time: lambda (Angstroms) of the dead times of the MCP, at least 2 of them at least
+	MIN_LAMBDA_PEAK_VALUE_INTERVAL from each other. The default shutter values are used when not provided.
+	:return: ShutterPlan, list_tof_dead_time, list_tof_frames, list_divider and list_tof_frames_ticks are None for
+	the fixed plans. list_tof_frames are the snapped frames written in the shutter values string
+	"""
+	if config.resonance_mode and is_resonance_plan_defined(config=config):
+		plan = compute_resonance_plan(config=config, list_lambda_dead_time=list_lambda_dead_time)
+	elif config.resonance_mode:
+		plan = ShutterPlan(RESONANCE_SHUTTER_VALUES, None, None, None, None)
+	elif config.default_mode or (list_lambda_dead_time is None):
+		plan = ShutterPlan(DEFAULT_SHUTTER_VALUES, None, None, None, None)
+	else:
+		with span('validation'):
+			check_list_lambda_dead_time(list_lambda_dead_time=list_lambda_dead_time)
+
+		with span('dead_time_conversion'):
+			list_tof_dead_time = tuple(convert_lambda_to_tof(list_wavelength=list_lambda_dead_time,
+			                                                 detector_offset=config.detector_offset,
+			                                                 detector_sample_distance=config.detector_sample_distance,
+			                                                 output_units='s').tolist())
+
+		with span('frame_construction'):
+			list_tof_frames_ticks = make_list_tof_frames_ticks(list_tof_dead_time=list_tof_dead_time,
+			                                                   source_frequency=config.source_frequency)
+		count('frames', len(list_tof_frames_ticks))
+
+		plan = make_shutter_plan(list_tof_frames_ticks=list_tof_frames_ticks,
+		                         list_tof_dead_time=list_tof_dead_time,
+		                         time_bin=config.time_bin,
+		                         detector=config.detector)
+		check_detector_limits(list_tof_frames=plan.list_tof_frames,
+		                      list_divider=plan.list_divider,
+		                      time_bin=config.time_bin,
+		                      detector=config.detector)
+	count('plans')
+	return plan
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.make_shutter_value_file import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+from shutter_value_generator.detector import DEFAULT_DETECTOR
+from shutter_value_generator.bin_lookup import make_bin_lookup
+
+
+class CountingStatistics:
+
+	def __init__(self, spectrum_file=None, spectrum=None, detector_sample_distance=None, detector_offset=None,
+	             detector=DEFAULT_DETECTOR):
+		"""
+		:param spectrum_file: open beam or moderator spectrum, two columns wavelength (Angstroms) and flux
+		(neutrons/s/Angstrom reaching the region of interest of the detector), text or .npy file
+		:param spectrum: or directly the array [[wavelength, flux], ...]
+		:param detector_sample_distance: in m
+		:param detector_offset: in micros
+		:param detector: name of the detector that records the plans
+		"""
+		if spectrum is None:
+			if spectrum_file is None:
+				raise AttributeError("Provide the spectrum file or the spectrum array!")
+			spectrum = CountingStatistics.read_spectrum_file(filename=spectrum_file)
+		if detector_sample_distance is None:
+			raise AttributeError("define a detector sample distance in meters!")
+		if detector_offset is None:
+			raise AttributeError("define a detector offset in micros!")
+
+		spectrum = np.asarray(spectrum, dtype=float)
+		if spectrum.ndim != 2 or spectrum.shape[1] != 2 or len(spectrum) < 2:
+			raise ValueError("The spectrum must have two columns (wavelength, flux) and at least 2 rows!")
+		spectrum = spectrum[np.argsort(spectrum[:, 0])]
+
+		self.wavelength = spectrum[:, 0]
+		# trapezoid cumulative integral, the integral over any range is a difference of two interpolations
+		self.cumulative_flux = np.concatenate([[0], np.cumsum(0.5 * (spectrum[1:, 1] + spectrum[:-1, 1]) *
+		                                                      np.diff(spectrum[:, 0]))])
+		self.detector_sample_distance = detector_sample_distance
+		self.detector_offset = detector_offset
+		self.detector = detector
+
+	@staticmethod
+	def read_spectrum_file(filename=''):
+		"""
+		:param filename: .npy array or text file (comma or space separated, # comments)
+		:return: array [[wavelength, flux], ...]
+		"""
+		if Path(filename).suffix == '.npy':
+			return np.load(filename)
+		with open(filename, 'r') as f:
+			first_line = next((_line for _line in f if _line.strip() and not _line.startswith('#')), '')
+		delimiter = ',' if ',' in first_line else None
+		return np.loadtxt(filename, delimiter=delimiter, comments='#', ndmin=2)
+
+	def integrate(self, lambda_start=None, lambda_stop=None):
+		"""
+		:return: neutrons/s between lambda_start and lambda_stop (arrays in Angstroms), 0 outside of the spectrum
+		"""
+		return np.interp(lambda_stop, self.wavelength, self.cumulative_flux) - \
+		       np.interp(lambda_start, self.wavelength, self.cumulative_flux)
+
+	def make_bins(self, shutter_values=None):
+		"""
+		:param shutter_values: rows [start(s), stop(s), divider, time bin], or the shutter value file
+		:return: dataframe with one row per bin recorded (frame_index, tof and lambda of its edges)
+		"""
+		if isinstance(shutter_values, (str, Path)):
+			shutter_values = MakeShutterValueFile.read_shutter_values_file(filename=shutter_values)
+		lookup = make_bin_lookup(shutter_values=shutter_values,
+		                         detector_sample_distance=self.detector_sample_distance,
+		                         detector_offset=self.detector_offset,
+		                         detector=self.detector)
+		return pd.DataFrame({_field: lookup[_field] for _field in ['frame_index', 'tof_start', 'tof_stop',
+		                                                           'lambda_start', 'lambda_stop']})
+
+	def predict_counts(self, shutter_values=None, run_time=3600):
+		"""
+		:param shutter_values: rows [start(s), stop(s), divider, time bin]
+		:param run_time: s
+		:return: make_bins dataframe with the counts expected in each bin and their uncertainty
+		"""
+		bins = self.make_bins(shutter_values=shutter_values)
+		bins['counts'] = self.integrate(bins['lambda_start'].to_numpy(), bins['lambda_stop'].to_numpy()) * run_time
+		bins['uncertainty'] = np.sqrt(bins['counts'])
+		return bins
+
+	def _get_edge_rates(self, shutter_values=None, list_wavelength_requested=None,
+	                    margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:return: bin index of each edge (-1 outside of the bins), neutrons/s in that bin and in the +/- margin
+		window (only the bins of the frame of the edge)
+		"""
+		bins = self.make_bins(shutter_values=shutter_values)
+		wavelength = np.atleast_1d(np.asarray(list_wavelength_requested, dtype=float))
+		if len(bins) == 0:
+			return np.full(len(wavelength), -1), np.full(len(wavelength), np.nan), np.full(len(wavelength), np.nan)
+
+		lambda_start = bins['lambda_start'].to_numpy()
+		lambda_stop = bins['lambda_stop'].to_numpy()
+		frame_index = bins['frame_index'].to_numpy()
+
+		# bins are sorted (frames are ordered), the bin of an edge is the last one starting before it
+		bin_index = np.clip(np.searchsorted(lambda_start, wavelength, side='right') - 1, 0, None)
+		is_inside = (lambda_start[bin_index] <= wavelength) & (wavelength < lambda_stop[bin_index])
+
+		first_bin = np.searchsorted(frame_index, frame_index[bin_index], side='left')
+		last_bin = np.searchsorted(frame_index, frame_index[bin_index], side='right') - 1
+		window_rate = self.integrate(np.maximum(wavelength - margin, lambda_start[first_bin]),
+		                             np.minimum(wavelength + margin, lambda_stop[last_bin]))
+		edge_rate = self.integrate(lambda_start[bin_index], lambda_stop[bin_index])
+
+		return np.where(is_inside, bin_index, -1), \
+		       np.where(is_inside, edge_rate, np.nan), \
+		       np.where(is_inside, window_rate, np.nan)
+
+	def run(self, shutter_values=None, list_wavelength_requested=None, run_time=3600,
+	        margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:param shutter_values: rows [start(s), stop(s), divider, time bin]
+		:param list_wavelength_requested: Bragg edges in Angstroms
+		:param run_time: s
+		:param margin: Angstroms each side of the edge
+		:return: dataframe with one row per edge, the counts and relative uncertainty of the bin of the edge and
+		of the +/- margin window (nan when the edge is not recorded)
+		"""
+		bin_index, edge_rate, window_rate = self._get_edge_rates(shutter_values=shutter_values,
+		                                                         list_wavelength_requested=list_wavelength_requested,
+		                                                         margin=margin)
+		counts = edge_rate * run_time
+		window_counts = window_rate * run_time
+		with np.errstate(divide='ignore'):
+			return pd.DataFrame({'wavelength': np.asarray(list_wavelength_requested, dtype=float),
+			                     'bin_index': bin_index,
+			                     'counts': counts,
+			                     'relative_uncertainty': 1. / np.sqrt(counts),
+			                     'window_counts': window_counts,
+			                     'window_relative_uncertainty': 1. / np.sqrt(window_counts)})
+
+	def get_exposure(self, shutter_values=None, list_wavelength_requested=None, target_relative_uncertainty=0.01,
+	                 margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		run time needed for the bin of each edge to reach the target relative uncertainty (1/sqrt(counts))
+
+		:return: dataframe with one row per edge, run_time and window_run_time in s (inf if no neutron reaches
+		the bin, nan if the edge is not recorded)
+		"""
+		if target_relative_uncertainty <= 0:
+			raise ValueError("target_relative_uncertainty must be positive!")
+		_, edge_rate, window_rate = self._get_edge_rates(shutter_values=shutter_values,
+		                                                 list_wavelength_requested=list_wavelength_requested,
+		                                                 margin=margin)
+		counts_needed = 1. / target_relative_uncertainty ** 2
+		with np.errstate(divide='ignore'):
+			return pd.DataFrame({'wavelength': np.asarray(list_wavelength_requested, dtype=float),
+			                     'run_time': counts_needed / edge_rate,
+			                     'window_run_time': counts_needed / window_rate})
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import namedtuple
+from functools import lru_cache
+
+# each detector is described by one data file of the DETECTORS_FOLDER, named <detector name>.txt. The header
+# lines '# key: value' declare the time bins allowed, the maximum number of rows of the shutter value file and
+# of bins per frame. The clock cycle table follows the header, or is read from the clock_cycle_file of the
+# header (path relative to the shutter_value_generator folder).
+DETECTORS_FOLDER = Path(__file__).parent / 'detectors'
+DETECTOR_FILE_EXTENSION = '.txt'
+DEFAULT_DETECTOR = 'mcp'
+LIST_CLOCK_CYCLE_COLUMNS = ['Clock', 'Divided', 'TimeBin(micros)', 'Range(ms)']
+LIST_REQUIRED_KEYS = ['time_bins', 'reference_time_bin', 'max_rows', 'max_bins_per_frame']
+
+ClockCycleTable = namedtuple('ClockCycleTable', ['clock', 'divider', 'time_bin', 'range_ms'])
+
+Detector = namedtuple('Detector', ['name',
+                                   'description',
+                                   'clock_cycle_table',
+                                   'time_bins',
+                                   'reference_time_bin',
+                                   'max_rows',
+                                   'max_bins_per_frame'])
+
+
+def make_clock_cycle_table(clock_cycle_data=None):
+	"""
+	:param clock_cycle_data: dataframe with the LIST_CLOCK_CYCLE_COLUMNS, the range (ms) is for the reference time bin
+	:return: ClockCycleTable of read-only arrays
+	"""
+	list_arrays = []
+	for _column in LIST_CLOCK_CYCLE_COLUMNS:
+		_array = np.array(clock_cycle_data[_column], dtype=int if _column == 'Divided' else float)
+		_array.flags.writeable = False
+		list_arrays.append(_array)
+	return ClockCycleTable(*list_arrays)
+
+
+def read_detector_file(filename=''):
+	"""
+	:param filename: detector data file
+	:return: Detector
+	"""
+	filename = Path(filename)
+	dict_header = {}
+	with open(filename, 'r') as f:
+		for _line in f:
+			if not _line.startswith('#'):
+				break
+			_key, _separator, _value = _line[1:].partition(':')
+			if _separator:
+				dict_header[_key.strip()] = _value.strip()
+
+	list_missing = [_key for _key in LIST_REQUIRED_KEYS if _key not in dict_header]
+	if list_missing:
+		raise ValueError("{} does not define {}".format(filename, ", ".join(list_missing)))
+
+	if 'clock_cycle_file' in dict_header:
+		clock_cycle_file = Path(__file__).parent / dict_header['clock_cycle_file']
+	else:
+		clock_cycle_file = filename
+	clock_cycle_data = pd.read_csv(clock_cycle_file, comment='#', header=0, names=LIST_CLOCK_CYCLE_COLUMNS)
+
+	return Detector(name=dict_header.get('name', filename.stem),
+	                description=dict_header.get('description', ''),
+	                clock_cycle_table=make_clock_cycle_table(clock_cycle_data=clock_cycle_data),
+	                time_bins=tuple(float(_time_bin) for _time_bin in dict_header['time_bins'].split(',')),
+	                reference_time_bin=float(dict_header['reference_time_bin']),
+	                max_rows=int(dict_header['max_rows']),
+	                max_bins_per_frame=int(dict_header['max_bins_per_frame']))
+
+
+def get_list_detectors():
+	"""
+	:return: names of the detectors with a data file in the DETECTORS_FOLDER
+	"""
+	return sorted(_file.stem for _file in DETECTORS_FOLDER.glob('*' + DETECTOR_FILE_EXTENSION))
+
+
+@lru_cache(maxsize=None)
+def get_detector(name=DEFAULT_DETECTOR):
+	"""
+	each detector file is parsed once, the Detector returned is shared and must not be modified
+
+	:param name: name of the detector (see get_list_detectors)
+	:return: Detector
+	"""
+	filename = DETECTORS_FOLDER / (str(name) + DETECTOR_FILE_EXTENSION)
+	if not filename.exists():
+		raise AttributeError("Unknown detector {}! Available detectors are {}".format(name, get_list_detectors()))
+	return read_detector_file(filename=filename)
+
+
+def get_bin_width(divider=0, time_bin=None, detector=None):
+	"""
+	:param divider: clock divider of the frame (value or array)
+	:param time_bin: time bin of the frame, one of the time_bins of the detector
+	:param detector: Detector
+	:return: width of the bins in micros
+	"""
+	return detector.clock_cycle_table.time_bin[np.asarray(divider, dtype=int)] * time_bin / \
+	       detector.reference_time_bin
+
+
+def get_range(detector=None):
+	"""
+	:return: longest frame (s) of each divider. The range does not depend on the time bin, a smaller time bin
+	records more and narrower bins in the same range
+	"""
+	return detector.clock_cycle_table.range_ms * 1e-3
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from shutter_value_generator.make_shutter_value_file import SourceFrequency
+from shutter_value_generator.make_shutter_value_file import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+from shutter_value_generator.core import convert_lambda_to_tof, convert_tof_to_lambda, get_tof_frames
+
+LIST_CONSTRAINTS = ['within_chopper_range',
+                    'within_frame_span',
+                    'above_minimum_measurable',
+                    'within_frame_margin']
+
+
+class Feasibility:
+
+	def __init__(self, detector_sample_distance=None,
+	             detector_offset=None,
+	             source_frequency=SourceFrequency.sixty_hertz,
+	             epics_chopper_wavelength_range=None,
+	             margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:param detector_sample_distance: in m
+		:param detector_offset: in micros
+		:param source_frequency: 60 or 30 Hz
+		:param epics_chopper_wavelength_range: [min, max] in Angstroms, not checked if None
+		:param margin: Angstroms each side of the edge that must be measured
+		"""
+		if detector_sample_distance is None:
+			raise AttributeError("define a detector sample distance in meters!")
+		if detector_offset is None:
+			raise AttributeError("define a detector offset in micros!")
+
+		self.detector_sample_distance = detector_sample_distance
+		self.detector_offset = detector_offset
+		self.source_frequency = source_frequency
+		self.epics_chopper_wavelength_range = epics_chopper_wavelength_range
+		self.margin = margin
+
+	def convert_lambda_to_tof(self, wavelength):
+		"""
+		:param wavelength: array in Angstroms
+		:return: array in s
+		"""
+		return convert_lambda_to_tof(list_wavelength=wavelength, detector_offset=self.detector_offset,
+		                             detector_sample_distance=self.detector_sample_distance, output_units='s')
+
+	@staticmethod
+	def is_within_chopper_range(wavelength=None, epics_chopper_wavelength_range=None,
+	                            margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		wavelength = np.asarray(wavelength, dtype=float)
+		if epics_chopper_wavelength_range is None:
+			return np.ones(wavelength.shape, dtype=bool)
+		return ((wavelength - margin) >= epics_chopper_wavelength_range[0]) & \
+		       ((wavelength + margin) <= epics_chopper_wavelength_range[1])
+
+	@staticmethod
+	def find_frame_index(tof_left=None, tof_right=None, list_tof_frames=None):
+		"""
+		:param tof_left: array of left edges of the windows (s)
+		:param tof_right: array of right edges of the windows (s)
+		:param list_tof_frames: [[start, stop], ...] sorted by start (s)
+		:return: index of the frame containing each window, -1 when the window is not inside one frame
+		"""
+		list_tof_frames = np.atleast_2d(np.asarray(list_tof_frames, dtype=float))
+		frame_index = np.searchsorted(list_tof_frames[:, 0], tof_left, side='right') - 1
+		inside = (frame_index >= 0) & (tof_right <= list_tof_frames[np.clip(frame_index, 0, None), 1])
+		return np.where(inside, frame_index, -1)
+
+	def get_default_tof_frames(self):
+		return get_tof_frames(source_frequency=self.source_frequency)
+
+	def get_minimum_measurable_lambda(self):
+		"""
+		:return: wavelength (Angstroms) reaching the detector when it starts recording (tof = 0)
+		"""
+		return convert_tof_to_lambda(tof=0, detector_offset=self.detector_offset,
+		                             detector_sample_distance=self.detector_sample_distance)
+
+	def run(self, list_wavelength_requested=None, list_tof_frames=None):
+		"""
+		evaluate all the requested wavelength against all the constraints at once
+
+		:param list_wavelength_requested: Bragg edges in Angstroms
+		:param list_tof_frames: frames of the plan [[start, stop], ...] in s. The frame margin is not
+		checked if None
+		:return: dataframe with one row per requested wavelength, one boolean column per constraint
+		"""
+		wavelength = np.asarray(list_wavelength_requested, dtype=float)
+		tof = self.convert_lambda_to_tof(wavelength)
+		tof_left = self.convert_lambda_to_tof(wavelength - self.margin)
+		tof_right = self.convert_lambda_to_tof(wavelength + self.margin)
+
+		# the edge and its margin must be inside one frame of the source, not across a readout gap
+		within_frame_span = Feasibility.find_frame_index(tof_left=tof_left,
+		                                                 tof_right=tof_right,
+		                                                 list_tof_frames=self.get_default_tof_frames()) >= 0
+		above_minimum_measurable = (wavelength - self.margin) >= self.get_minimum_measurable_lambda()
+		within_chopper_range = Feasibility.is_within_chopper_range(
+				wavelength=wavelength,
+				epics_chopper_wavelength_range=self.epics_chopper_wavelength_range,
+				margin=self.margin)
+
+		if list_tof_frames is None:
+			frame_index = np.full(wavelength.shape, -1)
+			within_frame_margin = np.ones(wavelength.shape, dtype=bool)
+		else:
+			list_tof_frames = np.atleast_2d(np.asarray(list_tof_frames, dtype=float))
+			list_tof_frames = list_tof_frames[np.argsort(list_tof_frames[:, 0])]
+			frame_index = Feasibility.find_frame_index(tof_left=tof_left,
+			                                           tof_right=tof_right,
+			                                           list_tof_frames=list_tof_frames)
+			within_frame_margin = frame_index >= 0
+
+		report = pd.DataFrame({'wavelength': wavelength,
+		                       'tof': tof,
+		                       'frame_index': frame_index,
+		                       'within_chopper_range': within_chopper_range,
+		                       'within_frame_span': within_frame_span,
+		                       'above_minimum_measurable': above_minimum_measurable,
+		                       'within_frame_margin': within_frame_margin})
+		report['is_feasible'] = report[LIST_CONSTRAINTS].all(axis=1)
+		return report
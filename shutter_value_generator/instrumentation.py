@@ -0,0 +1,193 @@
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from pathlib import Path
+from collections import OrderedDict
+
+PROFILE_FILE_NAME = "shutter_value_profile.txt"
+MEMORY_PROFILE_FILE_NAME = "shutter_value_memory.txt"
+METRICS_FILE_NAME = "shutter_value_metrics.prom"
+METRIC_PREFIX = "shutter_value"
+
+
+class InMemorySink:
+	"""
+	aggregates the spans (number of calls, total, min and max duration in s) and counters
+	"""
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.spans = OrderedDict()
+		self.counters = OrderedDict()
+
+	def record_span(self, name='', duration=0):
+		with self.lock:
+			_span = self.spans.setdefault(name, {'count': 0, 'total': 0., 'min': duration, 'max': duration})
+			_span['count'] += 1
+			_span['total'] += duration
+			_span['min'] = min(_span['min'], duration)
+			_span['max'] = max(_span['max'], duration)
+
+	def record_count(self, name='', value=1):
+		with self.lock:
+			self.counters[name] = self.counters.get(name, 0) + value
+
+	def reset(self):
+		with self.lock:
+			self.spans.clear()
+			self.counters.clear()
+
+
+class PrometheusTextSink(InMemorySink):
+	"""
+	in memory aggregator that can be dumped in the Prometheus text format
+	"""
+
+	def dump(self):
+		lines = []
+		with self.lock:
+			if self.spans:
+				lines.append("# TYPE {}_span_seconds summary".format(METRIC_PREFIX))
+				for _name, _span in self.spans.items():
+					lines.append('{}_span_seconds_count{{stage="{}"}} {}'.format(METRIC_PREFIX, _name, _span['count']))
+					lines.append('{}_span_seconds_sum{{stage="{}"}} {!r}'.format(METRIC_PREFIX, _name, _span['total']))
+			for _name, _value in self.counters.items():
+				lines.append("# TYPE {}_{}_total counter".format(METRIC_PREFIX, _name))
+				lines.append("{}_{}_total {}".format(METRIC_PREFIX, _name, _value))
+		return "\n".join(lines) + "\n"
+
+	def write(self, filename=''):
+		with open(filename, 'w') as f:
+			f.write(self.dump())
+
+
+class JsonLinesSink:
+	"""
+	writes one JSON line per span and counter increment
+	"""
+
+	def __init__(self, filename=''):
+		self.lock = threading.Lock()
+		self.file = open(filename, 'a')
+
+	def _write(self, record):
+		with self.lock:
+			self.file.write(json.dumps(record) + "\n")
+			self.file.flush()
+
+	def record_span(self, name='', duration=0):
+		self._write({'type': 'span', 'name': name, 'duration': duration, 'time': time.time()})
+
+	def record_count(self, name='', value=1):
+		self._write({'type': 'count', 'name': name, 'value': value, 'time': time.time()})
+
+	def close(self):
+		self.file.close()
+
+
+class _NullSpan:
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		return False
+
+
+class _Span:
+
+	__slots__ = ['sink', 'name', 'start']
+
+	def __init__(self, sink, name):
+		self.sink = sink
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *args):
+		self.sink.record_span(name=self.name, duration=time.perf_counter() - self.start)
+		return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Instrumentation:
+	"""
+	disabled until a sink is set, spans and counters are then a single attribute check
+	"""
+
+	def __init__(self):
+		self.sink = None
+
+	def span(self, name=''):
+		sink = self.sink
+		if sink is None:
+			return NULL_SPAN
+		return _Span(sink, name)
+
+	def count(self, name='', value=1):
+		sink = self.sink
+		if sink is not None:
+			sink.record_count(name=name, value=value)
+
+
+INSTRUMENTATION = Instrumentation()
+
+
+def enable_instrumentation(sink=None):
+	"""
+	:param sink: InMemorySink, PrometheusTextSink, JsonLinesSink or any object with record_span and
+	record_count methods
+	:return: the sink
+	"""
+	INSTRUMENTATION.sink = sink
+	return sink
+
+
+def disable_instrumentation():
+	INSTRUMENTATION.sink = None
+
+
+def span(name=''):
+	return INSTRUMENTATION.span(name=name)
+
+
+def count(name='', value=1):
+	INSTRUMENTATION.count(name=name, value=value)
+
+
+def run_with_profile(function=None, output_folder='./', number_of_memory_lines=25):
+	"""
+	run the function under cProfile and tracemalloc and write both reports in the output folder
+
+	:param function: called without arguments
+	:param output_folder: folder of the PROFILE_FILE_NAME and MEMORY_PROFILE_FILE_NAME reports
+	:param number_of_memory_lines: number of allocation sites in the memory report
+	:return: what the function returns
+	"""
+	profile = cProfile.Profile()
+	tracemalloc.start()
+	try:
+		result = profile.runcall(function)
+		snapshot = tracemalloc.take_snapshot()
+		current, peak = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+
+	stream = io.StringIO()
+	pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats()
+	with open(Path(output_folder) / PROFILE_FILE_NAME, 'w') as f:
+		f.write(stream.getvalue())
+
+	with open(Path(output_folder) / MEMORY_PROFILE_FILE_NAME, 'w') as f:
+		f.write("current: {} bytes, peak: {} bytes\n".format(current, peak))
+		for _statistic in snapshot.statistics('lineno')[:number_of_memory_lines]:
+			f.write("{}\n".format(_statistic))
+	return result
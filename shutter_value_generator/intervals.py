@@ -0,0 +1,104 @@
+import numpy as np
+
+# intervals are arrays of [start, stop] rows, int64 (clock ticks, exact) or float. The operations return them
+# sorted, disjoint and without empty interval (stop > start). Every operation sorts the boundaries once, O(n log n).
+
+
+def _as_array(intervals=None):
+	"""
+	:return: int64 array (n, 2) for integer intervals (clock ticks), float array (n, 2) otherwise
+	"""
+	intervals = np.asarray(intervals)
+	if not np.issubdtype(intervals.dtype, np.integer):
+		intervals = intervals.astype(float)
+	return intervals.reshape(-1, 2)
+
+
+def make_intervals(intervals=None):
+	"""
+	:param intervals: [[start, stop], ...], in any order, may overlap or be empty
+	:return: array (n, 2) of the non empty intervals sorted by start, int64 for integer intervals, float otherwise
+	"""
+	intervals = _as_array(intervals)
+	intervals = intervals[intervals[:, 1] > intervals[:, 0]]
+	return intervals[np.argsort(intervals[:, 0], kind='stable')]
+
+
+def _sweep(list_intervals=None, list_weight=None, predicate=None):
+	"""
+	walk along the boundaries of all the intervals, each interval adds its weight to the level between its start
+	and stop
+
+	:param list_intervals: list of interval arrays
+	:param list_weight: weight of each array
+	:param predicate: function of the level array, True where the result is inside
+	:return: merged intervals where predicate(level) is True
+	"""
+	list_position = []
+	list_delta = []
+	for _intervals, _weight in zip(list_intervals, list_weight):
+		_intervals = make_intervals(_intervals)
+		list_position += [_intervals[:, 0], _intervals[:, 1]]
+		list_delta += [np.full(len(_intervals), _weight), np.full(len(_intervals), -_weight)]
+	position = np.concatenate(list_position)
+	delta = np.concatenate(list_delta)
+	if len(position) == 0:
+		return np.zeros((0, 2), dtype=position.dtype)
+
+	order = np.argsort(position, kind='stable')
+	position = position[order]
+	level = np.cumsum(delta[order])
+
+	# segment i goes from position i to position i + 1 at level i
+	is_inside = predicate(level[:-1]) & (position[1:] > position[:-1])
+	segments = np.column_stack([position[:-1][is_inside], position[1:][is_inside]])
+	return merge(segments)
+
+
+def merge(intervals=None, min_gap=0):
+	"""
+	:param intervals: [[start, stop], ...]
+	:param min_gap: intervals separated by less than min_gap are merged (touching intervals are always merged)
+	:return: union of the intervals
+	"""
+	intervals = make_intervals(intervals)
+	if len(intervals) == 0:
+		return intervals
+	stop = np.maximum.accumulate(intervals[:, 1])
+	gap = intervals[1:, 0] - stop[:-1]
+	is_new = np.concatenate([[True], (gap >= min_gap) if min_gap > 0 else (gap > 0)])
+	index_new = np.flatnonzero(is_new)
+	return np.column_stack([intervals[index_new, 0], np.maximum.reduceat(stop, index_new)])
+
+
+def union(*list_intervals):
+	"""
+	:return: tof covered by at least one of the interval arrays
+	"""
+	# the empty arrays do not take part in the type of the result
+	list_intervals = [_intervals for _intervals in map(_as_array, list_intervals) if len(_intervals) > 0]
+	return merge(np.concatenate(list_intervals + [np.zeros((0, 2), dtype=np.result_type(*list_intervals, np.int64))]))
+
+
+def intersection(intervals_a=None, intervals_b=None):
+	"""
+	:return: tof covered by both interval arrays
+	"""
+	return _sweep(list_intervals=[merge(intervals_a), merge(intervals_b)], list_weight=[1, 2],
+	              predicate=lambda level: level == 3)
+
+
+def difference(intervals_a=None, intervals_b=None):
+	"""
+	:return: tof covered by intervals_a and not by intervals_b
+	"""
+	return _sweep(list_intervals=[merge(intervals_a), merge(intervals_b)], list_weight=[1, 2],
+	              predicate=lambda level: level == 1)
+
+
+def get_gaps(intervals=None):
+	"""
+	:return: the intervals between consecutive intervals (tof not covered, inside the span of the intervals)
+	"""
+	intervals = merge(intervals)
+	return make_intervals(np.column_stack([intervals[:-1, 1], intervals[1:, 0]]))
@@ -1,44 +1,18 @@
 import numpy as np
-import pandas as pd
 from pathlib import Path
 from collections import OrderedDict
 
-CLOCK_CYCLE_FILE = 'clock_cycle.txt'
-SHUTTER_VALUE_FILENAME = "ShutterValues.txt"
-
-MN = 1.674927471e-27  # kg - neutron mass
-H = 6.62607004e-34  # J s - Planck constant
-COEFF = (H / MN) * 1e6
-
-TOF_FRAMES = [[1e-6, 2.5e-3],
-              [2.9e-3, 5.8e-3],
-              [6.2e-3, 15.9e-3]]
-
-TOF_FRAMES_30_HZ = [[1e-6, 2.5e-3],
-				   [2.9e-3, 5.8e-3],
-				   [6.2e-3, 15.9e-3],
-				   [16.3e-3, 25.9e-3],
-				   [26.3e-3, 31.8e-3],
-]
-
-DEFAULT_list_lambda_dead_time = [np.mean([TOF_FRAMES[0][1], TOF_FRAMES[1][0]]),
-                                  np.mean([TOF_FRAMES[1][1], TOF_FRAMES[2][0]])]
-MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME = 0.3  # Angstroms
-MIN_LAMBDA_PEAK_VALUE_INTERVAL = 0.3  # Angstroms
-MIN_TOF_BETWEEN_FRAMES = TOF_FRAMES[1][0] - TOF_FRAMES[0][1]
-
-RESONANCE_SHUTTER_VALUES = "1e-6\t320e-6\t3\t0.16"
-DEFAULT_SHUTTER_VALUES = "1e-6\t2.5e-3\t5\t10.24\n2.9e-3\t5.8e-3\t6\t10.24\n6.2e-3\t15.9e-3\t7\t10.24"
-
-
-class TimeBinMicros:
-	ten_twenty_four = 10.24
-	five_twelve = 5.12
-
-
-class SourceFrequency:
-	sixty_hertz = 60
-	thirty_hertz = 30
+from shutter_value_generator.instrumentation import span
+from shutter_value_generator.writer import write_file_atomically, write_to_destinations
+from shutter_value_generator.bin_lookup import make_bin_lookup, write_bin_lookup, get_bin_lookup_file_name
+from shutter_value_generator.bin_lookup import read_shutter_values_string
+from shutter_value_generator import core
+from shutter_value_generator.core import CLOCK_CYCLE_FILE, SHUTTER_VALUE_FILENAME, MN, H, COEFF
+from shutter_value_generator.core import TOF_FRAMES, TOF_FRAMES_30_HZ, DEFAULT_list_lambda_dead_time
+from shutter_value_generator.core import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME, MIN_LAMBDA_PEAK_VALUE_INTERVAL
+from shutter_value_generator.core import MIN_TOF_BETWEEN_FRAMES, RESONANCE_SHUTTER_VALUES, DEFAULT_SHUTTER_VALUES
+from shutter_value_generator.core import TimeBinMicros, SourceFrequency, read_clock_cycle_table
+from shutter_value_generator.detector import DEFAULT_DETECTOR, get_detector, get_bin_width, get_list_detectors
 
 
 class MakeShutterValueFile:
@@ -49,10 +23,16 @@ class MakeShutterValueFile:
 	             detector_sample_distance=None,
 	             detector_offset=None,
 	             resonance_mode=False,
+	             list_resonance_energy=None,
+	             list_resonance_isotopes=None,
 	             default_mode=False,
 				 time_bin=TimeBinMicros.ten_twenty_four,
 	             epics_chopper_wavelength_range=None,
+				 choppers=None,
 				 no_output_file=False,
+				 list_extra_output_folder=None,
+	             detector=DEFAULT_DETECTOR,
+	             bin_lookup=False,
 	             verbose=False):
 		"""
 		:param output_folder:
@@ -62,9 +42,17 @@ class MakeShutterValueFile:
 		:param detector_sample_distance: in m
 		:param detector_offset:  in micros
 		:param resonance_mode: boolean
-		:param time_bin: in micros (default 10.24 micros) 
+		:param list_resonance_energy: resonance energies (eV) to measure in resonance mode
+		:param list_resonance_isotopes: or isotopes (ex: ['U-238']) to look up in the bundled resonance table
+		:param time_bin: in micros (default 10.24 micros), one of the time bins of the detector
 		:param epics_chopper_wavelength_range: [value1, value2]
+		:param choppers: ChopperCascade, when provided the wavelength range is derived from the chopper settings
 		:param no_output_file: boolean (False by default) if True, will not create the output file
+		:param list_extra_output_folder: other folders (instrument share, archive, backup...) where the output file
+		is copied, all written at the same time
+		:param detector: name of the detector (clock cycle table, time bins and limits), see get_list_detectors
+		:param bin_lookup: boolean (False by default) if True, also write the tof and lambda of every bin next to
+		the output file (see bin_lookup.make_bin_lookup)
 		:param verbose: boolean (False by default) if True, will output in the stdout the content of the output file
 		"""
 		if output_folder is None:
@@ -73,55 +61,48 @@ class MakeShutterValueFile:
 		if resonance_mode and default_mode:
 			raise AttributeError("You can not have default and resonance mode turned on at the same time!")
 
-		if resonance_mode or default_mode:
-			pass
-		else:
-			if detector_sample_distance is None:
-				raise AttributeError("define a detector sample distance in meters!")
-			self.detector_sample_distance = detector_sample_distance
-
-			if detector_offset is None:
-				raise AttributeError("define a detector offset in micros!")
-
-			if epics_chopper_wavelength_range is None:
-				raise AttributeError(
-						"Provides the maximum range of wavelength in Angstroms the chopper are set up for! ["
-						"min_value, max_value]")
-			if not type(epics_chopper_wavelength_range) is list:
-				raise AttributeError(
-						"Provides the maximum range of wavelength in Angstroms the chopper are set up for! ["
-						"min_value, max_value]")
-			if len(epics_chopper_wavelength_range) != 2:
-				raise AttributeError(
-						"Provides the maximum range of wavelength in Angstroms the chopper are set up for! ["
-						"min_value, max_value]")
-
-			if not (time_bin == TimeBinMicros.ten_twenty_four or time_bin == TimeBinMicros.five_twelve):
-				raise AttributeError("Time bin must be 10.24 or 5.12 micros")
-
-			# _min_tof_peak_value_from_edge_of_frame = MakeShutterValueFile.convert_lambda_to_tof(
-			# 		list_wavelength=[MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME],
-			# 		detector_offset=detector_offset,
-			# 		detector_sample_distance=self.detector_sample_distance)
-			# self.min_tof_peak_value_from_edge_of_frame = _min_tof_peak_value_from_edge_of_frame[0]
+		if bin_lookup and ((detector_sample_distance is None) or (detector_offset is None)):
+			raise AttributeError("The bin lookup table needs the detector sample distance and offset!")
+
+		if (not (resonance_mode or default_mode)) and (epics_chopper_wavelength_range is None) and \
+				(choppers is not None):
+			epics_chopper_wavelength_range = choppers.get_wavelength_range()
+
+		# immutable record of the plan parameters, the plans are computed from it by the functions of core
+		self.config = core.make_plan_config(source_frequency=source_frequency,
+		                                    detector_sample_distance=detector_sample_distance,
+		                                    detector_offset=detector_offset,
+		                                    resonance_mode=resonance_mode,
+		                                    list_resonance_energy=list_resonance_energy,
+		                                    list_resonance_isotopes=list_resonance_isotopes,
+		                                    default_mode=default_mode,
+		                                    time_bin=time_bin,
+		                                    epics_chopper_wavelength_range=epics_chopper_wavelength_range,
+		                                    detector=detector)
 
 		self.resonance_mode = resonance_mode
+		self.list_resonance_energy = list_resonance_energy
+		self.list_resonance_isotopes = list_resonance_isotopes
 		self.default_mode = default_mode
 		self.output_folder = output_folder
 		self.detector_sample_distance = detector_sample_distance
 		self.detector_offset = detector_offset
 		self.epics_chopper_wavelength_range = epics_chopper_wavelength_range
+		self.choppers = choppers
 		self.verbose = verbose
 		self.time_bin = time_bin
 		self.no_output_file = no_output_file
+		self.list_extra_output_folder = list_extra_output_folder
 		self.source_frequency = source_frequency
+		self.detector = detector
+		self.bin_lookup = bin_lookup
 
 		if output_file_name is None:
 			self.output_file_name = SHUTTER_VALUE_FILENAME
 		else:
 			self.output_file_name = output_file_name
 
-		# self.minimum_measurable_lambda = self.calculate_minimum_measurable_lambda()
+		self.minimum_measurable_lambda = self.calculate_minimum_measurable_lambda()
 
 	def run(self, list_lambda_dead_time=None):
 		"""
@@ -129,111 +110,77 @@ class MakeShutterValueFile:
 		:param list_lambda_dead_time: Ideally the user will provide a minimum of 2 or 3 equally spaced in the
 		full range lambda. Those lambda will corresponds to the dead time of the MCP. if 2 lambda are not at
 		least MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME (0.3 Angstroms) from each other, error is raised.
-		:return:
+		:return: the shutter values string
 		"""
 		filename = Path(self.output_folder) / self.output_file_name
-		if self.resonance_mode:
-			shutter_values_string = RESONANCE_SHUTTER_VALUES
-			MakeShutterValueFile.make_ascii_file_from_string(text=shutter_values_string,
-			                                                filename=filename)
-		elif self.default_mode or (list_lambda_dead_time is None):
-			shutter_values_string = DEFAULT_SHUTTER_VALUES
-			MakeShutterValueFile.make_ascii_file_from_string(text=shutter_values_string,
-			                                                filename=filename)
-		else:
-			# user needs to provide at least 2 dead_time_lambda
-			if not type(list_lambda_dead_time) is list:
-				raise ValueError("list_lambda_dead_time must be a list of at least 2 elements!")
-
-			if len(list_lambda_dead_time) < 2:
-				raise ValueError("list_lambda_dead_time should contain at least 2 dead lambda values!")
-
-
-			if MakeShutterValueFile.list_lambda_dead_time_too_close(list_lambda_dead_time=list_lambda_dead_time):
-				raise ValueError("Make sure the list of lambda dead time are at least {}Angstroms from each "
-				                 "other".format(MIN_LAMBDA_PEAK_VALUE_INTERVAL))
-
-			list_tof_dead_time = MakeShutterValueFile.convert_lambda_to_tof(list_wavelength=list_lambda_dead_time,
-			                                                                detector_offset=self.detector_offset,
-			                                                                detector_sample_distance=self.detector_sample_distance,
-			                                                                output_units='s')
-			self.list_tof_dead_time = list_tof_dead_time
-			list_tof_frames = self.make_list_tof_frames(list_tof_dead_time)
-			self.final_list_tof_frames = list_tof_frames
+		plan = core.compute_plan(config=self.config, list_lambda_dead_time=list_lambda_dead_time)
+		shutter_values_string = plan.shutter_values_string
+		if plan.list_tof_dead_time is not None:
+			self.list_tof_dead_time = list(plan.list_tof_dead_time)
+		if plan.list_tof_frames is not None:
+			self.final_list_tof_frames = [list(_tof_frame) for _tof_frame in plan.list_tof_frames]
+
+		if not self.no_output_file:
+			with span('file_writing'):
+				if self.list_extra_output_folder:
+					write_to_destinations(text=shutter_values_string,
+					                      list_output_folder=[self.output_folder] + list(self.list_extra_output_folder),
+					                      file_name=self.output_file_name)
+				else:
+					MakeShutterValueFile.make_ascii_file_from_string(text=shutter_values_string,
+					                                                filename=filename)
+				if self.bin_lookup:
+					lookup = make_bin_lookup(shutter_values=read_shutter_values_string(shutter_values_string),
+					                         detector_sample_distance=self.detector_sample_distance,
+					                         detector_offset=self.detector_offset,
+					                         detector=self.detector)
+					write_bin_lookup(lookup=lookup,
+					                 filename=Path(self.output_folder) / get_bin_lookup_file_name(self.output_file_name))
+		if self.verbose:
+			print(shutter_values_string)
+		return shutter_values_string
 
-			shutter_values_string = self.make_shutter_values_string(list_tof_frames=list_tof_frames)
+	def is_resonance_plan_defined(self):
+		return core.is_resonance_plan_defined(config=self.config)
 
-			if not self.no_output_file:
-				MakeShutterValueFile.make_ascii_file_from_string(text=shutter_values_string,
-																filename=filename)
+	def make_resonance_shutter_values_string(self, list_lambda_dead_time=None):
+		"""
+		frames around the resonances of interest, followed by the Bragg edge frames defined by
+		list_lambda_dead_time if provided
 
-		if self.verbose:
-			print(shutter_values_string)
+		:param list_lambda_dead_time: lambda dead time of the Bragg edge part of the plan (optional)
+		:return: shutter values string
+		"""
+		plan = core.compute_resonance_plan(config=self.config, list_lambda_dead_time=list_lambda_dead_time)
+		self.final_list_tof_frames = [list(_tof_frame) for _tof_frame in plan.list_tof_frames]
+		return plan.shutter_values_string
 
 	def make_list_tof_frames(self, list_tof_dead_time):
-
-		if self.source_frequency == SourceFrequency.sixty_hertz:
-			_TOF_FRAMES = TOF_FRAMES
-		else:
-			_TOF_FRAMES = TOF_FRAMES_30_HZ
-
-		list_tof_frames = []
-		for _index, _tof_dead_time in enumerate(list_tof_dead_time):
-
-			if _index == 0:
-				left_tof = _TOF_FRAMES[0][0]
-				right_tof = _tof_dead_time - MIN_TOF_BETWEEN_FRAMES
-				list_tof_frames.append([left_tof, right_tof])
-
-			if _index == (len(list_tof_dead_time) - 1):
-				left_tof = _tof_dead_time + MIN_TOF_BETWEEN_FRAMES
-				right_tof = _TOF_FRAMES[-1][1]
-				if left_tof > right_tof:
-					break
-				
-				list_tof_frames.append([left_tof, right_tof])
-				break
-
-			left_tof = _tof_dead_time + MIN_TOF_BETWEEN_FRAMES
-			right_tof = list_tof_dead_time[_index + 1] - MIN_TOF_BETWEEN_FRAMES
-			list_tof_frames.append([left_tof, right_tof])
-		return list_tof_frames
+		list_tof_frames = core.make_list_tof_frames(list_tof_dead_time=list_tof_dead_time,
+		                                            source_frequency=self.source_frequency)
+		return [list(_tof_frame) for _tof_frame in list_tof_frames]
 
 	def make_shutter_values_string(self, list_tof_frames=None):
-		shutter_value_array = []
-		for _tof_frame in list_tof_frames:
-			_col_1 = _tof_frame[0]
-			_col_2 = _tof_frame[1]
-			_col_4 = self.time_bin
-			_col_3 = self.get_above_closest_divided(delta_tof=_tof_frame[1] - _tof_frame[0])
-			shutter_value_array.append("{}\t{}\t{}\t{}".format(_col_1, _col_2, _col_3, _col_4))
-		return "\n".join(shutter_value_array)
+		shutter_values_string, _ = core.make_shutter_values_string(list_tof_frames=list_tof_frames,
+		                                                           time_bin=self.time_bin,
+		                                                           detector=self.detector)
+		return shutter_values_string
 
 	@staticmethod
-	def get_above_closest_divided(delta_tof=0):
+	def get_above_closest_divided(delta_tof=0, time_bin=TimeBinMicros.ten_twenty_four, detector=DEFAULT_DETECTOR):
 		"""
+		smallest divider (finest bins) whose range can hold the frame, without more than max_bins_per_frame bins
+
 		:param delta_tof: in s
-		:param clock_cycle_data:
-		:return:
+		:param time_bin: 10.24 or 5.12 micros for the MCP, the range of the clock cycle table does not depend on it
+		:param detector: name of the detector
+		:return: divider, -1 if the frame is longer than the range of the largest divider
 		"""
-		delta_tof_ms = delta_tof * 1e3    # ms
-		clock_cycle_data = MakeShutterValueFile.get_clock_cycle_table()
-		clock_array = np.array(clock_cycle_data['Clock'])
-
-		where_delta_is_less_or_equal_than = np.where(delta_tof_ms <= clock_array)
-
-		if where_delta_is_less_or_equal_than:
-			index = where_delta_is_less_or_equal_than[0][-1]
-			return np.array(clock_cycle_data['Divided'])[index]
-		return -1
+		return core.get_above_closest_divided(delta_tof=delta_tof, time_bin=time_bin, detector=detector)
 
 	@staticmethod
 	def list_lambda_dead_time_too_close(list_lambda_dead_time=None):
-		lambda_offset = np.array(list_lambda_dead_time[1:]) - np.array(list_lambda_dead_time[0:-1])
-		for _offset in lambda_offset:
-			if _offset <= MIN_LAMBDA_PEAK_VALUE_INTERVAL:
-				return True
-		return False
+		return core.list_lambda_dead_time_too_close(list_lambda_dead_time=list_lambda_dead_time)
 
 	def make_sure_list_wavelength_requested_can_be_measure(self, list_wavelength_requested=None):
 		"""
@@ -244,36 +191,37 @@ class MakeShutterValueFile:
 		:param list_wavelength_requested:
 		:return:
 		"""
-		if self.source_frequency == SourceFrequency.sixty_hertz:
-			min_tof_from_default_time_spectra = TOF_FRAMES[0][0]
-			max_tof_from_default_time_spectra = TOF_FRAMES[-1][1]
-		else:
-			min_tof_from_default_time_spectra = TOF_FRAMES_30_HZ[0][0]
-			max_tof_from_default_time_spectra = TOF_FRAMES_30_HZ[-1][1]
-
-		min_lambda = self.convert_tof_to_lambda(tof=min_tof_from_default_time_spectra,
-		                                        detector_offset=self.detector_offset,
-		                                        detector_sample_distance=self.detector_sample_distance)
-		max_lambda = self.convert_tof_to_lambda(tof=max_tof_from_default_time_spectra,
-		                                        detector_offset=self.detector_offset,
-		                                        detector_sample_distance=self.detector_sample_distance)
+		report = self.make_feasibility_report(list_wavelength_requested=list_wavelength_requested)
 
-		for _lambda in list_wavelength_requested:
+		# make sure lambda is above minimum lambda we can measure with the detector offset defined
+		if not report['above_minimum_measurable'].all():
+			raise ValueError("Lambda too small to too close to start to be measurable")
 
-			# make sure lambda is above minimum lambda we can measure with the detector offset defined
-			if _lambda - MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME < self.minimum_measurable_lambda:
-				raise ValueError("Lambda too small to too close to start to be measurable")
+		# make sure lambda and its margin are inside one frame of the source, not in a readout gap
+		if not report['within_frame_span'].all():
+			raise ValueError("Time spectra does not allow to get this lambda: {}".format(
+					list(report['wavelength'][~report['within_frame_span']])))
 
-			# make sure lambda is within min and max tof defined in default shutter value
-			if _lambda < min_lambda:
-				raise ValueError("Time spectra minimum value does not allow to get this lambda: {}".format(_lambda))
+	def make_feasibility_report(self, list_wavelength_requested=None, list_tof_frames=None):
+		"""
+		:param list_wavelength_requested: Bragg edges in Angstroms
+		:param list_tof_frames: frames [[start, stop], ...] in s, the frame margin is checked when provided
+		:return: dataframe with one row per requested wavelength and one boolean column per constraint
+		"""
+		from shutter_value_generator.feasibility import Feasibility
 
-			if _lambda > max_lambda:
-				raise ValueError("Time spectra maximum value does not allow to get this lambda: {}".format(_lambda))
+		o_feasibility = Feasibility(detector_sample_distance=self.detector_sample_distance,
+		                            detector_offset=self.detector_offset,
+		                            source_frequency=self.source_frequency,
+		                            epics_chopper_wavelength_range=self.epics_chopper_wavelength_range)
+		return o_feasibility.run(list_wavelength_requested=list_wavelength_requested,
+		                         list_tof_frames=list_tof_frames)
 
 	def calculate_minimum_measurable_lambda(self):
-		if self.detector_sample_distance and self.detector_offset:
-			return self.detector_offset * COEFF / self.detector_sample_distance
+		if (self.detector_sample_distance is not None) and (self.detector_offset is not None):
+			return self.convert_tof_to_lambda(tof=0,
+			                                  detector_offset=self.detector_offset,
+			                                  detector_sample_distance=self.detector_sample_distance)
 
 	def convert_lambda_dict_to_tof(self, dict_list_lambda_requested=None, output_units='micros'):
 		dict_list_tof_requested = OrderedDict()
@@ -302,17 +250,33 @@ class MakeShutterValueFile:
 		:return:
 		lambda in Angstroms
 		"""
-		return (detector_offset + tof) * COEFF / (detector_sample_distance * 100)
+		return core.convert_tof_to_lambda(tof=tof, detector_offset=detector_offset,
+		                                  detector_sample_distance=detector_sample_distance)
 
 	@staticmethod
 	def get_clock_cycle_table():
-		full_file_name = Path(__file__).parent / CLOCK_CYCLE_FILE
-		assert Path(full_file_name).exists()
+		return read_clock_cycle_table(core.get_clock_cycle_file_name())
+
+	@staticmethod
+	def get_time_bin_width(divider=0, time_bin=TimeBinMicros.ten_twenty_four, detector=DEFAULT_DETECTOR):
+		"""
+		width of the bins recorded by the MCP in a frame. The clock cycle table gives the width for the
+		10.24 micros time bin, 5.12 micros halves it.
 
-		clock_cycle_data = pd.read_csv(full_file_name,
-		                               names=['Clock', 'Divided', 'TimeBin(micros)', 'Range(ms)'],
-		                               skiprows=1)
-		return clock_cycle_data
+		:param divider: clock divider of the frame (value or array)
+		:param time_bin: time bin of the frame (10.24 or 5.12 micros)
+		:param detector: name of the detector
+		:return: width of the bins in micros
+		"""
+		return get_bin_width(divider=divider, time_bin=time_bin, detector=get_detector(detector))
+
+	@staticmethod
+	def read_shutter_values_file(filename=''):
+		"""
+		:param filename: shutter value file (start(s), stop(s), divider, time bin per row)
+		:return: 2D array with one row per frame
+		"""
+		return np.loadtxt(filename, ndmin=2)
 
 	@staticmethod
 	def convert_lambda_to_tof(list_wavelength=None,
@@ -328,28 +292,35 @@ class MakeShutterValueFile:
 		:param output_units: default in seconds but micros can be used
 		:return: the list of lambda in micros
 		"""
-		list_tof = []
-		for _lambda in list_wavelength:
-			_tof = _lambda * (detector_sample_distance * 100) / COEFF - detector_offset
-			if output_units == 's':
-				_tof *= 1e-6
-			list_tof.append(_tof)
-		return list_tof
+		return core.convert_lambda_to_tof(list_wavelength=list_wavelength,
+		                                  detector_offset=detector_offset,
+		                                  detector_sample_distance=detector_sample_distance,
+		                                  output_units=output_units).tolist()
 
 	@staticmethod
 	def make_ascii_file_from_string(text="", filename=''):
-		with open(filename, 'w') as f:
-			f.write(text)
+		write_file_atomically(text=text, filename=filename)
 
 	@staticmethod
 	def check_overlap_wavelength_requested_with_chopper_settings(list_wavelength_requested=None,
 	                                                             epics_chopper_wavelength_range=None):
-		for _wavelength_requested in list_wavelength_requested:
-			if ((_wavelength_requested - MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME) < epics_chopper_wavelength_range[
-				0]) or ((_wavelength_requested + MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME) >
-			            epics_chopper_wavelength_range[1]):
-				raise ValueError(
-						"One or more of the wavelength you defined won't allow to fully measure the Bragg Edge!")
+		from shutter_value_generator.feasibility import Feasibility
+
+		if not np.all(Feasibility.is_within_chopper_range(wavelength=list_wavelength_requested,
+		                                                  epics_chopper_wavelength_range=epics_chopper_wavelength_range)):
+			raise ValueError("One or more of the wavelength you defined won't allow to fully measure the Bragg Edge!")
+
+	def check_overlap_wavelength_requested_with_choppers(self, list_wavelength_requested=None):
+		"""
+		same check as check_overlap_wavelength_requested_with_chopper_settings but against the wavelength really
+		transmitted by the choppers (without the previous pulse overlap)
+		"""
+		if self.choppers is None:
+			raise AttributeError("No choppers defined!")
+		is_transmitted = self.choppers.is_wavelength_transmitted(list_wavelength_requested=list_wavelength_requested)
+		if not np.all(is_transmitted):
+			raise ValueError("The chopper settings won't allow to fully measure the Bragg Edge(s): {}".format(
+					list(np.asarray(list_wavelength_requested)[~is_transmitted])))
 
 	@staticmethod
 	def initialize_list_of_wavelength_requested_dictionary(list_wavelength_requested=None):
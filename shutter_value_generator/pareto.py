@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from shutter_value_generator.core import make_plan_config, compute_plan, convert_tof_to_lambda, SourceFrequency
+from shutter_value_generator.core import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+from shutter_value_generator.detector import DEFAULT_DETECTOR, get_detector, get_bin_width
+from shutter_value_generator.bin_lookup import read_shutter_values_string
+
+# metric name: True if larger is better
+DICT_METRICS = {'number_of_edges_covered': True,
+                'worst_edge_margin': True,
+                'mean_lambda_per_bin': False,
+                'total_number_of_bins': False}
+
+
+def stack_plans(list_shutter_values=None, detector=DEFAULT_DETECTOR):
+	"""
+	pad the plans to the same number of frames so that they can be scored together
+
+	:param list_shutter_values: list of plans, rows [start(s), stop(s), divider, time bin]
+	:param detector: name of the detector
+	:return: frames (plan, frame, [start, stop]) in s and bin_width (plan, frame) in s, nan for the padding
+	"""
+	_detector = get_detector(detector)
+	list_shutter_values = [np.atleast_2d(np.asarray(_shutter_values, dtype=float))
+	                       for _shutter_values in list_shutter_values]
+	max_number_of_frames = max([len(_shutter_values) for _shutter_values in list_shutter_values] + [1])
+	frames = np.full((len(list_shutter_values), max_number_of_frames, 2), np.nan)
+	bin_width = np.full((len(list_shutter_values), max_number_of_frames), np.nan)
+	for _index, _shutter_values in enumerate(list_shutter_values):
+		_number_of_frames = len(_shutter_values)
+		frames[_index, :_number_of_frames] = _shutter_values[:, 0:2]
+		bin_width[_index, :_number_of_frames] = get_bin_width(divider=_shutter_values[:, 2],
+		                                                      time_bin=_shutter_values[:, 3],
+		                                                      detector=_detector) * 1e-6
+	return frames, bin_width
+
+
+def get_pareto_front(metrics=None, list_maximize=None):
+	"""
+	:param metrics: array (candidate, metric)
+	:param list_maximize: for each metric, True if larger is better
+	:return: boolean array, True for the non-dominated candidates (only one of identical candidates is kept)
+	"""
+	costs = np.asarray(metrics, dtype=float) * np.where(list_maximize, -1, 1)
+	list_index = np.arange(len(costs))
+	# each pass removes every candidate dominated by the next candidate still in the front
+	next_index = 0
+	while next_index < len(costs):
+		is_kept = np.any(costs < costs[next_index], axis=1)
+		is_kept[next_index] = True
+		list_index = list_index[is_kept]
+		costs = costs[is_kept]
+		next_index = np.sum(is_kept[:next_index]) + 1
+	is_on_front = np.zeros(len(metrics), dtype=bool)
+	is_on_front[list_index] = True
+	return is_on_front
+
+
+class ParetoExplorer:
+
+	def __init__(self, detector_sample_distance=None,
+	             detector_offset=None,
+	             list_wavelength_requested=None,
+	             source_frequency=SourceFrequency.sixty_hertz,
+	             epics_chopper_wavelength_range=None,
+	             detector=DEFAULT_DETECTOR,
+	             margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:param detector_sample_distance: in m
+		:param detector_offset: in micros
+		:param list_wavelength_requested: Bragg edges in Angstroms the plans are scored on
+		:param source_frequency: 60 or 30 Hz
+		:param epics_chopper_wavelength_range: [min, max] in Angstroms, used to build the candidates
+		:param detector: name of the detector
+		:param margin: Angstroms each side of the edge that must be inside a frame for the edge to be covered
+		"""
+		if detector_sample_distance is None:
+			raise AttributeError("define a detector sample distance in meters!")
+		if detector_offset is None:
+			raise AttributeError("define a detector offset in micros!")
+		if list_wavelength_requested is None:
+			raise AttributeError("define the list of wavelength requested!")
+
+		self.detector_sample_distance = detector_sample_distance
+		self.detector_offset = detector_offset
+		self.list_wavelength_requested = np.asarray(list_wavelength_requested, dtype=float)
+		self.source_frequency = source_frequency
+		self.epics_chopper_wavelength_range = epics_chopper_wavelength_range
+		self.detector = detector
+		self.margin = margin
+
+	def convert_tof_to_lambda(self, tof=None):
+		return convert_tof_to_lambda(tof=tof, detector_offset=self.detector_offset,
+		                             detector_sample_distance=self.detector_sample_distance, input_units='s')
+
+	def make_candidates(self, list_list_lambda_dead_time=None, list_time_bin=None):
+		"""
+		:param list_list_lambda_dead_time: one list of lambda dead time (Angstroms) per candidate
+		:param list_time_bin: time bins (micros) tried for each of them, the first time bin of the detector if None
+		:return: dataframe with one row per valid candidate (list_lambda_dead_time, time_bin, shutter_values_string)
+		and the list of the rejected candidates with their error
+		"""
+		if list_time_bin is None:
+			list_time_bin = [get_detector(self.detector).time_bins[0]]
+		list_candidates = []
+		list_rejected = []
+		for _time_bin in list_time_bin:
+			config = make_plan_config(source_frequency=self.source_frequency,
+			                          detector_sample_distance=self.detector_sample_distance,
+			                          detector_offset=self.detector_offset,
+			                          time_bin=_time_bin,
+			                          epics_chopper_wavelength_range=self.epics_chopper_wavelength_range,
+			                          detector=self.detector)
+			for _list_lambda_dead_time in list_list_lambda_dead_time:
+				try:
+					plan = compute_plan(config=config, list_lambda_dead_time=list(_list_lambda_dead_time))
+				except ValueError as error:
+					list_rejected.append((tuple(_list_lambda_dead_time), _time_bin, str(error)))
+					continue
+				list_candidates.append({'list_lambda_dead_time': tuple(_list_lambda_dead_time),
+				                        'time_bin': _time_bin,
+				                        'shutter_values_string': plan.shutter_values_string})
+		return pd.DataFrame(list_candidates, columns=['list_lambda_dead_time', 'time_bin',
+		                                              'shutter_values_string']), list_rejected
+
+	def score(self, list_shutter_values=None):
+		"""
+		:param list_shutter_values: list of plans, rows [start(s), stop(s), divider, time bin]
+		:return: dataframe with one row per plan and one column per metric of DICT_METRICS
+		"""
+		frames, bin_width = stack_plans(list_shutter_values=list_shutter_values, detector=self.detector)
+		lambda_start = self.convert_tof_to_lambda(frames[..., 0])[..., np.newaxis]  # plan, frame, edge
+		lambda_stop = self.convert_tof_to_lambda(frames[..., 1])[..., np.newaxis]
+		wavelength = self.list_wavelength_requested
+
+		# distance of each edge to the closest end of each frame, negative outside of the frame
+		edge_margin = np.fmax.reduce(np.minimum(wavelength - lambda_start, lambda_stop - wavelength), axis=1,
+		                             initial=-np.inf)
+		number_of_edges_covered = np.sum(edge_margin >= self.margin, axis=1)
+		worst_edge_margin = np.min(edge_margin, axis=1, initial=np.inf)
+
+		number_of_bins = np.nan_to_num(np.ceil((frames[..., 1] - frames[..., 0]) / bin_width - 1e-9))
+		lambda_per_bin = np.nan_to_num(convert_tof_to_lambda(tof=bin_width, detector_offset=0,
+		                                                     detector_sample_distance=self.detector_sample_distance,
+		                                                     input_units='s'))
+		total_number_of_bins = number_of_bins.sum(axis=1)
+		with np.errstate(invalid='ignore'):
+			mean_lambda_per_bin = (number_of_bins * lambda_per_bin).sum(axis=1) / total_number_of_bins
+
+		return pd.DataFrame({'number_of_edges_covered': number_of_edges_covered,
+		                     'worst_edge_margin': worst_edge_margin,
+		                     'mean_lambda_per_bin': mean_lambda_per_bin,
+		                     'total_number_of_bins': total_number_of_bins.astype(int)})
+
+	def run(self, list_list_lambda_dead_time=None, list_time_bin=None):
+		"""
+		build, score and filter the candidates
+
+		:return: dataframe of the candidates on the Pareto front, sorted by number of edges covered then worst
+		edge margin
+		"""
+		candidates, _ = self.make_candidates(list_list_lambda_dead_time=list_list_lambda_dead_time,
+		                                     list_time_bin=list_time_bin)
+		if candidates.empty:
+			return candidates.reindex(columns=list(candidates.columns) + list(DICT_METRICS))
+		metrics = self.score(list_shutter_values=[read_shutter_values_string(_string)
+		                                          for _string in candidates['shutter_values_string']])
+		candidates = pd.concat([candidates, metrics], axis=1)
+		is_on_front = get_pareto_front(metrics=metrics[list(DICT_METRICS)].to_numpy(),
+		                               list_maximize=list(DICT_METRICS.values()))
+		return candidates[is_on_front].sort_values(['number_of_edges_covered', 'worst_edge_margin'],
+		                                           ascending=False).reset_index(drop=True)
+
+	@staticmethod
+	def save(front=None, filename=''):
+		"""
+		:param front: dataframe returned by run
+		:param filename: .npz (one array per column) or .csv file
+		"""
+		filename = Path(filename)
+		front = front.assign(list_lambda_dead_time=[",".join("{:g}".format(_value) for _value in _list)
+		                                            for _list in front['list_lambda_dead_time']])
+		if filename.suffix == '.npz':
+			np.savez(filename, **{_column: (front[_column].to_numpy().astype(str) if front[_column].dtype == object
+			                                else front[_column].to_numpy()) for _column in front.columns})
+		else:
+			front.to_csv(filename, index=False)
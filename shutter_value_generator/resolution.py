@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.core import convert_lambda_to_tof, convert_tof_to_lambda
+from shutter_value_generator.detector import DEFAULT_DETECTOR
+from shutter_value_generator.pareto import stack_plans
+
+ResolutionReport = namedtuple('ResolutionReport', ['frame_index',
+                                                   'delta_lambda',
+                                                   'relative_resolution',
+                                                   'number_of_bins_in_window'])
+
+
+class Resolution:
+
+	def __init__(self, detector_sample_distance=None, detector_offset=None, detector=DEFAULT_DETECTOR):
+		"""
+		:param detector_sample_distance: in m
+		:param detector_offset: in micros
+		:param detector: name of the detector that records the plans
+		"""
+		if detector_sample_distance is None:
+			raise AttributeError("define a detector sample distance in meters!")
+		if detector_offset is None:
+			raise AttributeError("define a detector offset in micros!")
+
+		self.detector_sample_distance = detector_sample_distance
+		self.detector_offset = detector_offset
+		self.detector = detector
+
+	def convert_lambda_to_tof(self, wavelength=None):
+		"""
+		:param wavelength: array in Angstroms
+		:return: array in s
+		"""
+		return convert_lambda_to_tof(list_wavelength=wavelength, detector_offset=self.detector_offset,
+		                             detector_sample_distance=self.detector_sample_distance, output_units='s')
+
+	def run(self, list_shutter_values=None, list_wavelength_requested=None):
+		"""
+		wavelength step of the bins at each edge of each plan
+
+		:param list_shutter_values: list of plans, rows [start(s), stop(s), divider, time bin]
+		:param list_wavelength_requested: Bragg edges in Angstroms
+		:return: ResolutionReport of (plan, edge) arrays: index of the frame of the edge (-1 if not recorded),
+		delta lambda (Angstroms) and delta lambda / lambda of its bins (nan if not recorded), and number of bins
+		recorded across the window of initialize_list_of_wavelength_requested_dictionary around the edge
+		"""
+		dict_window = MakeShutterValueFile.initialize_list_of_wavelength_requested_dictionary(
+				list_wavelength_requested=list_wavelength_requested)
+		wavelength = np.asarray(list_wavelength_requested, dtype=float)
+		window = np.array([dict_window[_wave] for _wave in list_wavelength_requested], dtype=float).reshape(-1, 2)
+
+		frames, bin_width = stack_plans(list_shutter_values=list_shutter_values, detector=self.detector)
+		frame_start = frames[..., 0, np.newaxis]  # plan, frame, edge
+		frame_stop = frames[..., 1, np.newaxis]
+		width = bin_width[..., np.newaxis]
+
+		tof = self.convert_lambda_to_tof(wavelength)
+		is_inside = (frame_start <= tof) & (tof < frame_stop)
+		is_recorded = is_inside.any(axis=1)
+		frame_index = np.where(is_recorded, np.argmax(is_inside, axis=1), -1)
+
+		# the tof is proportional to lambda, the bins of a frame all have the same width in Angstroms
+		edge_bin_width = np.take_along_axis(bin_width, np.clip(frame_index, 0, None), axis=1)
+		delta_lambda = np.where(is_recorded, convert_tof_to_lambda(tof=edge_bin_width, detector_offset=0,
+		                                                           detector_sample_distance=self.detector_sample_distance,
+		                                                           input_units='s'), np.nan)
+
+		# bins of each frame overlapping the window, on the bin grid of the frame
+		tof_left = self.convert_lambda_to_tof(window[:, 0])
+		tof_right = self.convert_lambda_to_tof(window[:, 1])
+		with np.errstate(invalid='ignore'):
+			number_of_bins = np.ceil((frame_stop - frame_start) / width - 1e-9)
+			first_bin = np.clip(np.floor((tof_left - frame_start) / width), 0, number_of_bins)
+			last_bin = np.clip(np.ceil((tof_right - frame_start) / width), 0, number_of_bins)
+		number_of_bins_in_window = np.nansum(last_bin - first_bin, axis=1).astype(int)
+
+		return ResolutionReport(frame_index=frame_index,
+		                        delta_lambda=delta_lambda,
+		                        relative_resolution=delta_lambda / wavelength,
+		                        number_of_bins_in_window=number_of_bins_in_window)
+
+	def run_plan(self, shutter_values=None, list_wavelength_requested=None):
+		"""
+		:param shutter_values: rows [start(s), stop(s), divider, time bin] of one plan
+		:param list_wavelength_requested: Bragg edges in Angstroms
+		:return: dataframe with one row per edge
+		"""
+		report = self.run(list_shutter_values=[shutter_values], list_wavelength_requested=list_wavelength_requested)
+		return pd.DataFrame({'wavelength': np.asarray(list_wavelength_requested, dtype=float),
+		                     'frame_index': report.frame_index[0],
+		                     'delta_lambda': report.delta_lambda[0],
+		                     'relative_resolution': report.relative_resolution[0],
+		                     'number_of_bins_in_window': report.number_of_bins_in_window[0]})
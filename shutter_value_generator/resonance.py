@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from functools import lru_cache
+
+from shutter_value_generator.make_shutter_value_file import MN, H, TOF_FRAMES, TOF_FRAMES_30_HZ
+from shutter_value_generator.make_shutter_value_file import MIN_TOF_BETWEEN_FRAMES
+from shutter_value_generator.make_shutter_value_file import TimeBinMicros, SourceFrequency
+from shutter_value_generator import core, intervals
+from shutter_value_generator.detector import DEFAULT_DETECTOR
+
+RESONANCE_ENERGIES_FILE = 'resonance_energies.txt'
+EV = 1.602176634e-19  # J - electron volt
+RELATIVE_TOF_WIDTH = 0.05  # half width of the frame around each resonance, relative to its tof
+
+
+@lru_cache(maxsize=1)
+def get_resonance_energies_table():
+	"""
+	:return: bundled table of resonance energies (columns Isotope, Energy(eV))
+	"""
+	full_file_name = Path(__file__).parent / RESONANCE_ENERGIES_FILE
+	return pd.read_csv(full_file_name, comment='#', skipinitialspace=True)
+
+
+def convert_energy_to_lambda(energy=None):
+	"""
+	:param energy: array in eV
+	:return: array in Angstroms
+	"""
+	return H / np.sqrt(2 * MN * np.asarray(energy, dtype=float) * EV) * 1e10
+
+
+class ResonancePlanner:
+
+	def __init__(self, detector_sample_distance=None,
+	             detector_offset=0,
+	             source_frequency=SourceFrequency.sixty_hertz,
+	             time_bin=TimeBinMicros.ten_twenty_four,
+	             relative_tof_width=RELATIVE_TOF_WIDTH,
+	             resonance_energies_table=None,
+	             detector=DEFAULT_DETECTOR):
+		"""
+		:param detector_sample_distance: in m
+		:param detector_offset: in micros
+		:param source_frequency: 60 or 30 Hz
+		:param time_bin: 10.24 or 5.12 micros
+		:param relative_tof_width: half width of each resonance frame relative to the resonance tof
+		:param resonance_energies_table: user table (dataframe or csv file with Isotope, Energy(eV) columns),
+		the bundled table is used by default
+		:param detector: name of the detector
+		"""
+		if detector_sample_distance is None:
+			raise AttributeError("define a detector sample distance in meters!")
+
+		if resonance_energies_table is None:
+			resonance_energies_table = get_resonance_energies_table()
+		elif not isinstance(resonance_energies_table, pd.DataFrame):
+			resonance_energies_table = pd.read_csv(resonance_energies_table, comment='#', skipinitialspace=True)
+
+		self.detector_sample_distance = detector_sample_distance
+		self.detector_offset = detector_offset
+		self.source_frequency = source_frequency
+		self.time_bin = time_bin
+		self.relative_tof_width = relative_tof_width
+		self.resonance_energies_table = resonance_energies_table
+		self.detector = detector
+
+	def get_list_resonance_energy(self, list_isotopes=None):
+		"""
+		:param list_isotopes: isotopes names as in the table (ex: ['U-238', 'Ta-181'])
+		:return: sorted array of the resonance energies (eV) of those isotopes
+		"""
+		table = self.resonance_energies_table
+		list_unknown = sorted(set(list_isotopes) - set(table['Isotope']))
+		if list_unknown:
+			raise ValueError("No resonance energies for isotope(s): {}".format(list_unknown))
+		return np.sort(table['Energy(eV)'][table['Isotope'].isin(list_isotopes)].to_numpy(dtype=float))
+
+	def convert_energy_to_tof(self, list_resonance_energy=None):
+		"""
+		:param list_resonance_energy: array in eV
+		:return: array of tof in s
+		"""
+		wavelength = convert_energy_to_lambda(energy=list_resonance_energy)
+		return core.convert_lambda_to_tof(list_wavelength=wavelength, detector_offset=self.detector_offset,
+		                                  detector_sample_distance=self.detector_sample_distance, output_units='s')
+
+	def get_tof_window(self):
+		if self.source_frequency == SourceFrequency.sixty_hertz:
+			return TOF_FRAMES[0][0], TOF_FRAMES[-1][1]
+		return TOF_FRAMES_30_HZ[0][0], TOF_FRAMES_30_HZ[-1][1]
+
+	def make_list_tof_frames(self, list_resonance_energy=None):
+		"""
+		one frame around each resonance, frames closer than MIN_TOF_BETWEEN_FRAMES are merged. The frames are cut
+		by the readout gaps of the source frequency, the pieces shorter than MIN_TOF_BETWEEN_FRAMES left by the
+		cut are dropped
+
+		:param list_resonance_energy: energies in eV
+		:return: list of [start, stop] in s
+		"""
+		tof = self.convert_energy_to_tof(list_resonance_energy=list_resonance_energy)
+		list_tof_frames = np.column_stack([tof * (1 - self.relative_tof_width),
+		                                   tof * (1 + self.relative_tof_width)])
+
+		list_tof_frames_uncut = ResonancePlanner.merge_list_tof_frames(list_tof_frames=list_tof_frames)
+		list_tof_frames = intervals.intersection(core.get_tof_frames(source_frequency=self.source_frequency),
+		                                         list_tof_frames_uncut)
+		return ResonancePlanner.remove_slivers(list_tof_frames=list_tof_frames,
+		                                       list_tof_frames_uncut=list_tof_frames_uncut).tolist()
+
+	def make_combined_list_tof_frames(self, list_resonance_energy=None, list_tof_bragg_frames=None):
+		"""
+		resonance frames first, followed by the part of the Bragg edge frames that starts after them
+
+		:param list_resonance_energy: energies in eV
+		:param list_tof_bragg_frames: frames [[start, stop], ...] in s, as returned by make_list_tof_frames
+		:return: list of [start, stop] in s
+		"""
+		list_tof_frames = self.make_list_tof_frames(list_resonance_energy=list_resonance_energy)
+		if not list_tof_frames:
+			return [list(_frame) for _frame in list_tof_bragg_frames]
+
+		first_bragg_tof = list_tof_frames[-1][1] + MIN_TOF_BETWEEN_FRAMES
+		for _start, _stop in list_tof_bragg_frames:
+			_start = max(_start, first_bragg_tof)
+			if _stop - _start >= MIN_TOF_BETWEEN_FRAMES:
+				list_tof_frames.append([_start, _stop])
+		return list_tof_frames
+
+	def make_shutter_values_string(self, list_tof_frames=None):
+		shutter_values_string, _ = core.make_shutter_values_string(list_tof_frames=list_tof_frames,
+		                                                           time_bin=self.time_bin,
+		                                                           detector=self.detector)
+		return shutter_values_string
+
+	@staticmethod
+	def remove_slivers(list_tof_frames=None, list_tof_frames_uncut=None, min_tof_frame=MIN_TOF_BETWEEN_FRAMES):
+		"""
+		:param list_tof_frames: array of [start, stop] of the frames cut by the readout gaps
+		:param list_tof_frames_uncut: array of [start, stop] of the frames before the cut
+		:param min_tof_frame: pieces of cut frames shorter than this are removed, the frames that are not cut
+		are kept whatever their length
+		:return: array of the frames kept
+		"""
+		list_tof_frames = np.asarray(list_tof_frames, dtype=float).reshape(-1, 2)
+		list_tof_frames_uncut = np.asarray(list_tof_frames_uncut, dtype=float).reshape(-1, 2)
+		is_uncut = np.isin(list_tof_frames[:, 0], list_tof_frames_uncut[:, 0]) & \
+		           np.isin(list_tof_frames[:, 1], list_tof_frames_uncut[:, 1])
+		is_long = list_tof_frames[:, 1] - list_tof_frames[:, 0] >= min_tof_frame
+		return list_tof_frames[is_uncut | is_long]
+
+	@staticmethod
+	def merge_list_tof_frames(list_tof_frames=None, min_tof_between_frames=MIN_TOF_BETWEEN_FRAMES):
+		"""
+		:param list_tof_frames: array of [start, stop]
+		:param min_tof_between_frames: frames closer than this are merged
+		:return: sorted array of the merged frames
+		"""
+		list_tof_frames = np.asarray(list_tof_frames, dtype=float).reshape(-1, 2)
+		if len(list_tof_frames) == 0:
+			return list_tof_frames
+		list_tof_frames = list_tof_frames[np.argsort(list_tof_frames[:, 0])]
+		start = list_tof_frames[:, 0]
+		stop = np.maximum.accumulate(list_tof_frames[:, 1])
+		is_new_frame = np.concatenate([[True], start[1:] - stop[:-1] >= min_tof_between_frames])
+		index_new_frame = np.where(is_new_frame)[0]
+		return np.column_stack([start[index_new_frame], np.maximum.reduceat(stop, index_new_frame)])
@@ -0,0 +1,235 @@
+import io
+import os
+import re
+import json
+import operator
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from contextlib import contextmanager
+
+from shutter_value_generator.writer import write_file_atomically
+
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+
+HEADER_FILE_NAME = "header.json"
+LOCK_FILE_NAME = "store.lock"
+COLUMN_FILE_EXTENSION = ".bin"
+SORTED_VALUES_FILE_EXTENSION = ".sorted.npy"
+SORTED_ORDER_FILE_EXTENSION = ".order.npy"
+VERSION = 1
+
+DICT_OPERATORS = {'<': operator.lt,
+                  '<=': operator.le,
+                  '>': operator.gt,
+                  '>=': operator.ge,
+                  '==': operator.eq,
+                  '!=': operator.ne}
+PREDICATE_REGEX = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(.+?)\s*$")
+
+
+def parse_query(query=''):
+	"""
+	:param query: predicates joined by 'and', ex: "source_frequency == 30 and worst_edge_margin > 0.4"
+	:return: list of (column, operator, value)
+	"""
+	list_predicates = []
+	for _text in re.split(r"\s+and\s+", query.strip()):
+		match = PREDICATE_REGEX.match(_text)
+		if match is None:
+			raise ValueError("Can not parse the predicate '{}'".format(_text))
+		_column, _operator, _value = match.groups()
+		try:
+			_value = float(_value)
+		except ValueError:
+			_value = _value.strip('\'"')
+		list_predicates.append((_column, _operator, _value))
+	return list_predicates
+
+
+class ResultStore:
+
+	def __init__(self, folder=None, schema=None):
+		"""
+		one fixed width binary file per column, the header lists the columns and the number of rows written
+
+		:param folder: folder of the store, created with the schema if it does not exist yet
+		:param schema: list of (column name, numpy dtype), ex: [('source_frequency', 'i2'), ('margin', 'f8')].
+		Only needed to create the store
+		"""
+		if folder is None:
+			raise AttributeError("define the folder of the store!")
+		self.folder = Path(folder)
+		if not (self.folder / HEADER_FILE_NAME).exists():
+			if schema is None:
+				raise AttributeError("{} is not a result store, provide the schema to create it".format(folder))
+			self.folder.mkdir(parents=True, exist_ok=True)
+			with self._lock():
+				if not (self.folder / HEADER_FILE_NAME).exists():
+					header = {'version': VERSION,
+					          'schema': [[_name, np.dtype(_dtype).str] for _name, _dtype in schema],
+					          'number_of_rows': 0,
+					          'indexes': {}}
+					self._write_header(header)
+		self.header = self._read_header()
+
+	@property
+	def dtype(self):
+		return np.dtype([(_name, _dtype) for _name, _dtype in self.header['schema']])
+
+	@property
+	def number_of_rows(self):
+		return self.header['number_of_rows']
+
+	def _read_header(self):
+		with open(self.folder / HEADER_FILE_NAME, 'r') as f:
+			return json.load(f)
+
+	def _write_header(self, header=None):
+		write_file_atomically(text=json.dumps(header, indent=1), filename=self.folder / HEADER_FILE_NAME)
+
+	@contextmanager
+	def _lock(self):
+		"""
+		exclusive lock of the store shared by the threads and processes writing in it (no lock without fcntl)
+		"""
+		with open(self.folder / LOCK_FILE_NAME, 'a') as f:
+			if fcntl is not None:
+				fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+			try:
+				yield
+			finally:
+				if fcntl is not None:
+					fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+	def get_column_file_name(self, column=''):
+		return self.folder / (column + COLUMN_FILE_EXTENSION)
+
+	def append(self, rows=None):
+		"""
+		append a chunk of rows, safe to call from parallel workers. The rows are visible once the header is
+		updated, a chunk interrupted half way is overwritten by the next append
+
+		:param rows: dataframe, dict of arrays or structured array with all the columns of the schema
+		:return: number of rows of the store
+		"""
+		dtype = self.dtype
+		if isinstance(rows, np.ndarray) and rows.dtype.names:
+			rows = {_name: rows[_name] for _name in rows.dtype.names}
+		list_missing = [_name for _name in dtype.names if _name not in rows]
+		if list_missing:
+			raise ValueError("Missing columns {}".format(", ".join(list_missing)))
+		dict_columns = {_name: np.ascontiguousarray(np.asarray(rows[_name]), dtype=dtype[_name])
+		                for _name in dtype.names}
+		number_of_new_rows = len(dict_columns[dtype.names[0]])
+		if any(len(_column) != number_of_new_rows for _column in dict_columns.values()):
+			raise ValueError("All the columns must have the same number of rows!")
+
+		with self._lock():
+			header = self._read_header()
+			number_of_rows = header['number_of_rows']
+			for _name in dtype.names:
+				with open(self.get_column_file_name(_name), 'ab') as f:
+					f.truncate(number_of_rows * dtype[_name].itemsize)
+					f.write(dict_columns[_name].tobytes())
+					f.flush()
+					os.fsync(f.fileno())
+			header['number_of_rows'] = number_of_rows + number_of_new_rows
+			self._write_header(header)
+			self.header = header
+		return self.header['number_of_rows']
+
+	def refresh(self):
+		"""
+		read the header again to see the rows appended by the other workers
+		"""
+		self.header = self._read_header()
+
+	def get_column(self, column=''):
+		"""
+		:return: read only memory map of the column (rows visible in the header)
+		"""
+		dtype = self.dtype
+		if column not in dtype.names:
+			raise ValueError("Unknown column {}! Available columns are {}".format(column, list(dtype.names)))
+		if self.number_of_rows == 0:
+			return np.zeros(0, dtype=dtype[column])
+		return np.memmap(self.get_column_file_name(column), dtype=dtype[column], mode='r',
+		                 shape=(self.number_of_rows,))
+
+	def build_index(self, column=''):
+		"""
+		sort the column once, the queries on it then use a binary search
+		"""
+		with self._lock():
+			self.refresh()
+			values = np.array(self.get_column(column))
+			order = np.argsort(values, kind='stable')
+			for _extension, _array in [(SORTED_VALUES_FILE_EXTENSION, values[order]),
+			                           (SORTED_ORDER_FILE_EXTENSION, order)]:
+				buffer = io.BytesIO()
+				np.save(buffer, _array)
+				write_file_atomically(filename=self.folder / (column + _extension), data=buffer.getvalue())
+			header = self._read_header()
+			header['indexes'][column] = len(values)
+			self._write_header(header)
+			self.header = header
+
+	def _load_index(self, column=''):
+		sorted_values = np.load(str(self.folder / (column + SORTED_VALUES_FILE_EXTENSION)), mmap_mode='r')
+		order = np.load(str(self.folder / (column + SORTED_ORDER_FILE_EXTENSION)), mmap_mode='r')
+		return sorted_values, order
+
+	def select(self, column='', operator_name='==', value=None):
+		"""
+		:return: boolean mask of the rows matching column operator value. The sorted index is used when there is
+		one, the rows appended after it was built are scanned. The index is loaded under the lock and may have been
+		rebuilt by another worker with more rows than this store sees, its rows past number_of_rows are ignored
+		"""
+		if operator_name not in DICT_OPERATORS:
+			raise ValueError("Unknown operator {}! Use one of {}".format(operator_name, list(DICT_OPERATORS)))
+		if column not in self.dtype.names:
+			raise ValueError("Unknown column {}! Available columns are {}".format(column, list(self.dtype.names)))
+		if (self.dtype[column].kind == 'S') and isinstance(value, str):
+			value = value.encode('utf-8')
+		if (operator_name == '!=') or (self.header['indexes'].get(column, 0) == 0):
+			return DICT_OPERATORS[operator_name](self.get_column(column), value)
+
+		with self._lock():
+			sorted_values, order = self._load_index(column)
+		number_of_indexed_rows = min(len(order), self.number_of_rows)
+		if operator_name in ['<', '<=']:
+			low, high = 0, np.searchsorted(sorted_values, value, side='left' if operator_name == '<' else 'right')
+		elif operator_name in ['>', '>=']:
+			low, high = np.searchsorted(sorted_values, value, side='right' if operator_name == '>' else 'left'), \
+			            len(sorted_values)
+		else:
+			low, high = np.searchsorted(sorted_values, value, side='left'), \
+			            np.searchsorted(sorted_values, value, side='right')
+		mask = np.zeros(self.number_of_rows, dtype=bool)
+		list_rows = order[low:high]
+		mask[list_rows[list_rows < self.number_of_rows]] = True
+		if self.number_of_rows > number_of_indexed_rows:
+			mask[number_of_indexed_rows:] = DICT_OPERATORS[operator_name](
+					self.get_column(column)[number_of_indexed_rows:], value)
+		return mask
+
+	def query(self, query='', list_columns=None):
+		"""
+		:param query: predicates joined by 'and' (see parse_query), or a list of (column, operator, value)
+		:param list_columns: columns returned, all of them if None
+		:return: dataframe of the matching rows, with their row number as index
+		"""
+		self.refresh()
+		list_predicates = parse_query(query) if isinstance(query, str) else query
+		mask = np.ones(self.number_of_rows, dtype=bool)
+		for _column, _operator, _value in list_predicates:
+			mask &= self.select(column=_column, operator_name=_operator, value=_value)
+		list_rows = np.flatnonzero(mask)
+		if list_columns is None:
+			list_columns = list(self.dtype.names)
+		return pd.DataFrame({_column: self.get_column(_column)[list_rows] for _column in list_columns},
+		                    index=list_rows, columns=list_columns)
@@ -0,0 +1,116 @@
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from shutter_value_generator.core import convert_lambda_to_tof
+from shutter_value_generator.make_shutter_value_file import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+
+NUMBER_OF_DRAWS = 1000000
+CHUNK_SIZE = 100000  # draws evaluated at once
+
+RobustnessReport = namedtuple('RobustnessReport', ['list_wavelength_requested',
+                                                   'probability_out_of_margin',
+                                                   'number_of_draws'])
+
+
+def count_edges_out_of_margin(list_tof_frames, list_wavelength_requested, detector_sample_distance,
+                              detector_offset, margin):
+	"""
+	vectorized evaluation of the plan for a chunk of geometries
+
+	:param list_tof_frames: array of [start, stop] (s)
+	:param list_wavelength_requested: array of edges (Angstroms)
+	:param detector_sample_distance: array of distances (m), one per draw
+	:param detector_offset: array of offsets (micros), one per draw
+	:param margin: Angstroms, each side of the edge
+	:return: number of draws where each edge is not within a frame with its margin
+	"""
+	start = list_tof_frames[:, 0]
+	stop = list_tof_frames[:, 1]
+
+	# draw, edge
+	distance = detector_sample_distance[:, np.newaxis]
+	offset = detector_offset[:, np.newaxis]
+	tof_left = convert_lambda_to_tof(list_wavelength=list_wavelength_requested - margin, detector_offset=offset,
+	                                 detector_sample_distance=distance, output_units='s')
+	tof_right = convert_lambda_to_tof(list_wavelength=list_wavelength_requested + margin, detector_offset=offset,
+	                                  detector_sample_distance=distance, output_units='s')
+
+	frame_index = np.searchsorted(start, tof_left, side='right') - 1
+	inside = (frame_index >= 0) & (tof_right <= stop[np.clip(frame_index, 0, None)])
+	return np.count_nonzero(~inside, axis=0)
+
+
+def _run_chunks(arguments):
+	(list_tof_frames, list_wavelength_requested, detector_sample_distance, detector_offset, sigma_distance,
+	 sigma_offset, margin, number_of_draws, chunk_size, seed) = arguments
+	random_generator = np.random.default_rng(seed)
+	number_out_of_margin = np.zeros(len(list_wavelength_requested), dtype=np.int64)
+	for _start in range(0, number_of_draws, chunk_size):
+		_size = min(chunk_size, number_of_draws - _start)
+		_distance = random_generator.normal(detector_sample_distance, sigma_distance, _size)
+		_offset = random_generator.normal(detector_offset, sigma_offset, _size)
+		number_out_of_margin += count_edges_out_of_margin(list_tof_frames, list_wavelength_requested,
+		                                                  _distance, _offset, margin)
+	return number_out_of_margin
+
+
+class GeometryRobustness:
+
+	def __init__(self, list_tof_frames=None, detector_sample_distance=None, detector_offset=None,
+	             sigma_distance=0.005, sigma_offset=2, margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:param list_tof_frames: frames of the plan [[start, stop], ...] in s (final_list_tof_frames)
+		:param detector_sample_distance: nominal distance in m
+		:param detector_offset: nominal offset in micros
+		:param sigma_distance: standard deviation of the distance in m
+		:param sigma_offset: standard deviation of the offset in micros
+		:param margin: Angstroms each side of the edge that must stay in the frame
+		"""
+		if list_tof_frames is None:
+			raise AttributeError("Provide the list of tof frames of the plan!")
+		if detector_sample_distance is None:
+			raise AttributeError("define a detector sample distance in meters!")
+		if detector_offset is None:
+			raise AttributeError("define a detector offset in micros!")
+
+		list_tof_frames = np.atleast_2d(np.asarray(list_tof_frames, dtype=float))
+		self.list_tof_frames = list_tof_frames[np.argsort(list_tof_frames[:, 0])]
+		self.detector_sample_distance = detector_sample_distance
+		self.detector_offset = detector_offset
+		self.sigma_distance = sigma_distance
+		self.sigma_offset = sigma_offset
+		self.margin = margin
+
+	def run(self, list_wavelength_requested=None, number_of_draws=NUMBER_OF_DRAWS, chunk_size=CHUNK_SIZE,
+	        seed=None, max_workers=1):
+		"""
+		:param list_wavelength_requested: Bragg edges in Angstroms
+		:param number_of_draws: number of geometries drawn
+		:param chunk_size: number of geometries evaluated at once, bounds the memory used
+		:param seed: seed of the random generator, for reproducible results
+		:param max_workers: number of processes sharing the draws (1 runs in the current process)
+		:return: RobustnessReport
+		"""
+		list_wavelength_requested = np.asarray(list_wavelength_requested, dtype=float)
+		number_of_draws = int(number_of_draws)
+		chunk_size = int(chunk_size)
+
+		max_workers = max(1, min(max_workers, int(np.ceil(number_of_draws / chunk_size))))
+		list_seed = np.random.SeedSequence(seed).spawn(max_workers)
+		list_number_of_draws = [len(_draws) for _draws in np.array_split(np.arange(number_of_draws), max_workers)]
+		list_arguments = [(self.list_tof_frames, list_wavelength_requested, self.detector_sample_distance,
+		                   self.detector_offset, self.sigma_distance, self.sigma_offset, self.margin,
+		                   _number_of_draws, chunk_size, _seed)
+		                  for _number_of_draws, _seed in zip(list_number_of_draws, list_seed)]
+
+		if max_workers == 1:
+			list_number_out_of_margin = [_run_chunks(list_arguments[0])]
+		else:
+			with ProcessPoolExecutor(max_workers=max_workers) as executor:
+				list_number_out_of_margin = list(executor.map(_run_chunks, list_arguments))
+
+		number_out_of_margin = np.sum(list_number_out_of_margin, axis=0)
+		return RobustnessReport(list_wavelength_requested=list_wavelength_requested.tolist(),
+		                        probability_out_of_margin=(number_out_of_margin / number_of_draws).tolist(),
+		                        number_of_draws=number_of_draws)
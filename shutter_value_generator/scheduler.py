@@ -0,0 +1,315 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import namedtuple
+
+from shutter_value_generator.core import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME, TimeBinMicros
+from shutter_value_generator.detector import DEFAULT_DETECTOR
+from shutter_value_generator.sequence import SequencePlanner, NUMBER_OF_DEAD_TIME, PLAN_FILE_NAME
+from shutter_value_generator.writer import write_file_atomically
+
+BEAMTIME_SCHEDULE_FILE_NAME = "beamtime_schedule.csv"
+
+Geometry = namedtuple('Geometry', ['detector_offset', 'source_frequency'])
+
+LIST_SCHEDULE_COLUMNS = ['order', 'sample_index', 'sample_name', 'detector_offset', 'source_frequency',
+                         'plan_index', 'is_reconfiguration', 'is_switch', 'number_of_edges',
+                         'number_of_edges_covered']
+
+
+def get_greedy_set_cover(matrix=None):
+	"""
+	:param matrix: boolean array (element, set), True where the set covers the element
+	:return: indexes of the sets picked, each one covers the most elements not covered yet. Stops when the
+	elements left are not covered by any set
+	"""
+	matrix = np.asarray(matrix, dtype=bool)
+	is_covered = np.zeros(len(matrix), dtype=bool)
+	list_set_index = []
+	while True:
+		number_of_new_elements = np.count_nonzero(matrix[~is_covered], axis=0)
+		if len(number_of_new_elements) == 0 or number_of_new_elements.max() == 0:
+			return list_set_index
+		_set_index = int(np.argmax(number_of_new_elements))
+		list_set_index.append(_set_index)
+		is_covered |= matrix[:, _set_index]
+
+
+def order_list_geometry(list_geometry=None):
+	"""
+	nearest neighbour path through the geometries, starting from the lowest source frequency and detector offset.
+	The cost of a step is the number of parameters changed, then the change of detector offset
+
+	:param list_geometry: list of Geometry
+	:return: list of Geometry in the order to use them
+	"""
+	list_left = sorted(list_geometry, key=lambda _geometry: (_geometry.source_frequency, _geometry.detector_offset))
+	list_ordered = list_left[:1]
+	list_left = list_left[1:]
+	while list_left:
+		_previous = list_ordered[-1]
+		_next = min(list_left, key=lambda _geometry: (
+				(_geometry.detector_offset != _previous.detector_offset) +
+				(_geometry.source_frequency != _previous.source_frequency),
+				abs(_geometry.detector_offset - _previous.detector_offset)))
+		list_ordered.append(_next)
+		list_left.remove(_next)
+	return list_ordered
+
+
+def pad_list_wavelength(list_list_wavelength_requested=None):
+	"""
+	:return: array (sample, edge) in Angstroms padded with nan
+	"""
+	number_of_edges = max([len(_list) for _list in list_list_wavelength_requested] + [1])
+	wavelength = np.full((len(list_list_wavelength_requested), number_of_edges), np.nan)
+	for _index, _list in enumerate(list_list_wavelength_requested):
+		wavelength[_index, :len(_list)] = _list
+	return wavelength
+
+
+def pad_list_tof_frames(list_plans=None):
+	"""
+	:return: array (plan, frame, [start, stop]) in s padded with nan
+	"""
+	number_of_frames = max([len(_plan.list_tof_frames) for _plan in list_plans] + [1])
+	list_tof_frames = np.full((len(list_plans), number_of_frames, 2), np.nan)
+	for _index, _plan in enumerate(list_plans):
+		list_tof_frames[_index, :len(_plan.list_tof_frames)] = _plan.list_tof_frames
+	return list_tof_frames
+
+
+class BeamtimeScheduler:
+
+	def __init__(self, detector_sample_distance=None,
+	             epics_chopper_wavelength_range=None,
+	             time_bin=TimeBinMicros.ten_twenty_four,
+	             detector=DEFAULT_DETECTOR,
+	             number_of_dead_time=NUMBER_OF_DEAD_TIME,
+	             margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:param detector_sample_distance: in m
+		:param epics_chopper_wavelength_range: [min, max] in Angstroms
+		:param time_bin: in micros
+		:param detector: name of the detector
+		:param number_of_dead_time: dead times of the plans (at least 2)
+		:param margin: Angstroms each side of the edge that must stay inside a frame
+		"""
+		self.detector_sample_distance = detector_sample_distance
+		self.epics_chopper_wavelength_range = epics_chopper_wavelength_range
+		self.time_bin = time_bin
+		self.detector = detector
+		self.number_of_dead_time = number_of_dead_time
+		self.margin = margin
+		self.dict_planners = {}
+
+	def get_planner(self, geometry=None):
+		"""
+		:return: SequencePlanner of the geometry, built once
+		"""
+		if geometry not in self.dict_planners:
+			self.dict_planners[geometry] = SequencePlanner(
+					detector_sample_distance=self.detector_sample_distance,
+					detector_offset=geometry.detector_offset,
+					epics_chopper_wavelength_range=self.epics_chopper_wavelength_range,
+					source_frequency=geometry.source_frequency,
+					time_bin=self.time_bin,
+					detector=self.detector,
+					number_of_dead_time=self.number_of_dead_time,
+					margin=self.margin)
+		return self.dict_planners[geometry]
+
+	def get_windows(self, wavelength=None, geometry=None):
+		"""
+		:param wavelength: array (sample, edge) in Angstroms padded with nan
+		:return: tof windows (sample, edge, [left, right]) in s and the boolean array (sample, edge) of the edges
+		measurable with the geometry (see SequencePlanner.get_measurable_windows)
+		"""
+		planner = self.get_planner(geometry=geometry)
+		windows = np.stack([planner.convert_lambda_to_tof(wavelength - self.margin),
+		                    planner.convert_lambda_to_tof(wavelength + self.margin)], axis=-1)
+		is_measurable = ((wavelength - self.margin) >= self.epics_chopper_wavelength_range[0]) & \
+		                ((wavelength + self.margin) <= self.epics_chopper_wavelength_range[1])
+		frame_index = np.searchsorted(planner.tof_frames[:, 0], np.nan_to_num(windows[..., 0]), side='right') - 1
+		is_measurable &= (frame_index >= 0) & \
+		                 (windows[..., 1] <= planner.tof_frames[np.clip(frame_index, 0, None), 1])
+		return windows, is_measurable
+
+	@staticmethod
+	def get_covered(windows=None, is_measurable=None, list_plans=None):
+		"""
+		:return: boolean array (sample, plan, edge), True where the window of a measurable edge is inside a frame
+		of the plan
+		"""
+		list_tof_frames = pad_list_tof_frames(list_plans=list_plans)[np.newaxis, :, np.newaxis]  # 1, plan, 1, frame
+		windows = windows[:, np.newaxis, :, np.newaxis]  # sample, 1, edge, 1
+		is_inside = (windows[..., 0] >= list_tof_frames[..., 0]) & (windows[..., 1] <= list_tof_frames[..., 1])
+		return np.any(is_inside, axis=-1) & is_measurable[:, np.newaxis, :]
+
+	def make_candidates(self, wavelength=None, list_geometry=None, is_allowed=None):
+		"""
+		for each geometry, the plan made for all the samples allowing it then the plan made for each sample alone
+
+		:param wavelength: array (sample, edge) in Angstroms padded with nan
+		:param list_geometry: list of Geometry
+		:param is_allowed: boolean array (sample, geometry)
+		:return: list of (geometry index, ShutterPlan), without duplicated plans
+		"""
+		list_candidates = []
+		set_keys = set()
+		for _geometry_index, _geometry in enumerate(list_geometry):
+			planner = self.get_planner(geometry=_geometry)
+			windows, is_measurable = self.get_windows(wavelength=wavelength, geometry=_geometry)
+			list_sample_index = np.flatnonzero(is_allowed[:, _geometry_index] & np.any(is_measurable, axis=1))
+			list_windows = [windows[list_sample_index][is_measurable[list_sample_index]]] + \
+			               [windows[_index][is_measurable[_index]] for _index in list_sample_index]
+			for _windows in list_windows:
+				_windows = _windows[np.argsort(_windows[:, 0], kind='stable')]
+				try:
+					_plan = planner.make_plan(windows=_windows)
+				except ValueError:
+					continue
+				_key = (_geometry_index, _plan.shutter_values_string)
+				if _key not in set_keys:
+					set_keys.add(_key)
+					list_candidates.append((_geometry_index, _plan))
+		return list_candidates
+
+	def make_compatibility_matrix(self, wavelength=None, list_geometry=None, is_allowed=None,
+	                              list_candidates=None):
+		"""
+		a sample is compatible with a plan when the geometry of the plan is allowed for the sample, measures as
+		many of its edges as its best allowed geometry, and the plan covers all of them
+
+		:return: boolean array (sample, candidate) and the number of edges covered (sample, candidate)
+		"""
+		number_of_samples = len(wavelength)
+		list_candidate_geometry = np.array([_geometry_index for _geometry_index, _ in list_candidates], dtype=int)
+		number_of_edges_covered = np.zeros((number_of_samples, len(list_candidates)), dtype=int)
+		number_of_edges_measurable = np.zeros((number_of_samples, len(list_geometry)), dtype=int)
+		for _geometry_index, _geometry in enumerate(list_geometry):
+			windows, is_measurable = self.get_windows(wavelength=wavelength, geometry=_geometry)
+			number_of_edges_measurable[:, _geometry_index] = np.count_nonzero(is_measurable, axis=1)
+			list_candidate_index = np.flatnonzero(list_candidate_geometry == _geometry_index)
+			if len(list_candidate_index) == 0:
+				continue
+			is_covered = BeamtimeScheduler.get_covered(windows=windows,
+			                                           is_measurable=is_measurable,
+			                                           list_plans=[list_candidates[_index][1]
+			                                                       for _index in list_candidate_index])
+			number_of_edges_covered[:, list_candidate_index] = np.count_nonzero(is_covered, axis=-1)
+
+		number_of_edges_measurable = np.where(is_allowed, number_of_edges_measurable, -1)
+		best_number_of_edges = number_of_edges_measurable.max(axis=1)
+		if len(list_candidates) == 0:
+			return np.zeros((number_of_samples, 0), dtype=bool), number_of_edges_covered
+		is_compatible = is_allowed[:, list_candidate_geometry] & \
+		                (number_of_edges_covered == best_number_of_edges[:, np.newaxis]) & \
+		                (best_number_of_edges[:, np.newaxis] > 0)
+		return is_compatible, number_of_edges_covered
+
+	def run(self, list_list_wavelength_requested=None, list_list_geometry=None, list_sample_name=None):
+		"""
+		the geometries are picked first (greedy set cover of the samples, every geometry change costs a setup),
+		then the plans of each geometry. The samples are grouped by geometry (see order_list_geometry) and by plan
+		inside a geometry
+
+		:param list_list_wavelength_requested: Bragg edges (Angstroms) of each sample
+		:param list_list_geometry: geometries allowed for each sample, [(detector_offset, source_frequency), ...]
+		:param list_sample_name: name of each sample, its index if None
+		:return: schedule dataframe with one row per sample in the order to measure them (samples with no plan
+		at the end, plan_index -1) and the list of the ShutterPlan used
+		"""
+		if list_list_wavelength_requested is None:
+			raise AttributeError("define the list of wavelength requested of each sample!")
+		if list_list_geometry is None:
+			raise AttributeError("define the geometries allowed for each sample!")
+		if len(list_list_geometry) != len(list_list_wavelength_requested):
+			raise ValueError("list_list_geometry must have one list of geometries per sample!")
+		number_of_samples = len(list_list_wavelength_requested)
+		if list_sample_name is None:
+			list_sample_name = [str(_index) for _index in range(number_of_samples)]
+
+		list_list_geometry = [[Geometry(*_geometry) for _geometry in _list] for _list in list_list_geometry]
+		list_geometry = sorted(set(_geometry for _list in list_list_geometry for _geometry in _list),
+		                       key=lambda _geometry: (_geometry.source_frequency, _geometry.detector_offset))
+		is_allowed = np.array([[_geometry in _list for _geometry in list_geometry] for _list in list_list_geometry],
+		                      dtype=bool).reshape(number_of_samples, len(list_geometry))
+		wavelength = pad_list_wavelength(list_list_wavelength_requested=list_list_wavelength_requested)
+
+		list_candidates = self.make_candidates(wavelength=wavelength, list_geometry=list_geometry,
+		                                       is_allowed=is_allowed)
+		is_compatible, number_of_edges_covered = self.make_compatibility_matrix(wavelength=wavelength,
+		                                                                        list_geometry=list_geometry,
+		                                                                        is_allowed=is_allowed,
+		                                                                        list_candidates=list_candidates)
+		list_candidate_geometry = np.array([_geometry_index for _geometry_index, _ in list_candidates], dtype=int)
+
+		# a geometry serves a sample if one of its plans does
+		is_served = np.zeros((number_of_samples, len(list_geometry)), dtype=bool)
+		for _geometry_index in range(len(list_geometry)):
+			is_served[:, _geometry_index] = np.any(is_compatible[:, list_candidate_geometry == _geometry_index],
+			                                       axis=1)
+		list_geometry_used = order_list_geometry(list_geometry=[list_geometry[_index]
+		                                                        for _index in get_greedy_set_cover(matrix=is_served)])
+		list_geometry_index = [list_geometry.index(_geometry) for _geometry in list_geometry_used]
+
+		sample_candidate = np.full(number_of_samples, -1)
+		list_candidate_used = []
+		is_assigned = np.zeros(number_of_samples, dtype=bool)
+		for _geometry_index in list_geometry_index:
+			list_sample_index = np.flatnonzero(is_served[:, _geometry_index] & ~is_assigned)
+			list_candidate_index = np.flatnonzero(list_candidate_geometry == _geometry_index)
+			sub_matrix = is_compatible[np.ix_(list_sample_index, list_candidate_index)]
+			for _set_index in get_greedy_set_cover(matrix=sub_matrix):
+				_is_new = sub_matrix[:, _set_index] & ~is_assigned[list_sample_index]
+				sample_candidate[list_sample_index[_is_new]] = list_candidate_index[_set_index]
+				is_assigned[list_sample_index[_is_new]] = True
+				list_candidate_used.append(list_candidate_index[_set_index])
+
+		list_plans = [list_candidates[_index][1] for _index in list_candidate_used]
+		list_rows = []
+		previous_geometry = previous_plan_index = None
+		list_order = [_index for _candidate in list_candidate_used
+		              for _index in np.flatnonzero(sample_candidate == _candidate)] + \
+		             list(np.flatnonzero(sample_candidate == -1))
+		for _order, _sample_index in enumerate(list_order):
+			_candidate = sample_candidate[_sample_index]
+			if _candidate >= 0:
+				_plan_index = list_candidate_used.index(_candidate)
+				_geometry = list_geometry[list_candidates[_candidate][0]]
+				_number_of_edges_covered = int(number_of_edges_covered[_sample_index, _candidate])
+			else:
+				_plan_index, _geometry, _number_of_edges_covered = -1, Geometry(np.nan, np.nan), 0
+			list_rows.append({'order': _order,
+			                  'sample_index': int(_sample_index),
+			                  'sample_name': list_sample_name[_sample_index],
+			                  'detector_offset': _geometry.detector_offset,
+			                  'source_frequency': _geometry.source_frequency,
+			                  'plan_index': _plan_index,
+			                  'is_reconfiguration': (_plan_index >= 0) and (_geometry != previous_geometry),
+			                  'is_switch': (_plan_index >= 0) and (_plan_index != previous_plan_index),
+			                  'number_of_edges': len(list_list_wavelength_requested[_sample_index]),
+			                  'number_of_edges_covered': _number_of_edges_covered})
+			previous_geometry, previous_plan_index = _geometry, _plan_index
+		return pd.DataFrame(list_rows, columns=LIST_SCHEDULE_COLUMNS), list_plans
+
+	@staticmethod
+	def export_schedule(schedule=None, list_plans=None, output_folder=None):
+		"""
+		write one shutter value file per plan and the sample order with the geometry and file of each sample
+
+		:param schedule: dataframe returned by run
+		:param list_plans: list of ShutterPlan returned by run
+		:param output_folder: existing folder
+		:return: the schedule written in BEAMTIME_SCHEDULE_FILE_NAME
+		"""
+		output_folder = Path(output_folder)
+		for _index, _plan in enumerate(list_plans):
+			write_file_atomically(text=_plan.shutter_values_string,
+			                      filename=output_folder / PLAN_FILE_NAME.format(_index))
+		schedule = schedule.assign(file_name=[PLAN_FILE_NAME.format(_index) if _index >= 0 else ''
+		                                      for _index in schedule['plan_index']])
+		write_file_atomically(text=schedule.to_csv(index=False),
+		                      filename=output_folder / BEAMTIME_SCHEDULE_FILE_NAME)
+		return schedule
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from shutter_value_generator.core import make_plan_config, compute_plan, get_tof_frames
+from shutter_value_generator.core import convert_lambda_to_tof, convert_tof_to_lambda
+from shutter_value_generator.core import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME, MIN_LAMBDA_PEAK_VALUE_INTERVAL
+from shutter_value_generator.core import MIN_TOF_BETWEEN_FRAMES, TimeBinMicros, SourceFrequency
+from shutter_value_generator.detector import DEFAULT_DETECTOR
+from shutter_value_generator import intervals
+from shutter_value_generator.writer import write_file_atomically
+
+NUMBER_OF_DEAD_TIME = 3
+SCHEDULE_FILE_NAME = "schedule.csv"
+PLAN_FILE_NAME = "ShutterValues_plan_{:03d}.txt"
+
+
+def get_list_wavelength_from_lattice_parameter(lattice_parameter=None, list_hkl=None):
+	"""
+	Bragg edges of a cubic phase, lambda = 2 d_hkl
+
+	:param lattice_parameter: in Angstroms
+	:param list_hkl: reflections [[h, k, l], ...]
+	:return: array of the edges in Angstroms, in the order of list_hkl
+	"""
+	list_hkl = np.atleast_2d(np.asarray(list_hkl, dtype=float))
+	return 2 * lattice_parameter / np.sqrt(np.sum(list_hkl ** 2, axis=1))
+
+
+class SequencePlanner:
+
+	def __init__(self, detector_sample_distance=None,
+	             detector_offset=None,
+	             epics_chopper_wavelength_range=None,
+	             source_frequency=SourceFrequency.sixty_hertz,
+	             time_bin=TimeBinMicros.ten_twenty_four,
+	             detector=DEFAULT_DETECTOR,
+	             number_of_dead_time=NUMBER_OF_DEAD_TIME,
+	             margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:param detector_sample_distance: in m
+		:param detector_offset: in micros
+		:param epics_chopper_wavelength_range: [min, max] in Angstroms
+		:param source_frequency: 60 or 30 Hz
+		:param time_bin: in micros
+		:param detector: name of the detector
+		:param number_of_dead_time: dead times placed when a new plan is needed (at least 2)
+		:param margin: Angstroms each side of the edge that must stay inside a frame
+		"""
+		self.config = make_plan_config(source_frequency=source_frequency,
+		                               detector_sample_distance=detector_sample_distance,
+		                               detector_offset=detector_offset,
+		                               time_bin=time_bin,
+		                               epics_chopper_wavelength_range=epics_chopper_wavelength_range,
+		                               detector=detector)
+		if number_of_dead_time < 2:
+			raise AttributeError("number_of_dead_time must be at least 2!")
+		self.number_of_dead_time = number_of_dead_time
+		self.margin = margin
+		self.tof_frames = intervals.make_intervals(get_tof_frames(source_frequency=source_frequency))
+		self.tof_window = (self.tof_frames[0, 0], self.tof_frames[-1, 1])
+
+	def convert_lambda_to_tof(self, wavelength=None):
+		"""
+		:return: tof in s
+		"""
+		return convert_lambda_to_tof(list_wavelength=wavelength, detector_offset=self.config.detector_offset,
+		                             detector_sample_distance=self.config.detector_sample_distance, output_units='s')
+
+	def convert_tof_to_lambda(self, tof=None):
+		return convert_tof_to_lambda(tof=tof, detector_offset=self.config.detector_offset,
+		                             detector_sample_distance=self.config.detector_sample_distance, input_units='s')
+
+	def get_measurable_windows(self, list_wavelength_requested=None):
+		"""
+		:return: tof windows [[left, right], ...] in s of the edges that one plan can record (inside the chopper
+		range and inside one frame of the source, not across a readout gap), sorted
+		"""
+		wavelength = np.sort(np.asarray(list_wavelength_requested, dtype=float))
+		is_measurable = ((wavelength - self.margin) >= self.config.epics_chopper_wavelength_range[0]) & \
+		                ((wavelength + self.margin) <= self.config.epics_chopper_wavelength_range[1])
+		windows = np.stack([self.convert_lambda_to_tof(wavelength - self.margin),
+		                    self.convert_lambda_to_tof(wavelength + self.margin)], axis=-1).reshape(-1, 2)
+		frame_index = np.searchsorted(self.tof_frames[:, 0], windows[:, 0], side='right') - 1
+		is_measurable &= (frame_index >= 0) & (windows[:, 1] <= self.tof_frames[np.clip(frame_index, 0, None), 1])
+		return windows[is_measurable]
+
+	@staticmethod
+	def is_plan_valid(list_tof_frames=None, windows=None):
+		"""
+		incremental check: every window is inside one frame of the plan
+
+		:param list_tof_frames: frames [[start, stop], ...] in s sorted by start
+		:param windows: tof windows [[left, right], ...] in s
+		"""
+		if len(windows) == 0:
+			return True
+		list_tof_frames = np.atleast_2d(np.asarray(list_tof_frames, dtype=float))
+		frame_index = np.searchsorted(list_tof_frames[:, 0], windows[:, 0], side='right') - 1
+		return bool(np.all((frame_index >= 0) &
+		                   (windows[:, 1] <= list_tof_frames[np.clip(frame_index, 0, None), 1])))
+
+	def pick_list_lambda_dead_time(self, windows=None, number_of_dead_time=None):
+		"""
+		dead times at the center of the largest gaps between the edge windows inside the frames of the source. A
+		gap is used only if the frames around the dead time do not cut any window. Dead times past the end of the
+		frames are added when there are not enough gaps.
+
+		:param windows: tof windows [[left, right], ...] in s, sorted
+		:return: sorted list of lambda dead time in Angstroms
+		"""
+		if number_of_dead_time is None:
+			number_of_dead_time = self.number_of_dead_time
+		windows = np.asarray(windows, dtype=float).reshape(-1, 2)
+
+		# tof of the frames of the source not covered by any window
+		list_gaps = intervals.difference(self.tof_frames, windows)
+		list_gap_width = list_gaps[:, 1] - list_gaps[:, 0]
+		list_center = list_gaps.mean(axis=1)
+
+		list_tof_dead_time = []
+		for _index in np.argsort(-list_gap_width, kind='stable'):
+			if list_gap_width[_index] < 2 * MIN_TOF_BETWEEN_FRAMES:
+				break
+			_lambda = float(self.convert_tof_to_lambda(list_center[_index]))
+			if all(abs(_lambda - float(self.convert_tof_to_lambda(_tof))) > MIN_LAMBDA_PEAK_VALUE_INTERVAL
+			       for _tof in list_tof_dead_time):
+				list_tof_dead_time.append(list_center[_index])
+			if len(list_tof_dead_time) == number_of_dead_time:
+				break
+
+		list_lambda_dead_time = sorted(float(self.convert_tof_to_lambda(_tof)) for _tof in list_tof_dead_time)
+		# the last frame stops at the end of the frame span with a dead time just after it
+		lambda_after_frames = float(self.convert_tof_to_lambda(self.tof_window[1] + MIN_TOF_BETWEEN_FRAMES))
+		while len(list_lambda_dead_time) < 2:
+			if list_lambda_dead_time:
+				list_lambda_dead_time.append(max(lambda_after_frames,
+				                                 list_lambda_dead_time[-1] + 2 * MIN_LAMBDA_PEAK_VALUE_INTERVAL))
+			else:
+				list_lambda_dead_time.append(lambda_after_frames)
+		return list_lambda_dead_time
+
+	def make_plan(self, windows=None):
+		"""
+		:return: ShutterPlan of a new plan, with more dead times (shorter frames) when the frames are too long for
+		the detector
+		"""
+		error = None
+		for _number_of_dead_time in range(self.number_of_dead_time, self.number_of_dead_time + 4):
+			list_lambda_dead_time = self.pick_list_lambda_dead_time(windows=windows,
+			                                                        number_of_dead_time=_number_of_dead_time)
+			try:
+				return compute_plan(config=self.config, list_lambda_dead_time=list_lambda_dead_time)
+			except ValueError as _error:
+				error = _error
+		raise error
+
+	def run(self, list_list_wavelength_requested=None):
+		"""
+		:param list_list_wavelength_requested: one list of Bragg edges (Angstroms) per step
+		:return: schedule dataframe with one row per step (plan_index, is_switch, number of edges measurable and
+		covered) and the list of the distinct ShutterPlan used
+		"""
+		list_plans = []
+		list_rows = []
+		current_index = None
+		for _step, _list_wavelength_requested in enumerate(list_list_wavelength_requested):
+			windows = self.get_measurable_windows(list_wavelength_requested=_list_wavelength_requested)
+
+			# the current plan first, then the plans already used, a new plan only if none of them fit
+			list_index = ([current_index] if current_index is not None else []) + \
+			             [_index for _index in range(len(list_plans)) if _index != current_index]
+			plan_index = next((_index for _index in list_index
+			                   if SequencePlanner.is_plan_valid(list_tof_frames=list_plans[_index].list_tof_frames,
+			                                                    windows=windows)), None)
+			if plan_index is None:
+				list_plans.append(self.make_plan(windows=windows))
+				plan_index = len(list_plans) - 1
+
+			list_tof_frames = np.array(list_plans[plan_index].list_tof_frames)
+			frame_index = np.searchsorted(list_tof_frames[:, 0], windows[:, 0], side='right') - 1
+			is_covered = (frame_index >= 0) & (windows[:, 1] <= list_tof_frames[np.clip(frame_index, 0, None), 1])
+			list_rows.append({'step': _step,
+			                  'plan_index': plan_index,
+			                  'is_switch': plan_index != current_index,
+			                  'number_of_edges': len(_list_wavelength_requested),
+			                  'number_of_edges_measurable': len(windows),
+			                  'number_of_edges_covered': int(np.sum(is_covered))})
+			current_index = plan_index
+		return pd.DataFrame(list_rows, columns=['step', 'plan_index', 'is_switch', 'number_of_edges',
+		                                        'number_of_edges_measurable', 'number_of_edges_covered']), list_plans
+
+	def run_lattice_parameter(self, list_lattice_parameter=None, list_hkl=None):
+		"""
+		:param list_lattice_parameter: lattice parameter (Angstroms) of a cubic phase at each step
+		:param list_hkl: reflections [[h, k, l], ...] measured
+		:return: see run
+		"""
+		return self.run(list_list_wavelength_requested=[
+				get_list_wavelength_from_lattice_parameter(lattice_parameter=_lattice_parameter, list_hkl=list_hkl)
+				for _lattice_parameter in list_lattice_parameter])
+
+	@staticmethod
+	def export_schedule(schedule=None, list_plans=None, output_folder=None, list_time=None):
+		"""
+		write one shutter value file per distinct plan and the schedule of the file switches
+
+		:param schedule: dataframe returned by run
+		:param list_plans: list of ShutterPlan returned by run
+		:param output_folder: existing folder
+		:param list_time: time (s) of each step, the step index is used if None
+		:return: schedule of the switches (step, time, file_name), as written in SCHEDULE_FILE_NAME
+		"""
+		output_folder = Path(output_folder)
+		for _index, _plan in enumerate(list_plans):
+			write_file_atomically(text=_plan.shutter_values_string,
+			                      filename=output_folder / PLAN_FILE_NAME.format(_index))
+
+		switches = schedule[schedule['is_switch']]
+		time = np.asarray(list_time, dtype=float)[switches['step']] if list_time is not None else switches['step']
+		schedule_switches = pd.DataFrame({'step': switches['step'].to_numpy(),
+		                                  'time': np.asarray(time),
+		                                  'file_name': [PLAN_FILE_NAME.format(_index)
+		                                                for _index in switches['plan_index']]})
+		write_file_atomically(text=schedule_switches.to_csv(index=False), filename=output_folder / SCHEDULE_FILE_NAME)
+		return schedule_switches
@@ -0,0 +1,169 @@
+import copy
+import json
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+
+from shutter_value_generator.core import make_plan_config, compute_plan, get_clock_cycle_table
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+CACHE_SIZE = 1024  # number of plans kept in the result cache
+
+# keys of a plan request passed to make_plan_config, list_lambda_dead_time goes to compute_plan()
+LIST_PLAN_PARAMETERS = ['source_frequency',
+                        'detector_sample_distance',
+                        'detector_offset',
+                        'resonance_mode',
+                        'list_resonance_energy',
+                        'list_resonance_isotopes',
+                        'default_mode',
+                        'time_bin',
+                        'epics_chopper_wavelength_range',
+                        'detector']
+
+
+class ShutterValueService:
+
+	def __init__(self, cache_size=CACHE_SIZE):
+		"""
+		keeps the generator, the clock cycle table and the computed plans in memory
+
+		:param cache_size: number of plans kept in the result cache
+		"""
+		self.cache_size = cache_size
+		self.cache = OrderedDict()
+		self.lock = threading.Lock()
+		get_clock_cycle_table()
+
+	def compute(self, request=None):
+		"""
+		:param request: dictionary of plan parameters (see LIST_PLAN_PARAMETERS) and list_lambda_dead_time
+		:return: dictionary with the shutter_values string and the list_tof_frames (None for fixed plans). Each
+		caller gets its own copy of the cached result
+		"""
+		list_unknown = sorted(set(request) - set(LIST_PLAN_PARAMETERS) - {'list_lambda_dead_time'})
+		if list_unknown:
+			raise ValueError("Unknown plan parameter(s): {}".format(list_unknown))
+
+		key = json.dumps(request, sort_keys=True)
+		with self.lock:
+			if key in self.cache:
+				self.cache.move_to_end(key)
+				return copy.deepcopy(self.cache[key])
+
+		config = make_plan_config(**{_key: request[_key] for _key in LIST_PLAN_PARAMETERS if _key in request})
+		plan = compute_plan(config=config, list_lambda_dead_time=request.get('list_lambda_dead_time'))
+		list_tof_frames = plan.list_tof_frames
+		if list_tof_frames is not None:
+			list_tof_frames = [list(_tof_frame) for _tof_frame in list_tof_frames]
+		result = {'shutter_values': plan.shutter_values_string,
+		          'list_tof_frames': list_tof_frames}
+
+		with self.lock:
+			self.cache[key] = result
+			if len(self.cache) > self.cache_size:
+				self.cache.popitem(last=False)
+		return copy.deepcopy(result)
+
+	def handle(self, body=b''):
+		"""
+		:param body: JSON encoded request
+		:return: (status, JSON encoded response). Invalid requests get 400, any other failure 500, both with
+		the error message in the response
+		"""
+		try:
+			result = self.compute(request=json.loads(body.decode('utf-8')))
+			return 200, json.dumps(result).encode('utf-8')
+		except (ValueError, AttributeError, TypeError) as error:
+			return 400, json.dumps({'error': str(error)}).encode('utf-8')
+		except Exception as error:
+			return 500, json.dumps({'error': "{}: {}".format(type(error).__name__, error)}).encode('utf-8')
+
+	def make_http_server(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+		"""
+		POST a JSON plan request on /plan, GET /health to check the service is up
+		"""
+		service = self
+
+		class Handler(BaseHTTPRequestHandler):
+
+			def do_GET(self):
+				if self.path != '/health':
+					self.send_error(404)
+					return
+				self._reply(200, b'{"status": "ok"}')
+
+			def do_POST(self):
+				if self.path != '/plan':
+					self.send_error(404)
+					return
+				body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+				self._reply(*service.handle(body=body))
+
+			def _reply(self, status, payload):
+				self.send_response(status)
+				self.send_header('Content-Type', 'application/json')
+				self.send_header('Content-Length', str(len(payload)))
+				self.end_headers()
+				self.wfile.write(payload)
+
+			def log_message(self, format, *args):
+				pass
+
+		return ThreadingHTTPServer((host, port), Handler)
+
+	def make_unix_server(self, socket_path=''):
+		"""
+		one JSON request per line, answered by one JSON line
+		"""
+		service = self
+
+		class Handler(socketserver.StreamRequestHandler):
+
+			def handle(self):
+				for _line in self.rfile:
+					if not _line.strip():
+						continue
+					_status, _payload = service.handle(body=_line)
+					self.wfile.write(_payload + b'\n')
+					self.wfile.flush()
+
+		server = socketserver.ThreadingUnixStreamServer(str(socket_path), Handler)
+		server.daemon_threads = True
+		return server
+
+
+def request_plan(request=None, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, timeout=10):
+	"""
+	send a plan request to a running service
+
+	:param request: dictionary of plan parameters
+	:param socket_path: unix socket of the service, the HTTP port is used if None
+	:return: dictionary returned by the service
+	"""
+	body = json.dumps(request).encode('utf-8')
+
+	if socket_path is not None:
+		with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+			client.settimeout(timeout)
+			client.connect(str(socket_path))
+			client.sendall(body + b'\n')
+			response = client.makefile('rb').readline()
+	else:
+		http_request = Request("http://{}:{}/plan".format(host, port), data=body,
+		                       headers={'Content-Type': 'application/json'})
+		try:
+			with urlopen(http_request, timeout=timeout) as f:
+				response = f.read()
+		except HTTPError as error:
+			response = error.read()
+
+	result = json.loads(response.decode('utf-8'))
+	if 'error' in result:
+		raise ValueError(result['error'])
+	return result
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from shutter_value_generator.make_shutter_value_file import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+from shutter_value_generator.detector import DEFAULT_DETECTOR
+from shutter_value_generator.counting_statistics import CountingStatistics
+
+EDGE_HEIGHT = 0.2  # drop of the transmission below each edge
+BROADENING = 0.01  # Angstroms - standard deviation of the gaussian broadening of the edges
+BASE_TRANSMISSION = 0.8  # transmission above all the edges
+FLUX = 1e4  # neutrons/s/Angstrom of the flat spectrum used when no spectrum is given
+RUN_TIME = 3600  # s
+NUMBER_OF_REALIZATIONS = 50  # noisy spectra fitted per plan
+NUMBER_OF_POSITIONS = 201  # edge positions tried by the grid search
+MIN_NUMBER_OF_BINS = 4  # fewer bins in the window of an edge and the edge is not fitted
+
+LIST_RESULT_COLUMNS = ['plan_index', 'wavelength', 'number_of_bins', 'bias', 'precision', 'number_of_fits']
+
+
+def erf(x=None):
+	"""
+	Abramowitz and Stegun 7.1.26, absolute error below 1.5e-7, numpy only
+	"""
+	x = np.asarray(x, dtype=float)
+	t = 1. / (1. + 0.3275911 * np.abs(x))
+	polynomial = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+	return np.sign(x) * (1. - polynomial * np.exp(-x * x))
+
+
+def make_step(wavelength=None, position=None, broadening=BROADENING):
+	"""
+	:return: 0 well below position, 1 well above (gaussian broadened step)
+	"""
+	return 0.5 * (1. + erf((wavelength - position) / (np.sqrt(2) * broadening)))
+
+
+def fit_edge_position(wavelength=None, transmission=None, list_position=None, broadening=BROADENING):
+	"""
+	least square fit of a + b step(wavelength, position): the levels a and b are solved exactly for every
+	position of the grid, the best position is refined with a parabola through its neighbours
+
+	:param wavelength: centers of the bins (Angstroms), array (bin,)
+	:param transmission: array (realization, bin)
+	:param list_position: grid of positions (Angstroms), sorted and evenly spaced
+	:return: fitted position of each realization
+	"""
+	step = make_step(wavelength=wavelength[np.newaxis, :], position=np.asarray(list_position)[:, np.newaxis],
+	                 broadening=broadening)  # position, bin
+	step_centered = step - step.mean(axis=1, keepdims=True)
+	transmission_centered = transmission - transmission.mean(axis=1, keepdims=True)  # realization, bin
+	covariance = transmission_centered @ step_centered.T  # realization, position
+	variance = np.sum(step_centered ** 2, axis=1)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		residual = np.sum(transmission_centered ** 2, axis=1, keepdims=True) - covariance ** 2 / variance
+	residual = np.where(variance > 0, residual, np.inf)
+
+	best = np.clip(np.argmin(residual, axis=1), 1, len(list_position) - 2)
+	_rows = np.arange(len(best))
+	left, center, right = residual[_rows, best - 1], residual[_rows, best], residual[_rows, best + 1]
+	with np.errstate(divide='ignore', invalid='ignore'):
+		shift = np.where(np.isfinite(left + right) & (left - 2 * center + right > 0),
+		                 0.5 * (left - right) / (left - 2 * center + right), 0)
+	return list_position[best] + np.clip(shift, -1, 1) * (list_position[1] - list_position[0])
+
+
+class EdgeSimulator:
+
+	def __init__(self, detector_sample_distance=None,
+	             detector_offset=None,
+	             list_wavelength_requested=None,
+	             list_edge_height=None,
+	             broadening=BROADENING,
+	             base_transmission=BASE_TRANSMISSION,
+	             spectrum=None,
+	             run_time=RUN_TIME,
+	             number_of_realizations=NUMBER_OF_REALIZATIONS,
+	             detector=DEFAULT_DETECTOR,
+	             margin=MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME):
+		"""
+		:param detector_sample_distance: in m
+		:param detector_offset: in micros
+		:param list_wavelength_requested: Bragg edges (Angstroms) of the phases
+		:param list_edge_height: drop of the transmission below each edge, EDGE_HEIGHT for all of them if None
+		:param broadening: Angstroms, standard deviation of the edges
+		:param base_transmission: transmission above all the edges
+		:param spectrum: open beam [[wavelength, flux], ...] (see CountingStatistics), flat FLUX if None
+		:param run_time: s, of the sample and of the open beam
+		:param number_of_realizations: noisy spectra fitted per plan
+		:param detector: name of the detector
+		:param margin: Angstroms each side of the edge fitted
+		"""
+		if list_wavelength_requested is None:
+			raise AttributeError("define the list of wavelength requested!")
+		if spectrum is None:
+			spectrum = [[0, FLUX], [100, FLUX]]
+
+		self.list_wavelength_requested = np.asarray(list_wavelength_requested, dtype=float)
+		if list_edge_height is None:
+			list_edge_height = np.full(len(self.list_wavelength_requested), EDGE_HEIGHT)
+		self.list_edge_height = np.asarray(list_edge_height, dtype=float)
+		if self.list_edge_height.shape != self.list_wavelength_requested.shape:
+			raise ValueError("list_edge_height must have one height per wavelength requested!")
+
+		self.counting_statistics = CountingStatistics(spectrum=spectrum,
+		                                              detector_sample_distance=detector_sample_distance,
+		                                              detector_offset=detector_offset,
+		                                              detector=detector)
+		self.broadening = broadening
+		self.base_transmission = base_transmission
+		self.run_time = run_time
+		self.number_of_realizations = number_of_realizations
+		self.margin = margin
+
+	def make_transmission(self, wavelength=None):
+		"""
+		:param wavelength: array in Angstroms
+		:return: ideal transmission, each edge multiplies it by (1 - height) below the edge
+		"""
+		wavelength = np.asarray(wavelength, dtype=float)
+		step = make_step(wavelength=wavelength[..., np.newaxis], position=self.list_wavelength_requested,
+		                 broadening=self.broadening)
+		return self.base_transmission * np.prod(1 - self.list_edge_height * (1 - step), axis=-1)
+
+	def simulate(self, shutter_values=None, random_generator=None):
+		"""
+		:param shutter_values: rows [start(s), stop(s), divider, time bin]
+		:param random_generator: numpy Generator
+		:return: centers of the bins (Angstroms) and noisy transmission (realization, bin) measured with the plan
+		"""
+		if random_generator is None:
+			random_generator = np.random.default_rng()
+		bins = self.counting_statistics.predict_counts(shutter_values=shutter_values, run_time=self.run_time)
+		wavelength = 0.5 * (bins['lambda_start'].to_numpy() + bins['lambda_stop'].to_numpy())
+		open_beam = bins['counts'].to_numpy()
+		size = (self.number_of_realizations, len(wavelength))
+		sample_counts = random_generator.poisson(open_beam * self.make_transmission(wavelength), size=size)
+		open_beam_counts = random_generator.poisson(open_beam, size=size)
+		with np.errstate(divide='ignore', invalid='ignore'):
+			transmission = sample_counts / open_beam_counts
+		return wavelength, np.where(open_beam_counts > 0, transmission, 0)
+
+	def run(self, shutter_values=None, random_generator=None, plan_index=0):
+		"""
+		simulate and fit the edges of one plan
+
+		:return: dataframe with one row per edge: number of bins in the +/- margin window, bias and standard
+		deviation (precision) of the fitted position in Angstroms, nan if the edge is not fitted
+		"""
+		wavelength, transmission = self.simulate(shutter_values=shutter_values, random_generator=random_generator)
+		list_rows = []
+		for _edge in self.list_wavelength_requested:
+			is_in_window = np.abs(wavelength - _edge) <= self.margin
+			number_of_bins = int(np.count_nonzero(is_in_window))
+			bias = precision = np.nan
+			if number_of_bins >= MIN_NUMBER_OF_BINS:
+				list_position = np.linspace(_edge - self.margin / 2, _edge + self.margin / 2, NUMBER_OF_POSITIONS)
+				list_fitted = fit_edge_position(wavelength=wavelength[is_in_window],
+				                                transmission=transmission[:, is_in_window],
+				                                list_position=list_position,
+				                                broadening=self.broadening)
+				bias = float(np.mean(list_fitted) - _edge)
+				precision = float(np.std(list_fitted))
+			list_rows.append({'plan_index': plan_index,
+			                  'wavelength': _edge,
+			                  'number_of_bins': number_of_bins,
+			                  'bias': bias,
+			                  'precision': precision,
+			                  'number_of_fits': self.number_of_realizations if number_of_bins >= MIN_NUMBER_OF_BINS
+			                  else 0})
+		return pd.DataFrame(list_rows, columns=LIST_RESULT_COLUMNS)
+
+	def run_batch(self, list_shutter_values=None, seed=None, max_workers=1):
+		"""
+		:param list_shutter_values: list of plans, rows [start(s), stop(s), divider, time bin]
+		:param seed: seed of the random generator, the results do not depend on max_workers
+		:param max_workers: number of processes sharing the plans (1 runs in the current process)
+		:return: dataframe of run for all the plans, plan_index is the index in list_shutter_values
+		"""
+		list_seed = np.random.SeedSequence(seed).spawn(len(list_shutter_values))
+		list_arguments = [(self, _shutter_values, _seed, _index)
+		                  for _index, (_shutter_values, _seed) in enumerate(zip(list_shutter_values, list_seed))]
+		max_workers = max(1, min(max_workers, len(list_arguments)))
+		if max_workers == 1:
+			list_results = [_run_plan(_arguments) for _arguments in list_arguments]
+		else:
+			with ProcessPoolExecutor(max_workers=max_workers) as executor:
+				list_results = list(executor.map(_run_plan, list_arguments,
+				                                 chunksize=max(1, len(list_arguments) // (4 * max_workers))))
+		if not list_results:
+			return pd.DataFrame(columns=LIST_RESULT_COLUMNS)
+		return pd.concat(list_results, ignore_index=True)
+
+
+def _run_plan(arguments):
+	simulator, shutter_values, seed, plan_index = arguments
+	return simulator.run(shutter_values=shutter_values, random_generator=np.random.default_rng(seed),
+	                     plan_index=plan_index)
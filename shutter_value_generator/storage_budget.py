@@ -0,0 +1,129 @@
+import numpy as np
+from collections import namedtuple
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.make_shutter_value_file import SourceFrequency
+from shutter_value_generator.detector import DEFAULT_DETECTOR, get_detector, get_bin_width
+
+DETECTOR_SIZE = [512, 512]  # pixels
+BYTES_PER_PIXEL = 2
+
+
+class StorageBudgetReport(namedtuple('StorageBudgetReport', ['list_number_of_bins',
+                                                             'total_number_of_bins',
+                                                             'stack_size',
+                                                             'number_of_stacks',
+                                                             'total_volume',
+                                                             'write_rate',
+                                                             'list_warnings'])):
+	"""
+	sizes are in bytes, write rate in bytes/s
+	"""
+
+	@property
+	def is_within_budget(self):
+		return len(self.list_warnings) == 0
+
+
+class StorageBudget:
+
+	def __init__(self, list_tof_frames=None, shutter_values=None,
+	             time_bin=None,
+	             detector_size=DETECTOR_SIZE,
+	             bytes_per_pixel=BYTES_PER_PIXEL,
+	             source_frequency=SourceFrequency.sixty_hertz,
+	             detector=DEFAULT_DETECTOR):
+		"""
+		:param list_tof_frames: frames [[start, stop], ...] in s, the snapped frames of the plan (list_tof_frames)
+		:param shutter_values: or the rows [start(s), stop(s), divider, time bin] of a shutter value file
+		:param time_bin: one of the time bins of the detector, the first one by default (used with list_tof_frames
+		only). With the MCP, 5.12 micros keeps the dividers of 10.24 micros with bins half as wide: it doubles the
+		volume
+		:param detector_size: [number of pixels along x, along y]
+		:param bytes_per_pixel: size of one pixel of one bin image
+		:param source_frequency: 60 or 30 Hz
+		:param detector: name of the detector that records the plan
+		"""
+		if shutter_values is None:
+			if list_tof_frames is None:
+				raise AttributeError("Provide the list of tof frames or the shutter values rows!")
+			if time_bin is None:
+				time_bin = get_detector(detector).time_bins[0]
+			list_tof_frames = np.atleast_2d(np.asarray(list_tof_frames, dtype=float))
+			list_divider = [MakeShutterValueFile.get_above_closest_divided(delta_tof=_stop - _start,
+			                                                               time_bin=time_bin,
+			                                                               detector=detector)
+			                for _start, _stop in list_tof_frames]
+			shutter_values = np.column_stack([list_tof_frames,
+			                                  list_divider,
+			                                  np.full(len(list_tof_frames), time_bin)])
+
+		self.shutter_values = np.atleast_2d(np.asarray(shutter_values, dtype=float))
+		self.detector_size = detector_size
+		self.bytes_per_pixel = bytes_per_pixel
+		self.source_frequency = source_frequency
+		self.detector = detector
+
+	@staticmethod
+	def calculate_number_of_bins(shutter_values=None, detector=DEFAULT_DETECTOR):
+		"""
+		:param shutter_values: rows [start(s), stop(s), divider, time bin]
+		:param detector: name of the detector that records the plan
+		:return: number of bins recorded in each frame (as many as the bin lookup table has)
+		"""
+		shutter_values = np.atleast_2d(np.asarray(shutter_values, dtype=float))
+		width = get_bin_width(divider=shutter_values[:, 2], time_bin=shutter_values[:, 3],
+		                      detector=get_detector(detector)) * 1e-6
+		delta_tof = shutter_values[:, 1] - shutter_values[:, 0]
+		return np.maximum(np.ceil(delta_tof / width - 1e-9), 0).astype(np.int64)
+
+	def run(self, run_length=3600, stack_duration=None, detector_buffer=None, file_system_budget=None,
+	        write_rate_budget=None):
+		"""
+		estimate the data produced by the plan. The MCP accumulates one image per bin and saves the stack
+		every stack_duration seconds.
+
+		:param run_length: duration of the run in s
+		:param stack_duration: time between two saved image stacks in s (full run by default)
+		:param detector_buffer: size in bytes of the detector buffer, a stack must fit in it
+		:param file_system_budget: bytes available on the file system for the run
+		:param write_rate_budget: sustained write rate in bytes/s the file system can keep up with
+		:return: StorageBudgetReport
+		"""
+		if stack_duration is None:
+			stack_duration = run_length
+		if (run_length <= 0) or (stack_duration <= 0):
+			raise ValueError("run_length and stack_duration must be positive!")
+
+		list_number_of_bins = StorageBudget.calculate_number_of_bins(shutter_values=self.shutter_values,
+		                                                             detector=self.detector)
+		total_number_of_bins = int(list_number_of_bins.sum())
+		image_size = int(np.prod(self.detector_size)) * self.bytes_per_pixel
+
+		stack_size = total_number_of_bins * image_size
+		number_of_stacks = int(np.ceil(run_length / stack_duration - 1e-9))
+		total_volume = stack_size * number_of_stacks
+		write_rate = stack_size / stack_duration
+
+		list_warnings = []
+		last_tof_measurable = 1. / self.source_frequency
+		if self.shutter_values[:, 1].max() > last_tof_measurable:
+			list_warnings.append("Frames go past the {} Hz pulse ({:.4g} s)!".format(self.source_frequency,
+			                                                                         last_tof_measurable))
+		if (detector_buffer is not None) and (stack_size > detector_buffer):
+			list_warnings.append("Stack size ({} bytes) is above the detector buffer ({} bytes)!".format(
+					stack_size, detector_buffer))
+		if (file_system_budget is not None) and (total_volume > file_system_budget):
+			list_warnings.append("Run volume ({} bytes) is above the file system budget ({} bytes)!".format(
+					total_volume, file_system_budget))
+		if (write_rate_budget is not None) and (write_rate > write_rate_budget):
+			list_warnings.append("Write rate ({:.4g} bytes/s) is above the budget ({:.4g} bytes/s)!".format(
+					write_rate, write_rate_budget))
+
+		return StorageBudgetReport(list_number_of_bins=list_number_of_bins.tolist(),
+		                           total_number_of_bins=total_number_of_bins,
+		                           stack_size=stack_size,
+		                           number_of_stacks=number_of_stacks,
+		                           total_volume=total_volume,
+		                           write_rate=write_rate,
+		                           list_warnings=list_warnings)
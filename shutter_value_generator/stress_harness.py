@@ -0,0 +1,344 @@
+import time
+import numpy as np
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.make_shutter_value_file import TOF_FRAMES, TOF_FRAMES_30_HZ, MIN_TOF_BETWEEN_FRAMES
+from shutter_value_generator.make_shutter_value_file import MIN_LAMBDA_PEAK_VALUE_INTERVAL
+from shutter_value_generator.make_shutter_value_file import TimeBinMicros, SourceFrequency
+from shutter_value_generator.detector import DEFAULT_DETECTOR, get_detector
+from shutter_value_generator.core import convert_lambda_to_tof, convert_tof_to_lambda
+from shutter_value_generator.bin_lookup import read_shutter_values_string
+from shutter_value_generator.clock_ticks import CLOCK_TICK_NS, NS_PER_S
+
+NUMBER_OF_CASES = 1000000
+CHUNK_SIZE = 10000  # cases generated and checked at once
+DETECTOR_SAMPLE_DISTANCE_RANGE = [10, 30]  # m
+DETECTOR_OFFSET_RANGE = [0, 8000]  # micros
+MAX_NUMBER_OF_DEAD_TIME = 5
+LAMBDA_DEAD_TIME_OVERSHOOT = 0.5  # Angstroms, dead times are also drawn a bit outside of the frames
+TOLERANCE = 1e-9  # s
+TICKS_PER_S = NS_PER_S / CLOCK_TICK_NS
+MAX_NUMBER_OF_EXAMPLES = 5
+
+LIST_INVARIANTS = ['ordered', 'minimum_gap', 'divider_range', 'frequency_window']
+
+StressReport = namedtuple('StressReport', ['number_of_cases',
+                                           'number_of_rejected',
+                                           'dict_violations',
+                                           'dict_crashes',
+                                           'number_of_reference_mismatches',
+                                           'list_failing_cases',
+                                           'cases_per_second'])
+
+
+def get_reference_tof_frames(source_frequency=SourceFrequency.sixty_hertz):
+	"""
+	:return: array (frame, [start, stop]) in s of the frames of the source, the dead times split them
+	"""
+	return np.array(TOF_FRAMES if source_frequency == SourceFrequency.sixty_hertz else TOF_FRAMES_30_HZ, dtype=float)
+
+
+def get_tof_window(source_frequency=SourceFrequency.sixty_hertz):
+	"""
+	:return: [first tof, last tof] in s the frames are built in
+	"""
+	_tof_frames = get_reference_tof_frames(source_frequency=source_frequency)
+	return [_tof_frames[0, 0], _tof_frames[-1, 1]]
+
+
+def generate_cases(number_of_cases=CHUNK_SIZE, random_generator=None,
+                   source_frequency=SourceFrequency.sixty_hertz):
+	"""
+	:param number_of_cases: number of geometries drawn
+	:param random_generator: numpy Generator
+	:param source_frequency: 60 or 30 Hz
+	:return: detector_sample_distance (m), detector_offset (micros) and the sorted lambda dead time
+	(Angstroms), one row per case padded with nan to MAX_NUMBER_OF_DEAD_TIME
+	"""
+	if random_generator is None:
+		random_generator = np.random.default_rng()
+	detector_sample_distance = random_generator.uniform(*DETECTOR_SAMPLE_DISTANCE_RANGE, size=number_of_cases)
+	detector_offset = random_generator.uniform(*DETECTOR_OFFSET_RANGE, size=number_of_cases)
+
+	lambda_window = convert_tof_to_lambda(tof=get_tof_window(source_frequency=source_frequency),
+	                                      detector_offset=detector_offset[:, np.newaxis],
+	                                      detector_sample_distance=detector_sample_distance[:, np.newaxis],
+	                                      input_units='s')
+	number_of_dead_time = random_generator.integers(2, MAX_NUMBER_OF_DEAD_TIME + 1, size=number_of_cases)
+
+	# sorted uniform draws shifted by MIN_LAMBDA_PEAK_VALUE_INTERVAL, so that the dead times are never too close
+	spacing = MIN_LAMBDA_PEAK_VALUE_INTERVAL * (1 + 1e-3)
+	lambda_low = lambda_window[:, 0:1] - LAMBDA_DEAD_TIME_OVERSHOOT
+	lambda_high = np.maximum(lambda_window[:, 1:2] + LAMBDA_DEAD_TIME_OVERSHOOT -
+	                         (number_of_dead_time[:, np.newaxis] - 1) * spacing, lambda_low)
+	lambda_dead_time = random_generator.uniform(lambda_low, lambda_high,
+	                                            size=(number_of_cases, MAX_NUMBER_OF_DEAD_TIME))
+	is_missing = np.arange(MAX_NUMBER_OF_DEAD_TIME) >= number_of_dead_time[:, np.newaxis]
+	lambda_dead_time[is_missing] = np.nan
+	lambda_dead_time = np.sort(lambda_dead_time, axis=1) + np.arange(MAX_NUMBER_OF_DEAD_TIME) * spacing
+	return detector_sample_distance, detector_offset, lambda_dead_time
+
+
+def get_reference_divider(delta_tof=None, time_bin=TimeBinMicros.ten_twenty_four):
+	"""
+	vectorized get_above_closest_divided
+
+	:param delta_tof: array of frame lengths in s
+	:param time_bin: 10.24 or 5.12 micros
+	:return: int array of dividers, -1 where the frame is too long
+	"""
+	clock_cycle_data = MakeShutterValueFile.get_clock_cycle_table()
+	range_array = np.array(clock_cycle_data['Range(ms)']) * 1e-3
+	bin_width = np.array(clock_cycle_data['TimeBin(micros)']) * 1e-6 * time_bin / TimeBinMicros.ten_twenty_four
+	list_divider = np.append(np.array(clock_cycle_data['Divided']), -1)
+	delta_tof = np.nan_to_num(np.asarray(delta_tof, dtype=float), nan=np.inf)[..., np.newaxis]
+	is_valid = (delta_tof <= range_array) & \
+	           (np.ceil(delta_tof / bin_width - 1e-9) <= get_detector(DEFAULT_DETECTOR).max_bins_per_frame)
+	# first valid divider, -1 when none is
+	index = np.where(is_valid.any(axis=-1), is_valid.argmax(axis=-1), len(range_array))
+	return list_divider[index]
+
+
+def make_reference_list_tof_frames(list_tof_dead_time=None, tof_frames=None):
+	"""
+	independent vectorized model of the frames: the frames of the source minus MIN_TOF_BETWEEN_FRAMES each side
+	of each dead time. The dead intervals, the readout gaps and the ends of the frames are cuts sorted by start,
+	a frame goes from the furthest stop of the cuts before it to the start of the next cut. Frames shorter than
+	MIN_TOF_BETWEEN_FRAMES are dropped (their cuts are merged). Like the generator, the tof are rounded to clock
+	ticks first, the cuts are then exact (whole numbers of ticks held in float)
+
+	:param list_tof_dead_time: sorted array of dead times in s, one row per case padded with nan
+	:param tof_frames: array (frame, [start, stop]) in s of the frames of the source
+	:return: array (case, frame, [start, stop]), frames that do not exist are nan
+	"""
+	list_tof_dead_time = np.rint(np.atleast_2d(np.asarray(list_tof_dead_time, dtype=float)) * TICKS_PER_S)
+	tof_frames = np.rint(np.asarray(tof_frames, dtype=float) * TICKS_PER_S)
+	min_tof_between_frames = np.rint(MIN_TOF_BETWEEN_FRAMES * TICKS_PER_S)
+	number_of_cases = len(list_tof_dead_time)
+	# missing dead times are moved to +inf, their cut is after the last frame
+	list_tof_dead_time = np.where(np.isnan(list_tof_dead_time), np.inf, list_tof_dead_time)
+	fixed_cut_start = np.concatenate([[-np.inf], tof_frames[:, 1]])
+	fixed_cut_stop = np.concatenate([tof_frames[:, 0], [np.inf]])
+	cut_start = np.column_stack([np.broadcast_to(fixed_cut_start, (number_of_cases, len(fixed_cut_start))),
+	                             list_tof_dead_time - min_tof_between_frames])
+	cut_stop = np.column_stack([np.broadcast_to(fixed_cut_stop, (number_of_cases, len(fixed_cut_stop))),
+	                            list_tof_dead_time + min_tof_between_frames])
+	order = np.argsort(cut_start, axis=1, kind='stable')
+	cut_start = np.take_along_axis(cut_start, order, axis=1)
+	cut_stop = np.maximum.accumulate(np.take_along_axis(cut_stop, order, axis=1), axis=1)
+
+	start = cut_stop[:, :-1]
+	stop = cut_start[:, 1:]
+	list_tof_frames = np.stack([start, stop], axis=-1) / TICKS_PER_S
+	with np.errstate(invalid='ignore'):
+		list_tof_frames[~(stop - start >= min_tof_between_frames)] = np.nan
+	return compact_list_tof_frames(list_tof_frames)
+
+
+def snap_reference_list_tof_frames(list_tof_frames=None, list_divider=None, time_bin=TimeBinMicros.ten_twenty_four):
+	"""
+	move the start of each frame up and its stop down to a multiple of the bin width of its divider, in
+	whole numbers of ticks held in float
+
+	:param list_tof_frames: array (case, frame, [start, stop]) in s, missing frames are nan
+	:param list_divider: array (case, frame) of dividers, -1 for the missing frames and the frames too long
+	:param time_bin: 10.24 or 5.12 micros
+	:return: array (case, frame, [start, stop]) in s
+	"""
+	clock_cycle_data = MakeShutterValueFile.get_clock_cycle_table()
+	bin_width = np.array(clock_cycle_data['TimeBin(micros)']) * 1e-6 * time_bin / TimeBinMicros.ten_twenty_four
+	ticks_per_bin = np.append(np.maximum(np.rint(bin_width * TICKS_PER_S), 1), 1)
+	ticks_per_bin = ticks_per_bin[np.where(list_divider < 0, len(bin_width), list_divider)][..., np.newaxis]
+	list_tof_frames_ticks = np.rint(list_tof_frames * TICKS_PER_S)
+	start = np.ceil(list_tof_frames_ticks[..., 0:1] / ticks_per_bin) * ticks_per_bin
+	stop = np.floor(list_tof_frames_ticks[..., 1:2] / ticks_per_bin) * ticks_per_bin
+	return np.concatenate([start, stop], axis=-1) / TICKS_PER_S
+
+
+def compact_list_tof_frames(list_tof_frames=None):
+	"""
+	move the frames of each case to the front of its row, in the same order
+	"""
+	is_missing = np.isnan(list_tof_frames[..., 0])
+	order = np.argsort(is_missing, axis=1, kind='stable')
+	return np.take_along_axis(list_tof_frames, order[..., np.newaxis], axis=1)
+
+
+def check_invariants(list_tof_frames=None, list_divider=None, source_frequency=SourceFrequency.sixty_hertz):
+	"""
+	:param list_tof_frames: array (case, frame, [start, stop]) in s, frames of a case at the front of its row,
+	missing frames are nan
+	:param list_divider: array (case, frame) of dividers
+	:param source_frequency: 60 or 30 Hz
+	:return: {invariant: boolean array, True for the cases violating it}
+	"""
+	start = list_tof_frames[..., 0]
+	stop = list_tof_frames[..., 1]
+	is_frame = ~np.isnan(start)
+	is_pair = is_frame[:, 1:] & is_frame[:, :-1]
+	gap = np.where(is_pair, start[:, 1:] - stop[:, :-1], np.inf)
+	delta_tof = np.where(is_frame, stop - start, 0)
+
+	list_divider = np.where(is_frame, list_divider, 0).astype(int)
+	clock_cycle_data = MakeShutterValueFile.get_clock_cycle_table()
+	range_array = np.append(np.array(clock_cycle_data['Range(ms)']) * 1e-3, -np.inf)
+
+	dict_violations = OrderedDict()
+	dict_violations['ordered'] = np.any(is_frame & ~(stop > start), axis=1) | np.any(gap <= 0, axis=1)
+	dict_violations['minimum_gap'] = np.any(gap < MIN_TOF_BETWEEN_FRAMES - TOLERANCE, axis=1)
+	dict_violations['divider_range'] = np.any(is_frame & (delta_tof > range_array[list_divider] + TOLERANCE),
+	                                          axis=1)
+	dict_violations['frequency_window'] = np.any(is_frame & ((start < 0) |
+	                                                         (stop > 1. / source_frequency + TOLERANCE)), axis=1)
+	return dict_violations
+
+
+def _run_chunk(arguments):
+	number_of_cases, seed, source_frequency, time_bin = arguments
+	random_generator = np.random.default_rng(seed)
+	detector_sample_distance, detector_offset, lambda_dead_time = generate_cases(
+			number_of_cases=number_of_cases,
+			random_generator=random_generator,
+			source_frequency=source_frequency)
+	tof_frames = get_reference_tof_frames(source_frequency=source_frequency)
+	lambda_window = convert_tof_to_lambda(tof=get_tof_window(source_frequency=source_frequency),
+	                                      detector_offset=detector_offset[:, np.newaxis],
+	                                      detector_sample_distance=detector_sample_distance[:, np.newaxis],
+	                                      input_units='s')
+
+	max_number_of_frames = MAX_NUMBER_OF_DEAD_TIME + len(tof_frames)
+	shutter_values = np.full((number_of_cases, max_number_of_frames, 4), np.nan)
+	list_tof_frames = np.full((number_of_cases, max_number_of_frames, 2), np.nan)
+	is_rejected = np.zeros(number_of_cases, dtype=bool)
+	dict_crashes = OrderedDict()
+	list_failing_cases = []
+
+	def _record_failure(failure, index):
+		if len(list_failing_cases) < MAX_NUMBER_OF_EXAMPLES:
+			list_failing_cases.append({'failure': failure,
+			                           'detector_sample_distance': float(detector_sample_distance[index]),
+			                           'detector_offset': float(detector_offset[index]),
+			                           'list_lambda_dead_time':
+				                           lambda_dead_time[index][~np.isnan(lambda_dead_time[index])].tolist()})
+
+	for _index in range(number_of_cases):
+		_list_lambda_dead_time = lambda_dead_time[_index][~np.isnan(lambda_dead_time[_index])].tolist()
+		try:
+			o_make = MakeShutterValueFile(output_folder='',
+			                              no_output_file=True,
+			                              source_frequency=source_frequency,
+			                              time_bin=time_bin,
+			                              detector_sample_distance=detector_sample_distance[_index],
+			                              detector_offset=detector_offset[_index],
+			                              epics_chopper_wavelength_range=lambda_window[_index].tolist())
+			_shutter_values = read_shutter_values_string(
+					o_make.run(list_lambda_dead_time=_list_lambda_dead_time))
+		except ValueError:
+			is_rejected[_index] = True
+			continue
+		except Exception as error:
+			_name = type(error).__name__
+			dict_crashes[_name] = dict_crashes.get(_name, 0) + 1
+			_record_failure(_name, _index)
+			continue
+		shutter_values[_index, :len(_shutter_values)] = _shutter_values
+		_frames = np.array(o_make.final_list_tof_frames, dtype=float).reshape(-1, 2)
+		list_tof_frames[_index, :len(_frames)] = _frames
+
+	is_checked = ~is_rejected & ~np.isnan(shutter_values[:, 0, 0])
+	dict_violations = check_invariants(list_tof_frames=shutter_values[..., 0:2],
+	                                   list_divider=shutter_values[..., 2],
+	                                   source_frequency=source_frequency)
+	dict_number_of_violations = OrderedDict()
+	for _invariant in LIST_INVARIANTS:
+		_is_violated = dict_violations[_invariant] & ~is_rejected
+		dict_number_of_violations[_invariant] = int(np.count_nonzero(_is_violated))
+		for _index in np.flatnonzero(_is_violated)[:MAX_NUMBER_OF_EXAMPLES]:
+			_record_failure(_invariant, _index)
+
+	# the generator must agree with the reference model on the frames and their dividers
+	list_tof_dead_time = convert_lambda_to_tof(list_wavelength=lambda_dead_time,
+	                                           detector_offset=detector_offset[:, np.newaxis],
+	                                           detector_sample_distance=detector_sample_distance[:, np.newaxis],
+	                                           output_units='s')
+	reference_list_tof_frames = make_reference_list_tof_frames(list_tof_dead_time=list_tof_dead_time,
+	                                                           tof_frames=tof_frames)
+	reference_list_divider = get_reference_divider(delta_tof=reference_list_tof_frames[..., 1] -
+	                                                         reference_list_tof_frames[..., 0],
+	                                               time_bin=time_bin)
+	# the generator writes and returns the frames snapped to the bins of their divider
+	reference_list_tof_frames = snap_reference_list_tof_frames(list_tof_frames=reference_list_tof_frames,
+	                                                           list_divider=reference_list_divider,
+	                                                           time_bin=time_bin)
+	list_divider = np.where(np.isnan(shutter_values[..., 2]), -1, shutter_values[..., 2])
+	is_same_frames = np.all(np.isclose(list_tof_frames, reference_list_tof_frames, rtol=0, atol=TOLERANCE,
+	                                   equal_nan=True), axis=(1, 2))
+	is_same_divider = np.all(list_divider == reference_list_divider, axis=1)
+	is_mismatch = ~(is_same_frames & is_same_divider) & is_checked
+	number_of_reference_mismatches = int(np.count_nonzero(is_mismatch))
+
+	return (number_of_cases, int(np.count_nonzero(is_rejected)), dict_number_of_violations, dict_crashes,
+	        number_of_reference_mismatches, list_failing_cases)
+
+
+class StressHarness:
+
+	def __init__(self, source_frequency=SourceFrequency.sixty_hertz, time_bin=TimeBinMicros.ten_twenty_four):
+		"""
+		:param source_frequency: 60 or 30 Hz
+		:param time_bin: 10.24 or 5.12 micros
+		"""
+		self.source_frequency = source_frequency
+		self.time_bin = time_bin
+
+	def run(self, number_of_cases=NUMBER_OF_CASES, chunk_size=CHUNK_SIZE, seed=None, max_workers=1):
+		"""
+		run random geometries and dead times through MakeShutterValueFile and check the invariants of
+		the shutter values produced
+
+		:param number_of_cases: number of random cases
+		:param chunk_size: number of cases generated and checked at once
+		:param seed: seed of the random generator, the cases do not depend on max_workers
+		:param max_workers: number of processes sharing the chunks (1 runs in the current process)
+		:return: StressReport
+		"""
+		number_of_cases = int(number_of_cases)
+		chunk_size = int(chunk_size)
+		list_number_of_cases = [min(chunk_size, number_of_cases - _start)
+		                        for _start in range(0, number_of_cases, chunk_size)]
+		list_seed = np.random.SeedSequence(seed).spawn(len(list_number_of_cases))
+		list_arguments = [(_number_of_cases, _seed, self.source_frequency, self.time_bin)
+		                  for _number_of_cases, _seed in zip(list_number_of_cases, list_seed)]
+
+		start_time = time.perf_counter()
+		max_workers = max(1, min(max_workers, len(list_arguments)))
+		if max_workers == 1:
+			list_results = [_run_chunk(_arguments) for _arguments in list_arguments]
+		else:
+			with ProcessPoolExecutor(max_workers=max_workers) as executor:
+				list_results = list(executor.map(_run_chunk, list_arguments))
+		duration = time.perf_counter() - start_time
+
+		number_of_rejected = 0
+		dict_violations = OrderedDict((_invariant, 0) for _invariant in LIST_INVARIANTS)
+		dict_crashes = OrderedDict()
+		number_of_reference_mismatches = 0
+		list_failing_cases = []
+		for _, _rejected, _violations, _crashes, _mismatches, _failing_cases in list_results:
+			number_of_rejected += _rejected
+			for _invariant, _value in _violations.items():
+				dict_violations[_invariant] += _value
+			for _name, _value in _crashes.items():
+				dict_crashes[_name] = dict_crashes.get(_name, 0) + _value
+			number_of_reference_mismatches += _mismatches
+			list_failing_cases += _failing_cases[:MAX_NUMBER_OF_EXAMPLES - len(list_failing_cases)]
+
+		return StressReport(number_of_cases=number_of_cases,
+		                    number_of_rejected=number_of_rejected,
+		                    dict_violations=dict_violations,
+		                    dict_crashes=dict_crashes,
+		                    number_of_reference_mismatches=number_of_reference_mismatches,
+		                    list_failing_cases=list_failing_cases,
+		                    cases_per_second=number_of_cases / duration if duration > 0 else np.inf)
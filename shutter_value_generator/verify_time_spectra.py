@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.detector import DEFAULT_DETECTOR, get_detector, get_bin_width
+
+SPECTRA_FILE_PATTERN = "*_Spectra.txt"
+SPECTRA_CHUNK_SIZE = 1000000  # rows read at once from the spectra file
+TOF_TOLERANCE = 1e-8  # s - one period of the 100MHz clock
+
+
+class TimeSpectraReport(namedtuple('TimeSpectraReport', ['file_name',
+                                                         'number_of_bins_expected',
+                                                         'number_of_bins_acquired',
+                                                         'number_of_mismatches',
+                                                         'first_mismatch_index',
+                                                         'max_deviation',
+                                                         'missing_frames',
+                                                         'incomplete_frames',
+                                                         'drift_offset',
+                                                         'drift_slope'])):
+	"""
+	result of the comparison of one acquired spectra file with the shutter values. Deviations, offset are
+	in s, slope in s/s. first_mismatch_index is the first row of the file that is not its expected bin (a
+	deviation above the tolerance, or a missing or extra row), -1 when there is none
+	"""
+
+	@property
+	def is_valid(self):
+		return (self.first_mismatch_index == -1) and \
+		       (len(self.missing_frames) == 0) and \
+		       (len(self.incomplete_frames) == 0)
+
+
+class VerifyTimeSpectra:
+
+	def __init__(self, shutter_values_file=None, shutter_values=None, tolerance=TOF_TOLERANCE,
+	             chunk_size=SPECTRA_CHUNK_SIZE, detector=DEFAULT_DETECTOR):
+		"""
+		:param shutter_values_file: ShutterValues.txt file used for the acquisition
+		:param shutter_values: or directly the rows [start(s), stop(s), divider, time bin]
+		:param tolerance: maximum difference (s) allowed between an acquired and expected bin
+		:param chunk_size: number of rows of the spectra file processed at once
+		:param detector: name of the detector that recorded the spectra
+		"""
+		if shutter_values is None:
+			if shutter_values_file is None:
+				raise AttributeError("Provide the shutter values file or the shutter values rows!")
+			shutter_values = MakeShutterValueFile.read_shutter_values_file(filename=shutter_values_file)
+
+		self.shutter_values = np.atleast_2d(np.asarray(shutter_values, dtype=float))
+		self.tolerance = tolerance
+		self.chunk_size = chunk_size
+		self.detector = detector
+		self.expected_bins, self.expected_frame_index = VerifyTimeSpectra.make_expected_bins(
+				shutter_values=self.shutter_values, detector=detector)
+
+	@staticmethod
+	def make_expected_bins(shutter_values=None, detector=DEFAULT_DETECTOR):
+		"""
+		rebuild the start time of every bin the detector records with the shutter values
+
+		:param shutter_values: rows [start(s), stop(s), divider, time bin]
+		:param detector: name of the detector
+		:return: start time of the bins (s), index of the frame of each bin
+		"""
+		shutter_values = np.atleast_2d(np.asarray(shutter_values, dtype=float))
+		start = shutter_values[:, 0]
+		stop = shutter_values[:, 1]
+		width = get_bin_width(divider=shutter_values[:, 2], time_bin=shutter_values[:, 3],
+		                      detector=get_detector(detector)) * 1e-6
+		number_of_bins = np.maximum(np.ceil((stop - start) / width - 1e-9), 0).astype(np.int64)
+
+		frame_index = np.repeat(np.arange(len(start)), number_of_bins)
+		first_bin_of_frame = np.cumsum(number_of_bins) - number_of_bins
+		bin_index_in_frame = np.arange(number_of_bins.sum()) - first_bin_of_frame[frame_index]
+		bins = start[frame_index] + bin_index_in_frame * width[frame_index]
+		return bins, frame_index
+
+	def count_bins_per_frame(self, time=None):
+		"""
+		:param time: acquired times (s)
+		:return: number of acquired times inside each frame of the shutter values
+		"""
+		start = self.shutter_values[:, 0] - self.tolerance
+		stop = self.shutter_values[:, 1] + self.tolerance
+		frame_index = np.searchsorted(start, time, side='right') - 1
+		is_inside = (frame_index >= 0) & (time < stop[np.clip(frame_index, 0, None)])
+		return np.bincount(frame_index[is_inside], minlength=len(self.shutter_values))
+
+	@staticmethod
+	def read_spectra_file(filename='', chunk_size=SPECTRA_CHUNK_SIZE):
+		"""
+		yield the time column (s) of the spectra file by chunks. npy files are memory mapped.
+
+		:param filename: spectra file (time, counts) as text or npy
+		:param chunk_size: number of rows per chunk
+		"""
+		if Path(filename).suffix == '.npy':
+			data = np.load(filename, mmap_mode='r')
+			time = data[:, 0] if data.ndim == 2 else data
+			for _start in range(0, len(time), chunk_size):
+				yield np.asarray(time[_start: _start + chunk_size], dtype=float)
+			return
+
+		with open(filename, 'r') as f:
+			first_line = f.readline()
+		separator = ',' if ',' in first_line else r'\s+'
+		reader = pd.read_csv(filename, sep=separator, header=None, usecols=[0], comment='#',
+		                     chunksize=chunk_size)
+		for _chunk in reader:
+			_time = pd.to_numeric(_chunk[0], errors='coerce').to_numpy(dtype=float)
+			yield _time[np.isfinite(_time)]
+
+	def verify(self, spectra_file=''):
+		"""
+		compare the acquired spectra file with the bins expected from the shutter values, row i of the file with
+		expected bin i. A shifted, missing or duplicated bin moves all the rows after it away from their bins
+
+		:param spectra_file: spectra file written by the MCP for the run
+		:return: TimeSpectraReport
+		"""
+		expected_bins = self.expected_bins
+		number_of_bins_expected = len(expected_bins)
+		number_of_frames = len(self.shutter_values)
+		bins_per_frame_expected = np.bincount(self.expected_frame_index, minlength=number_of_frames)
+		bins_per_frame_acquired = np.zeros(number_of_frames, dtype=np.int64)
+
+		number_of_bins_acquired = 0
+		number_of_mismatches = 0
+		first_mismatch_index = -1
+		max_deviation = 0.
+		sums = np.zeros(5)   # n, x, y, xx, xy for the drift fit
+
+		for _time in VerifyTimeSpectra.read_spectra_file(filename=spectra_file, chunk_size=self.chunk_size):
+			_first_row = number_of_bins_acquired
+			number_of_bins_acquired += len(_time)
+			bins_per_frame_acquired += self.count_bins_per_frame(time=_time)
+
+			# the rows after the last expected bin are only counted
+			_time = _time[:max(number_of_bins_expected - _first_row, 0)]
+			if len(_time) == 0:
+				continue
+			_expected = expected_bins[_first_row: _first_row + len(_time)]
+			_deviation = _time - _expected
+			_mismatch = np.flatnonzero(np.abs(_deviation) > self.tolerance)
+
+			if (first_mismatch_index == -1) and (len(_mismatch) > 0):
+				first_mismatch_index = _first_row + int(_mismatch[0])
+			number_of_mismatches += len(_mismatch)
+			max_deviation = max(max_deviation, float(np.abs(_deviation).max()))
+			sums += [len(_expected), _expected.sum(), _deviation.sum(), np.dot(_expected, _expected),
+			         np.dot(_expected, _deviation)]
+
+		if (first_mismatch_index == -1) and (number_of_bins_acquired != number_of_bins_expected):
+			first_mismatch_index = min(number_of_bins_acquired, number_of_bins_expected)
+
+		drift_offset, drift_slope = VerifyTimeSpectra.fit_drift(sums)
+		missing_frames = np.where((bins_per_frame_acquired == 0) & (bins_per_frame_expected > 0))[0]
+		incomplete_frames = np.where((bins_per_frame_acquired > 0) &
+		                             (bins_per_frame_acquired != bins_per_frame_expected))[0]
+
+		return TimeSpectraReport(file_name=str(spectra_file),
+		                         number_of_bins_expected=number_of_bins_expected,
+		                         number_of_bins_acquired=number_of_bins_acquired,
+		                         number_of_mismatches=number_of_mismatches,
+		                         first_mismatch_index=first_mismatch_index,
+		                         max_deviation=max_deviation,
+		                         missing_frames=missing_frames.tolist(),
+		                         incomplete_frames=incomplete_frames.tolist(),
+		                         drift_offset=drift_offset,
+		                         drift_slope=drift_slope)
+
+	def verify_run_directory(self, folder='', pattern=SPECTRA_FILE_PATTERN, max_workers=None):
+		"""
+		verify all the spectra files found in the run folder
+
+		:param folder: run folder
+		:param pattern: glob pattern of the spectra files
+		:param max_workers: number of threads used (one per cpu by default)
+		:return: list of TimeSpectraReport, sorted by file name
+		"""
+		list_spectra_file = sorted(Path(folder).rglob(pattern))
+		with ThreadPoolExecutor(max_workers=max_workers) as executor:
+			return list(executor.map(self.verify, list_spectra_file))
+
+	@staticmethod
+	def fit_drift(sums):
+		"""
+		least square line through the deviations, deviation = offset + slope * time
+
+		:param sums: [n, sum(x), sum(y), sum(x*x), sum(x*y)]
+		:return: offset (s), slope (s/s)
+		"""
+		n, sx, sy, sxx, sxy = sums
+		if n == 0:
+			return 0., 0.
+		denominator = n * sxx - sx * sx
+		if denominator == 0:
+			return sy / n, 0.
+		slope = (n * sxy - sx * sy) / denominator
+		offset = (sy - slope * sx) / n
+		return offset, slope
+
+	@staticmethod
+	def make_reports_dataframe(list_reports=None):
+		"""
+		:param list_reports: list of TimeSpectraReport
+		:return: one row per spectra file
+		"""
+		dataframe = pd.DataFrame(list_reports, columns=TimeSpectraReport._fields)
+		dataframe['is_valid'] = [_report.is_valid for _report in list_reports]
+		return dataframe
@@ -0,0 +1,227 @@
+import json
+import threading
+from pathlib import Path
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile, SHUTTER_VALUE_FILENAME
+from shutter_value_generator.make_shutter_value_file import TimeBinMicros
+from shutter_value_generator.writer import write_file_atomically
+from shutter_value_generator.detector import DEFAULT_DETECTOR
+
+DEBOUNCE_TIME = 0.05  # s - quiet time after the last change before regenerating
+POLL_INTERVAL = 0.01  # s
+
+# process variables the plan depends on
+LIST_PV_NAMES = ['epics_chopper_wavelength_range', 'detector_offset', 'source_frequency']
+
+
+class PVProvider:
+	"""
+	source of the process variables. Subclasses call notify() with the values that changed.
+	"""
+
+	def __init__(self):
+		self.list_callbacks = []
+
+	def subscribe(self, callback=None):
+		"""
+		:param callback: called with a dictionary {pv name: value} each time values change
+		"""
+		self.list_callbacks.append(callback)
+
+	def notify(self, values=None):
+		for _callback in self.list_callbacks:
+			_callback(values)
+
+	def start(self):
+		pass
+
+	def stop(self):
+		pass
+
+
+class SimulatedPVServer(PVProvider):
+	"""
+	in process stand-in for the EPICS PVs, used to test and run the watcher offline
+	"""
+
+	def __init__(self, values=None):
+		super().__init__()
+		self.lock = threading.Lock()
+		self.values = dict(values) if values else {}
+
+	def get(self, name=''):
+		with self.lock:
+			return self.values.get(name)
+
+	def put(self, name='', value=None):
+		with self.lock:
+			self.values[name] = value
+		self.notify({name: value})
+
+	def start(self):
+		with self.lock:
+			values = dict(self.values)
+		if values:
+			self.notify(values)
+
+
+class FileProvider(PVProvider):
+	"""
+	watches a JSON file of {pv name: value}, or all the JSON files of a folder
+	"""
+
+	def __init__(self, path='', poll_interval=POLL_INTERVAL):
+		super().__init__()
+		self.path = Path(path)
+		self.poll_interval = poll_interval
+		self.signatures = {}
+		self.stop_event = threading.Event()
+		self.thread = None
+
+	def get_list_files(self):
+		if self.path.is_dir():
+			return sorted(self.path.glob('*.json'))
+		return [self.path] if self.path.exists() else []
+
+	def poll(self):
+		"""
+		:return: values of the files that changed since the last poll
+		"""
+		values = {}
+		for _file in self.get_list_files():
+			try:
+				_stat = _file.stat()
+			except FileNotFoundError:
+				continue
+			_signature = (_stat.st_mtime_ns, _stat.st_size)
+			if self.signatures.get(_file) == _signature:
+				continue
+			try:
+				with open(_file, 'r') as f:
+					values.update(json.load(f))
+			except ValueError:
+				# file being written, will be read again on the next poll
+				continue
+			self.signatures[_file] = _signature
+		return values
+
+	def run(self):
+		while not self.stop_event.is_set():
+			values = self.poll()
+			if values:
+				self.notify(values)
+			self.stop_event.wait(self.poll_interval)
+
+	def start(self):
+		self.stop_event.clear()
+		self.thread = threading.Thread(target=self.run, daemon=True)
+		self.thread.start()
+
+	def stop(self):
+		self.stop_event.set()
+		if self.thread is not None:
+			self.thread.join()
+
+
+class ShutterValueWatcher:
+
+	def __init__(self, provider=None,
+	             output_folder=None,
+	             output_file_name=SHUTTER_VALUE_FILENAME,
+	             detector_sample_distance=None,
+	             time_bin=TimeBinMicros.ten_twenty_four,
+	             list_lambda_dead_time=None,
+	             debounce_time=DEBOUNCE_TIME,
+	             initial_values=None,
+	             detector=DEFAULT_DETECTOR):
+		"""
+		regenerates the shutter value file each time the process variables change the plan
+
+		:param provider: PVProvider giving the epics_chopper_wavelength_range, detector_offset and
+		source_frequency
+		:param output_folder: folder of the shutter value file
+		:param output_file_name: name of the shutter value file
+		:param detector_sample_distance: in m
+		:param time_bin: one of the time bins of the detector (10.24 or 5.12 micros for the MCP)
+		:param list_lambda_dead_time: lambda dead time of the plan
+		:param debounce_time: s to wait after the last change before regenerating
+		:param initial_values: values of the PVs before the first notification
+		:param detector: name of the detector
+		"""
+		if provider is None:
+			raise AttributeError("Provide a PVProvider!")
+		if output_folder is None:
+			raise AttributeError("Output folder needs to be an existing output folder!")
+
+		self.provider = provider
+		self.filename = Path(output_folder) / output_file_name
+		self.detector_sample_distance = detector_sample_distance
+		self.time_bin = time_bin
+		self.detector = detector
+		self.list_lambda_dead_time = list_lambda_dead_time
+		self.debounce_time = debounce_time
+
+		self.values = dict(initial_values) if initial_values else {}
+		self.lock = threading.Lock()
+		self.regeneration_lock = threading.Lock()
+		self.timer = None
+		self.last_shutter_values_string = None
+		self.last_error = None
+		self.number_of_regenerations = 0
+		self.regenerated = threading.Event()
+
+		self.provider.subscribe(self.on_change)
+
+	def start(self):
+		self.provider.start()
+
+	def stop(self):
+		self.provider.stop()
+		with self.lock:
+			if self.timer is not None:
+				self.timer.cancel()
+
+	def on_change(self, values=None):
+		with self.lock:
+			self.values.update({_name: _value for _name, _value in values.items() if _name in LIST_PV_NAMES})
+			if self.timer is not None:
+				self.timer.cancel()
+			self.timer = threading.Timer(self.debounce_time, self.regenerate)
+			self.timer.daemon = True
+			self.timer.start()
+
+	def make_shutter_values_string(self, values=None):
+		o_make = MakeShutterValueFile(output_folder=str(self.filename.parent),
+		                              detector_sample_distance=self.detector_sample_distance,
+		                              time_bin=self.time_bin,
+		                              detector=self.detector,
+		                              no_output_file=True,
+		                              **values)
+		return o_make.run(list_lambda_dead_time=self.list_lambda_dead_time)
+
+	def regenerate(self):
+		"""
+		write the shutter value file if the plan is different from the one already written
+
+		:return: True if the file has been written
+		"""
+		with self.regeneration_lock:
+			with self.lock:
+				values = dict(self.values)
+			try:
+				shutter_values_string = self.make_shutter_values_string(values=values)
+			except (ValueError, AttributeError, TypeError) as error:
+				# keep the previous file, the detector runs on the last valid plan. A malformed PV value (ex: a
+				# string offset) must not kill the timer thread either
+				self.last_error = error
+				return False
+
+			self.last_error = None
+			if shutter_values_string == self.last_shutter_values_string:
+				return False
+
+			write_file_atomically(text=shutter_values_string, filename=self.filename)
+			self.last_shutter_values_string = shutter_values_string
+			self.number_of_regenerations += 1
+			self.regenerated.set()
+			return True
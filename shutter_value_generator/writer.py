@@ -0,0 +1,145 @@
+import io
+import os
+import time
+import tarfile
+import zipfile
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+
+_umask_lock = threading.Lock()
+
+
+class ArchiveFormat:
+	tar = 'tar'
+	zip = 'zip'
+
+
+def get_umask():
+	"""
+	:return: umask of the process, read from /proc when possible (setting it to read it is not thread safe)
+	"""
+	try:
+		with open('/proc/self/status', 'r') as f:
+			for _line in f:
+				if _line.startswith('Umask:'):
+					return int(_line.split()[1], 8)
+	except OSError:
+		pass
+	with _umask_lock:
+		umask = os.umask(0o022)
+		os.umask(umask)
+	return umask
+
+
+def get_file_mode(filename=''):
+	"""
+	:return: permissions of filename if it exists, the ones open() would give to a new file otherwise
+	"""
+	try:
+		return os.stat(str(filename)).st_mode & 0o7777
+	except FileNotFoundError:
+		return 0o666 & ~get_umask()
+
+
+def fsync_folder(folder=''):
+	"""
+	make the renames done in folder durable (no-op where folders can not be opened, ex: windows)
+	"""
+	try:
+		file_descriptor = os.open(str(folder), os.O_RDONLY)
+	except OSError:
+		return
+	try:
+		os.fsync(file_descriptor)
+	except OSError:
+		pass
+	finally:
+		os.close(file_descriptor)
+
+
+def write_file_atomically(text="", filename='', data=None):
+	"""
+	write in a temporary file of the same folder, fsync then rename. Readers of filename see either the
+	previous or the new content, never a partial file. The file keeps the permissions of the file it replaces,
+	or gets the ones of a file created with open()
+
+	:param text: content to write
+	:param filename: destination
+	:param data: or bytes to write
+	"""
+	filename = Path(filename)
+	mode = get_file_mode(filename=filename)
+	file_descriptor, temporary_file_name = tempfile.mkstemp(dir=str(filename.parent), prefix='.' + filename.name)
+	try:
+		with os.fdopen(file_descriptor, 'wb') as f:
+			f.write(text.encode('utf-8') if data is None else data)
+			f.flush()
+			if hasattr(os, 'fchmod'):
+				os.fchmod(f.fileno(), mode)
+			os.fsync(f.fileno())
+		os.replace(temporary_file_name, str(filename))
+		fsync_folder(folder=filename.parent)
+	except BaseException:
+		if os.path.exists(temporary_file_name):
+			os.remove(temporary_file_name)
+		raise
+
+
+def write_to_destinations(text="", list_output_folder=None, file_name='', max_workers=None):
+	"""
+	write the same file atomically in several folders at the same time
+
+	:param text: content of the file
+	:param list_output_folder: destination folders (instrument share, archive, backup...)
+	:param file_name: name of the file in each folder
+	:param max_workers: number of threads (one per folder by default)
+	:return: list of the files written
+	"""
+	list_filename = [Path(_folder) / file_name for _folder in list_output_folder]
+	if not list_filename:
+		return []
+
+	def _write(filename):
+		try:
+			write_file_atomically(text=text, filename=filename)
+		except OSError as error:
+			return error
+
+	with ThreadPoolExecutor(max_workers=max_workers or len(list_filename)) as executor:
+		list_errors = list(executor.map(_write, list_filename))
+
+	list_failed = ["{}: {}".format(_filename, _error) for _filename, _error in zip(list_filename, list_errors)
+	               if _error is not None]
+	if list_failed:
+		raise OSError("Could not write {}".format(", ".join(list_failed)))
+	return list_filename
+
+
+def write_archive(dict_files=None, archive_file_name='', archive_format=ArchiveFormat.tar):
+	"""
+	write many shutter value files in one archive, built in memory then written atomically
+
+	:param dict_files: {name of the file in the archive: content}
+	:param archive_file_name: destination of the archive
+	:param archive_format: ArchiveFormat.tar or ArchiveFormat.zip
+	"""
+	buffer = io.BytesIO()
+	if archive_format == ArchiveFormat.tar:
+		with tarfile.open(fileobj=buffer, mode='w') as archive:
+			for _name, _text in dict_files.items():
+				_data = _text.encode('utf-8')
+				_info = tarfile.TarInfo(name=_name)
+				_info.size = len(_data)
+				_info.mtime = time.time()
+				archive.addfile(_info, io.BytesIO(_data))
+	elif archive_format == ArchiveFormat.zip:
+		with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+			for _name, _text in dict_files.items():
+				archive.writestr(_name, _text)
+	else:
+		raise ValueError("archive_format must be {} or {}".format(ArchiveFormat.tar, ArchiveFormat.zip))
+
+	write_file_atomically(filename=archive_file_name, data=buffer.getvalue())
@@ -0,0 +1,48 @@
+import argparse
+import json
+import sys
+from shutter_value_generator.service import ShutterValueService, request_plan, DEFAULT_HOST, DEFAULT_PORT
+
+parser = argparse.ArgumentParser(description="Local service generating the ShutterValue.txt content used by the "
+                                             "MCP detector")
+subparsers = parser.add_subparsers(dest='command')
+
+parser_serve = subparsers.add_parser('serve', help='start the service')
+parser_serve.add_argument('--host', default=DEFAULT_HOST, help='HTTP host (localhost by default)')
+parser_serve.add_argument('--port', default=DEFAULT_PORT, type=int, help='HTTP port')
+parser_serve.add_argument('--socket', default=None, help='listen on this unix socket instead of HTTP')
+
+parser_request = subparsers.add_parser('request', help='send a plan request to a running service')
+parser_request.add_argument('plan', help='JSON plan request, ex: \'{"detector_sample_distance": 25, '
+                                         '"detector_offset": 6500, "epics_chopper_wavelength_range": [1, 5], '
+                                         '"list_lambda_dead_time": [2, 3]}\'')
+parser_request.add_argument('--host', default=DEFAULT_HOST, help='HTTP host of the service')
+parser_request.add_argument('--port', default=DEFAULT_PORT, type=int, help='HTTP port of the service')
+parser_request.add_argument('--socket', default=None, help='unix socket of the service')
+
+args = parser.parse_args()
+
+if args.command == 'serve':
+    o_service = ShutterValueService()
+    if args.socket:
+        server = o_service.make_unix_server(socket_path=args.socket)
+        print("Serving on unix socket {}".format(args.socket))
+    else:
+        server = o_service.make_http_server(host=args.host, port=args.port)
+        print("Serving on http://{}:{}/plan".format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+elif args.command == 'request':
+    try:
+        result = request_plan(request=json.loads(args.plan), host=args.host, port=args.port,
+                              socket_path=args.socket)
+    except (ValueError, OSError) as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+    print(result['shutter_values'])
+
+else:
+    parser.print_help()
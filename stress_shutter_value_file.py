@@ -0,0 +1,30 @@
+import argparse
+import os
+from shutter_value_generator.stress_harness import StressHarness, NUMBER_OF_CASES, CHUNK_SIZE
+
+parser = argparse.ArgumentParser(description="Run random geometries and dead times through the shutter value "
+                                             "generator and check the invariants of the frames produced")
+parser.add_argument('--number_of_cases', default=NUMBER_OF_CASES, type=int, help='number of random cases')
+parser.add_argument('--chunk_size', default=CHUNK_SIZE, type=int, help='cases generated and checked at once')
+parser.add_argument('--max_workers', default=os.cpu_count(), type=int, help='number of processes')
+parser.add_argument('--seed', default=None, type=int, help='seed of the random generator')
+parser.add_argument('--source_frequency', default=60, type=int, help='60 or 30 Hz')
+parser.add_argument('--time_bin', default=10.24, type=float, help='10.24 or 5.12 micros')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    o_harness = StressHarness(source_frequency=args.source_frequency, time_bin=args.time_bin)
+    report = o_harness.run(number_of_cases=args.number_of_cases,
+                           chunk_size=args.chunk_size,
+                           seed=args.seed,
+                           max_workers=args.max_workers)
+
+    print("{} cases ({:.0f} cases/s), {} rejected".format(report.number_of_cases, report.cases_per_second,
+                                                         report.number_of_rejected))
+    for _invariant, _number in report.dict_violations.items():
+        print("{}: {} violations".format(_invariant, _number))
+    for _name, _number in report.dict_crashes.items():
+        print("{}: {} crashes".format(_name, _number))
+    print("reference model mismatches: {}".format(report.number_of_reference_mismatches))
+    for _case in report.list_failing_cases:
+        print(_case)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.archive_index import ShutterValuesArchive, calculate_distance, make_fingerprint
+from shutter_value_generator.archive_index import MAX_NUMBER_OF_FRAMES
+
+SHUTTER_VALUES = "1e-6\t2.5e-3\t5\t10.24\n2.9e-3\t5.8e-3\t6\t10.24\n6.2e-3\t15.9e-3\t7\t10.24"
+SHUTTER_VALUES_SHIFTED = "1e-6\t3e-3\t5\t10.24\n3.4e-3\t5.8e-3\t6\t10.24\n6.2e-3\t15.9e-3\t7\t10.24"
+SHUTTER_VALUES_30_HZ = "1e-6\t2.5e-3\t5\t5.12\n2.9e-3\t31.8e-3\t10\t5.12"
+
+
+@pytest.fixture
+def archive_folder(tmp_path):
+	archive_folder = tmp_path / "archive"
+	for _folder, _name, _text in [("2019", "ShutterValues_60_hz_6500_micros.txt", SHUTTER_VALUES),
+	                              ("2020/march", "ShutterValues_60_hz_6000_micros.txt", SHUTTER_VALUES_SHIFTED),
+	                              ("2021", "ShutterValues_30_hz_0_micros.txt", SHUTTER_VALUES_30_HZ),
+	                              ("2021", "ShutterValues.txt", SHUTTER_VALUES),
+	                              ("2021", "ShutterValues_broken.txt", "not a shutter value file")]:
+		(archive_folder / _folder).mkdir(parents=True, exist_ok=True)
+		with open(archive_folder / _folder / _name, 'w') as f:
+			f.write(_text)
+	return archive_folder
+
+def test_parse_file_name():
+	assert ShutterValuesArchive.parse_file_name("a/ShutterValues_30_hz_6500_micros.txt") == (30, 6500)
+	assert ShutterValuesArchive.parse_file_name("ShutterValues.txt") == (None, None)
+
+def test_make_fingerprint():
+	fingerprint = make_fingerprint(shutter_values=[[1e-3, 2e-3, 5, 5.12]])
+	assert fingerprint['frames'].shape == (MAX_NUMBER_OF_FRAMES, 2)
+	np.testing.assert_allclose(fingerprint['frames'][0], [1, 2])
+	assert list(fingerprint['divider'][:2]) == [5, -1]
+	assert fingerprint['time_bin'] == 5.12
+
+def test_calculate_distance():
+	list_frames = np.array([[[1, 3], [4, 6]],
+	                        [[1, 6], [0, 0]],
+	                        [[10, 12], [0, 0]]])
+	distance = calculate_distance(list_frames=list_frames, frames=[[1, 3], [4, 6]])
+	np.testing.assert_allclose(distance, [0, 1, 6])
+
+def test_build_and_find_nearest_plans(archive_folder, tmp_path):
+	o_archive = ShutterValuesArchive(index_folder=tmp_path / "index")
+	list_errors = o_archive.build(archive_folder=archive_folder, max_workers=2)
+	assert len(list_errors) == 1
+	assert "ShutterValues_broken.txt" in list_errors[0]
+
+	fingerprints, metadata = o_archive.load()
+	assert isinstance(fingerprints, np.memmap)
+	assert len(fingerprints) == len(metadata) == 4
+
+	nearest_plans = o_archive.find_nearest_plans(list_tof_frames=[[1e-6, 2.5e-3], [2.9e-3, 5.8e-3],
+	                                                              [6.2e-3, 15.9e-3]],
+	                                             number_of_plans=3,
+	                                             source_frequency=60)
+	assert len(nearest_plans) == 2
+	assert nearest_plans['file_name'][0].endswith("ShutterValues_60_hz_6500_micros.txt")
+	assert nearest_plans['distance'][0] == pytest.approx(0)
+	assert nearest_plans['distance'][1] == pytest.approx(0.8)
+	assert nearest_plans['detector_offset'][1] == 6000
+
+	nearest_plans = o_archive.find_nearest_plans(shutter_values=[[1e-6, 30e-3, 10, 5.12]], time_bin=5.12)
+	assert list(nearest_plans['source_frequency']) == [30]
+
+def test_unreadable_file_is_reported(archive_folder, tmp_path):
+	(archive_folder / "2021" / "ShutterValues_folder.txt").mkdir()
+	(archive_folder / "2021" / "ShutterValues_removed.txt").symlink_to(archive_folder / "missing.txt")
+	o_archive = ShutterValuesArchive(index_folder=tmp_path / "index")
+	list_errors = o_archive.build(archive_folder=archive_folder)
+	assert len(list_errors) == 3
+	assert any("ShutterValues_folder.txt" in _error for _error in list_errors)
+	assert any("ShutterValues_removed.txt" in _error for _error in list_errors)
+	assert len(o_archive.load()[1]) == 4
+
+def test_calculate_distance_on_many_frames():
+	random_generator = np.random.default_rng(0)
+	list_frames = np.sort(random_generator.uniform(0, 16, size=(50, MAX_NUMBER_OF_FRAMES * 2)), axis=1)
+	list_frames = list_frames.reshape(50, MAX_NUMBER_OF_FRAMES, 2)
+	frames = list_frames[7]
+	distance = calculate_distance(list_frames=list_frames, frames=frames)
+	assert distance[7] == pytest.approx(0)
+	# same as the overlap of every pair of frames
+	overlap = np.maximum(np.minimum(list_frames[:, :, np.newaxis, 1], frames[np.newaxis, :, 1]) -
+	                     np.maximum(list_frames[:, :, np.newaxis, 0], frames[np.newaxis, :, 0]), 0).sum(axis=(1, 2))
+	length = (list_frames[..., 1] - list_frames[..., 0]).sum(axis=1)
+	np.testing.assert_allclose(distance, length + length[7] - 2 * overlap, atol=1e-12)
+
+def test_load_without_index(tmp_path):
+	with pytest.raises(ValueError):
+		ShutterValuesArchive(index_folder=tmp_path).load()
+
+def test_empty_archive(tmp_path):
+	o_archive = ShutterValuesArchive(index_folder=tmp_path / "index")
+	assert o_archive.build(archive_folder=tmp_path) == []
+	nearest_plans = o_archive.find_nearest_plans(list_tof_frames=[[1e-3, 2e-3]])
+	assert len(nearest_plans) == 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile, COEFF
+from shutter_value_generator.bin_lookup import make_bin_lookup, write_bin_lookup, load_bin_lookup
+from shutter_value_generator.bin_lookup import BIN_LOOKUP_DTYPE
+
+SHUTTER_VALUES = [[1e-3, 1e-3 + 100 * 0.32e-6, 5, 10.24],
+                  [2e-3, 2e-3 + 49.5 * 0.64e-6, 6, 10.24]]
+
+
+def make_lookup():
+	return make_bin_lookup(shutter_values=SHUTTER_VALUES, detector_sample_distance=25, detector_offset=500)
+
+
+def test_make_bin_lookup():
+	lookup = make_lookup()
+	assert lookup.dtype == BIN_LOOKUP_DTYPE
+	assert list(np.bincount(lookup['frame_index'])) == [100, 50]
+	assert set(lookup['divider'][lookup['frame_index'] == 1]) == {6}
+	assert lookup['tof_start'][100] == 2e-3
+	# the last bin of the frame stops at the end of the frame
+	assert lookup['tof_stop'][-1] == pytest.approx(2e-3 + 49.5 * 0.64e-6)
+	assert np.allclose(lookup['tof_stop'][:99], lookup['tof_start'][1:100])
+	expected_lambda = (lookup['tof_center'] * 1e6 + 500) * COEFF / (25 * 100)
+	assert np.allclose(lookup['lambda_center'], expected_lambda)
+
+def test_write_and_memory_map(tmp_path):
+	lookup = make_lookup()
+	write_bin_lookup(lookup=lookup, filename=tmp_path / 'lookup.npy')
+	loaded = load_bin_lookup(tmp_path / 'lookup.npy')
+	assert isinstance(loaded, np.memmap)
+	assert np.array_equal(loaded, lookup)
+
+def test_write_npz(tmp_path):
+	lookup = make_lookup()
+	write_bin_lookup(lookup=lookup, filename=tmp_path / 'lookup.npz')
+	assert np.array_equal(load_bin_lookup(tmp_path / 'lookup.npz'), lookup)
+
+def test_load_bin_lookup_rejects_other_arrays(tmp_path):
+	np.save(tmp_path / 'other.npy', np.zeros(3))
+	with pytest.raises(ValueError):
+		load_bin_lookup(tmp_path / 'other.npy')
+
+def test_generator_writes_the_lookup_table(tmp_path):
+	o_make = MakeShutterValueFile(output_folder=tmp_path,
+	                              detector_sample_distance=25,
+	                              detector_offset=3000,
+	                              epics_chopper_wavelength_range=[0.5, 6],
+	                              bin_lookup=True)
+	o_make.run(list_lambda_dead_time=[1.5, 2.5])
+	lookup = load_bin_lookup(tmp_path / 'ShutterValues.npy')
+	shutter_values = MakeShutterValueFile.read_shutter_values_file(tmp_path / 'ShutterValues.txt')
+	assert lookup['frame_index'].max() == len(shutter_values) - 1
+	assert np.array_equal(lookup, make_bin_lookup(shutter_values=shutter_values, detector_sample_distance=25,
+	                                              detector_offset=3000))
+
+def test_generator_needs_the_geometry_for_the_lookup_table(tmp_path):
+	with pytest.raises(AttributeError):
+		MakeShutterValueFile(output_folder=tmp_path, default_mode=True, bin_lookup=True)
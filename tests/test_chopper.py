@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.chopper import DiskChopper, ChopperCascade, calculate_transmission
+
+TOLERANCE = 0.01  # Angstroms
+
+# opened during the first third of each 60Hz turn, neutrons above 2.746 Angstroms are blocked and the
+# slow neutrons of the previous pulse between 2.637 and 2.746 Angstroms pollute the 0 to 0.109 Angstroms
+# of the current pulse
+LIST_CHOPPERS = [DiskChopper(distance=8, opening_angle=120, phase=0, speed=60)]
+DETECTOR_SAMPLE_DISTANCE = 25  # m
+
+
+def make_cascade():
+	return ChopperCascade(list_choppers=LIST_CHOPPERS,
+	                      detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                      source_frequency=60)
+
+def test_cascade_needs_choppers_and_distance():
+	with pytest.raises(AttributeError):
+		ChopperCascade(list_choppers=[], detector_sample_distance=DETECTOR_SAMPLE_DISTANCE)
+	with pytest.raises(AttributeError):
+		ChopperCascade(list_choppers=LIST_CHOPPERS)
+
+def test_wavelength_bands():
+	o_cascade = make_cascade()
+	[[transmitted_min, transmitted_max]] = o_cascade.get_wavelength_bands(mask_name='transmitted')
+	assert np.abs(transmitted_min - 0.1) < TOLERANCE
+	assert np.abs(transmitted_max - 2.637) < TOLERANCE
+
+	[[overlap_min, overlap_max]] = o_cascade.get_wavelength_bands(mask_name='overlap')
+	assert np.abs(overlap_min - 2.637) < TOLERANCE
+	assert np.abs(overlap_max - 2.746) < TOLERANCE
+
+	wavelength_range = o_cascade.get_wavelength_range()
+	assert np.abs(wavelength_range[0] - 0.109) < TOLERANCE
+	assert np.abs(wavelength_range[1] - 2.637) < TOLERANCE
+
+def test_transmission_is_cached():
+	calculate_transmission.cache_clear()
+	make_cascade().get_transmission()
+	make_cascade().get_transmission()
+	assert calculate_transmission.cache_info().hits == 1
+	with pytest.raises(ValueError):
+		make_cascade().get_transmission().clean[0] = True
+
+@pytest.mark.parametrize('list_wavelength_requested, is_transmitted_expected',
+                         [([1., 2.], [True, True]),
+                          ([0.3, 2.5, 5], [False, False, False])])
+def test_is_wavelength_transmitted(list_wavelength_requested, is_transmitted_expected):
+	o_cascade = make_cascade()
+	is_transmitted = o_cascade.is_wavelength_transmitted(list_wavelength_requested=list_wavelength_requested)
+	assert list(is_transmitted) == is_transmitted_expected
+
+def test_generator_uses_chopper_range():
+	o_make = MakeShutterValueFile(output_folder="/tmp/",
+	                              detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                              detector_offset=0,
+	                              choppers=make_cascade())
+	assert np.abs(o_make.epics_chopper_wavelength_range[1] - 2.637) < TOLERANCE
+	o_make.check_overlap_wavelength_requested_with_choppers(list_wavelength_requested=[1., 2.])
+	with pytest.raises(ValueError):
+		o_make.check_overlap_wavelength_requested_with_choppers(list_wavelength_requested=[1., 2.5])
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator import clock_ticks
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+
+
+def test_convert_seconds_to_ticks():
+	ticks = clock_ticks.convert_seconds_to_ticks([[1e-6, 2.7e-3], [0.0027000000000000001, 15.9e-3]])
+	assert ticks.dtype == np.int64
+	assert ticks.tolist() == [[200, 540000], [540000, 3180000]]
+	assert np.allclose(clock_ticks.convert_ticks_to_seconds(ticks), [[1e-6, 2.7e-3], [2.7e-3, 15.9e-3]])
+
+@pytest.mark.parametrize('divider, time_bin, ticks_per_bin_expected',
+                         [(0, 5.12, 1),
+                          (0, 10.24, 2),
+                          (5, 10.24, 64),
+                          (-1, 10.24, 1)])
+def test_get_ticks_per_bin(divider, time_bin, ticks_per_bin_expected):
+	assert clock_ticks.get_ticks_per_bin(divider=divider, time_bin=time_bin) == ticks_per_bin_expected
+
+def test_ticks_per_bin_match_clock_cycle_table():
+	list_divider = np.arange(20)
+	width_micros = MakeShutterValueFile.get_time_bin_width(divider=list_divider, time_bin=10.24)
+	ticks_per_bin = clock_ticks.get_ticks_per_bin(divider=list_divider, time_bin=10.24)
+	assert np.allclose(ticks_per_bin * clock_ticks.CLOCK_TICK_NS * 1e-3, width_micros)
+
+def test_snap_list_tof_frames():
+	list_tof_frames = clock_ticks.snap_list_tof_frames(list_tof_frames=[[200, 500001], [129, 1000]],
+	                                                   list_divider=[5, 0],
+	                                                   time_bin=10.24)
+	assert list_tof_frames.tolist() == [[256, 499968], [130, 1000]]
+
+@pytest.mark.parametrize('ticks, string_expected',
+                         [(200, "0.000001"),
+                          (540000, "0.0027"),
+                          (200000000, "1"),
+                          (-200, "-0.000001")])
+def test_format_ticks(ticks, string_expected):
+	assert clock_ticks.format_ticks([ticks]) == [string_expected]
+
+def test_make_shutter_values_string():
+	shutter_values_string = clock_ticks.make_shutter_values_string(list_tof_frames=[[2.56e-6, 0.0027000000000000001]],
+	                                                               list_divider=[5],
+	                                                               time_bin=10.24)
+	assert shutter_values_string == "0.00000256\t0.00269984\t5\t10.24"
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from shutter_value_generator.core import make_plan_config, compute_plan, get_clock_cycle_table
+from shutter_value_generator.core import DEFAULT_SHUTTER_VALUES, RESONANCE_SHUTTER_VALUES, TOF_FRAMES
+from shutter_value_generator.core import convert_lambda_to_tof, convert_tof_to_lambda, COEFF
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.bin_lookup import read_shutter_values_string
+from shutter_value_generator import clock_ticks
+
+CONFIG = make_plan_config(detector_sample_distance=25,
+                          detector_offset=3000,
+                          epics_chopper_wavelength_range=[1, 5])
+LIST_LAMBDA_DEAD_TIME = [[1.5, 2.5], [1.5, 2., 3.], [2., 3.5]]
+
+
+def test_config_is_immutable():
+	assert CONFIG.epics_chopper_wavelength_range == (1, 5)
+	with pytest.raises(AttributeError):
+		CONFIG.detector_offset = 0
+	assert isinstance(TOF_FRAMES, tuple)
+
+def test_config_is_checked():
+	with pytest.raises(AttributeError):
+		make_plan_config(detector_offset=3000, epics_chopper_wavelength_range=[1, 5])
+	with pytest.raises(AttributeError):
+		make_plan_config(detector_sample_distance=25, detector_offset=3000, epics_chopper_wavelength_range=[1])
+	with pytest.raises(AttributeError):
+		make_plan_config(resonance_mode=True, default_mode=True)
+
+def test_clock_cycle_table_is_read_only():
+	clock_cycle_table = get_clock_cycle_table()
+	with pytest.raises(ValueError):
+		clock_cycle_table.divider[0] = 3
+
+def test_fixed_plans():
+	assert compute_plan(config=make_plan_config(default_mode=True)).shutter_values_string == DEFAULT_SHUTTER_VALUES
+	plan = compute_plan(config=make_plan_config(resonance_mode=True))
+	assert plan.shutter_values_string == RESONANCE_SHUTTER_VALUES
+	assert plan.list_tof_frames is None
+
+def test_compute_plan_matches_wrapper(tmp_path):
+	plan = compute_plan(config=CONFIG, list_lambda_dead_time=[1.5, 2.5])
+	o_make = MakeShutterValueFile(output_folder=tmp_path,
+	                              no_output_file=True,
+	                              detector_sample_distance=25,
+	                              detector_offset=3000,
+	                              epics_chopper_wavelength_range=[1, 5])
+	assert o_make.run(list_lambda_dead_time=[1.5, 2.5]) == plan.shutter_values_string
+	assert o_make.final_list_tof_frames == [list(_tof_frame) for _tof_frame in plan.list_tof_frames]
+	assert len(plan.list_divider) == len(plan.list_tof_frames)
+
+def test_compute_plan_is_deterministic_across_workers():
+	expected = [compute_plan(CONFIG, _list_lambda_dead_time) for _list_lambda_dead_time in LIST_LAMBDA_DEAD_TIME]
+	with ThreadPoolExecutor(max_workers=3) as executor:
+		assert list(executor.map(compute_plan, [CONFIG] * 3, LIST_LAMBDA_DEAD_TIME)) == expected
+	with ProcessPoolExecutor(max_workers=2) as executor:
+		assert list(executor.map(compute_plan, [CONFIG] * 3, LIST_LAMBDA_DEAD_TIME)) == expected
+
+def test_convert_lambda_to_tof_is_vectorized():
+	list_wavelength = np.array([[1., 2.], [3., 4.]])
+	detector_sample_distance = np.array([[20.], [25.]])
+	tof = convert_lambda_to_tof(list_wavelength=list_wavelength, detector_offset=3000,
+	                            detector_sample_distance=detector_sample_distance, output_units='s')
+	assert tof.shape == (2, 2)
+	np.testing.assert_allclose(tof, (list_wavelength * detector_sample_distance * 100 / COEFF - 3000) * 1e-6)
+	np.testing.assert_allclose(convert_tof_to_lambda(tof=tof, detector_offset=3000,
+	                                                 detector_sample_distance=detector_sample_distance,
+	                                                 input_units='s'), list_wavelength)
+	assert convert_tof_to_lambda(tof=0, detector_offset=3000, detector_sample_distance=25) == \
+	       pytest.approx(MakeShutterValueFile.convert_tof_to_lambda(tof=0, detector_offset=3000,
+	                                                                detector_sample_distance=25))
+
+def test_plan_frames_are_the_snapped_ticks():
+	plan = compute_plan(config=CONFIG, list_lambda_dead_time=[1.5, 2.5])
+	list_tof_frames_ticks = np.array(plan.list_tof_frames_ticks, dtype=np.int64)
+	list_ticks_per_bin = clock_ticks.get_ticks_per_bin(divider=plan.list_divider, time_bin=CONFIG.time_bin)
+	assert np.all(list_tof_frames_ticks % list_ticks_per_bin[:, np.newaxis] == 0)
+	assert plan.list_tof_frames == tuple(map(tuple, clock_ticks.convert_ticks_to_seconds(list_tof_frames_ticks)))
+	# the first frame starts at 1e-6 s, moved up to the first bin of its divider
+	assert plan.list_tof_frames[0][0] > TOF_FRAMES[0][0]
+	shutter_values = read_shutter_values_string(plan.shutter_values_string)
+	np.testing.assert_array_equal(shutter_values[:, 0:2], plan.list_tof_frames)
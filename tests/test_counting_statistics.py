@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import COEFF
+from shutter_value_generator.counting_statistics import CountingStatistics
+
+FLAT_SPECTRUM = [[0, 1000], [20, 1000]]
+SHUTTER_VALUES = [[1e-3, 1e-3 + 100 * 0.32e-6, 5, 10.24],
+                  [2e-3, 2e-3 + 50 * 0.64e-6, 6, 10.24]]
+DISTANCE = 25
+
+
+def get_lambda(tof):
+	return tof * 1e6 * COEFF / (DISTANCE * 100)
+
+
+@pytest.fixture
+def counting():
+	return CountingStatistics(spectrum=FLAT_SPECTRUM, detector_sample_distance=DISTANCE, detector_offset=0)
+
+
+def test_read_spectrum_file(tmp_path):
+	text_file = tmp_path / 'spectrum.txt'
+	text_file.write_text("# wavelength, flux\n1, 10\n2, 20\n3, 30\n")
+	npy_file = tmp_path / 'spectrum.npy'
+	np.save(npy_file, np.array([[1, 10], [2, 20], [3, 30]]))
+	assert np.array_equal(CountingStatistics.read_spectrum_file(text_file),
+	                      CountingStatistics.read_spectrum_file(npy_file))
+
+def test_bad_spectrum():
+	with pytest.raises(ValueError):
+		CountingStatistics(spectrum=[1, 2, 3], detector_sample_distance=DISTANCE, detector_offset=0)
+	with pytest.raises(AttributeError):
+		CountingStatistics(detector_sample_distance=DISTANCE, detector_offset=0)
+
+def test_predict_counts_of_flat_spectrum(counting):
+	bins = counting.predict_counts(shutter_values=SHUTTER_VALUES, run_time=10)
+	assert list(np.bincount(bins['frame_index'])) == [100, 50]
+	expected_counts = 1000 * get_lambda(np.where(bins['frame_index'] == 0, 0.32e-6, 0.64e-6)) * 10
+	assert np.allclose(bins['counts'], expected_counts)
+	assert np.allclose(bins['uncertainty'], np.sqrt(expected_counts))
+
+def test_edge_uncertainty(counting):
+	edge = get_lambda(1e-3 + 10.5 * 0.32e-6)
+	report = counting.run(shutter_values=SHUTTER_VALUES, list_wavelength_requested=[edge, 100], run_time=10,
+	                      margin=get_lambda(5 * 0.32e-6))
+	assert report['bin_index'].tolist() == [10, -1]
+	counts = 1000 * get_lambda(0.32e-6) * 10
+	assert report['counts'][0] == pytest.approx(counts)
+	assert report['relative_uncertainty'][0] == pytest.approx(1 / np.sqrt(counts))
+	assert report['window_counts'][0] == pytest.approx(10 * counts)
+	assert np.isnan(report['relative_uncertainty'][1])
+
+def test_exposure_reaches_target_precision(counting):
+	edge = get_lambda(2e-3 + 20.5 * 0.64e-6)
+	exposure = counting.get_exposure(shutter_values=SHUTTER_VALUES, list_wavelength_requested=[edge],
+	                                 target_relative_uncertainty=0.01)
+	report = counting.run(shutter_values=SHUTTER_VALUES, list_wavelength_requested=[edge],
+	                      run_time=exposure['run_time'][0])
+	assert report['relative_uncertainty'][0] == pytest.approx(0.01)
+	assert exposure['window_run_time'][0] < exposure['run_time'][0]
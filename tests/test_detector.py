@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator import detector
+from shutter_value_generator.detector import get_detector, get_list_detectors, read_detector_file
+from shutter_value_generator.core import make_plan_config, compute_plan
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+
+TINY_DETECTOR = """# name: tiny
+# time_bins: 1, 0.5
+# reference_time_bin: 1
+# max_rows: 3
+# max_bins_per_frame: 1000
+Clock, Divided, TimeBin(micros), Range(ms)
+1, 0, 1, 1
+0.5, 1, 2, 2
+0.25, 2, 4, 4
+0.125, 3, 8, 8
+0.0625, 4, 16, 16
+"""
+
+
+@pytest.fixture
+def tiny_detector_folder(tmp_path, monkeypatch):
+	with open(tmp_path / "tiny.txt", 'w') as f:
+		f.write(TINY_DETECTOR)
+	monkeypatch.setattr(detector, 'DETECTORS_FOLDER', tmp_path)
+	get_detector.cache_clear()
+	yield tmp_path
+	get_detector.cache_clear()
+
+def test_list_detectors():
+	assert {'mcp', 'timepix'} <= set(get_list_detectors())
+
+def test_mcp_uses_clock_cycle_table():
+	o_mcp = get_detector('mcp')
+	clock_cycle_data = MakeShutterValueFile.get_clock_cycle_table()
+	np.testing.assert_allclose(o_mcp.clock_cycle_table.range_ms, clock_cycle_data['Range(ms)'])
+	assert o_mcp.time_bins == (10.24, 5.12)
+	assert get_detector('mcp') is o_mcp
+	with pytest.raises(ValueError):
+		o_mcp.clock_cycle_table.time_bin[0] = 1
+
+def test_unknown_detector():
+	with pytest.raises(AttributeError):
+		get_detector('not_a_detector')
+
+def test_detector_file_needs_limits(tmp_path):
+	with open(tmp_path / "broken.txt", 'w') as f:
+		f.write("# time_bins: 1\n")
+	with pytest.raises(ValueError):
+		read_detector_file(tmp_path / "broken.txt")
+
+def test_timepix_plan(tmp_path):
+	with pytest.raises(AttributeError):
+		MakeShutterValueFile(output_folder=tmp_path, detector_sample_distance=25, detector_offset=3000,
+		                     epics_chopper_wavelength_range=[1, 5], detector='timepix')
+	o_make = MakeShutterValueFile(output_folder=tmp_path, detector_sample_distance=25, detector_offset=3000,
+	                              epics_chopper_wavelength_range=[1, 5], detector='timepix', time_bin=0.025,
+	                              no_output_file=True)
+	shutter_values = np.array([_line.split() for _line in o_make.run(list_lambda_dead_time=[1.5, 2.5]).split("\n")],
+	                          dtype=float)
+	assert list(shutter_values[:, 2]) == [1, 1, 2, 1]
+	assert list(shutter_values[:, 3]) == [0.025] * 4
+	# frames start and stop on the bins of their divider (25 ns for divider 0)
+	bin_width = 25e-9 * 2 ** shutter_values[:, 2:3]
+	assert np.allclose(np.round(shutter_values[:, 0:2] / bin_width), shutter_values[:, 0:2] / bin_width)
+
+def test_detector_limits(tiny_detector_folder):
+	config = make_plan_config(detector_sample_distance=25, detector_offset=3000, epics_chopper_wavelength_range=[1, 5],
+	                          detector='tiny', time_bin=1)
+	with pytest.raises(ValueError):
+		compute_plan(config=config, list_lambda_dead_time=[1.5, 2.5])
+	plan = compute_plan(config=config, list_lambda_dead_time=[1.5, 3.5])
+	assert plan.list_divider == (2, 2, 4)
+
+def test_smaller_time_bin_keeps_the_divider(tiny_detector_folder):
+	# 0.5 micros halves the bins in the range of the divider, up to max_bins_per_frame bins
+	assert MakeShutterValueFile.get_above_closest_divided(delta_tof=0.4e-3, time_bin=1, detector='tiny') == 0
+	assert MakeShutterValueFile.get_above_closest_divided(delta_tof=0.4e-3, time_bin=0.5, detector='tiny') == 0
+	assert MakeShutterValueFile.get_above_closest_divided(delta_tof=0.9e-3, time_bin=1, detector='tiny') == 0
+	assert MakeShutterValueFile.get_above_closest_divided(delta_tof=0.9e-3, time_bin=0.5, detector='tiny') == 1
+	assert MakeShutterValueFile.get_above_closest_divided(delta_tof=20e-3, time_bin=1, detector='tiny') == -1
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile, COEFF
+from shutter_value_generator.feasibility import Feasibility
+
+DETECTOR_SAMPLE_DISTANCE = 25  # m
+DETECTOR_OFFSET = 3000  # micros
+EPICS_CHOPPER_WAVELENGTH_RANGE = [0.5, 4.5]  # Angstroms
+
+
+def make_feasibility():
+	return Feasibility(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                   detector_offset=DETECTOR_OFFSET,
+	                   epics_chopper_wavelength_range=EPICS_CHOPPER_WAVELENGTH_RANGE)
+
+def test_minimum_measurable_lambda():
+	o_feasibility = make_feasibility()
+	minimum_measurable_lambda_expected = DETECTOR_OFFSET * COEFF / (DETECTOR_SAMPLE_DISTANCE * 100)
+	assert np.abs(o_feasibility.get_minimum_measurable_lambda() - minimum_measurable_lambda_expected) < 1e-9
+
+def test_report_flags_every_constraint():
+	# minimum measurable lambda is 0.47 Angstroms, 60Hz frames stop at 15.9ms (2.99 Angstroms). The margin of
+	# 1.5 Angstroms crosses the 5.8-6.2ms readout gap, inside the second frame of the plan
+	list_wavelength_requested = [0.6, 1.5, 2., 2.9, 4.4]
+	report = make_feasibility().run(list_wavelength_requested=list_wavelength_requested,
+	                                list_tof_frames=[[1e-6, 4e-3], [4.4e-3, 15.9e-3]])
+	assert list(report['above_minimum_measurable']) == [False, True, True, True, True]
+	assert list(report['within_frame_span']) == [False, False, True, False, False]
+	assert list(report['within_chopper_range']) == [False, True, True, True, False]
+	assert list(report['within_frame_margin']) == [False, True, True, False, False]
+	assert list(report['is_feasible']) == [False, False, True, False, False]
+	assert report['frame_index'][2] == 1
+
+def test_edge_in_a_readout_gap_is_not_feasible():
+	o_feasibility = Feasibility(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                            detector_offset=DETECTOR_OFFSET,
+	                            margin=0)
+	# edges at 6ms (inside the 5.8-6.2ms readout gap) and 7ms
+	list_wavelength_requested = (np.array([6000, 7000]) + DETECTOR_OFFSET) * COEFF / (DETECTOR_SAMPLE_DISTANCE * 100)
+	report = o_feasibility.run(list_wavelength_requested=list_wavelength_requested)
+	assert list(report['within_frame_span']) == [False, True]
+	o_feasibility.source_frequency = 30
+	assert list(o_feasibility.run(list_wavelength_requested=list_wavelength_requested)['within_frame_span']) == \
+	       [False, True]
+
+def test_report_without_frames_does_not_check_frame_margin():
+	report = make_feasibility().run(list_wavelength_requested=[1.9, 2.])
+	assert report['within_frame_margin'].all()
+	assert report['is_feasible'].all()
+
+def test_make_sure_list_wavelength_requested_can_be_measure():
+	o_make = MakeShutterValueFile(output_folder="/tmp/",
+	                              detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                              detector_offset=DETECTOR_OFFSET,
+	                              epics_chopper_wavelength_range=EPICS_CHOPPER_WAVELENGTH_RANGE)
+	assert o_make.minimum_measurable_lambda is not None
+	o_make.make_sure_list_wavelength_requested_can_be_measure(list_wavelength_requested=[1.9, 2.])
+	with pytest.raises(ValueError):
+		o_make.make_sure_list_wavelength_requested_can_be_measure(list_wavelength_requested=[0.6, 2.])
+	with pytest.raises(ValueError):
+		o_make.make_sure_list_wavelength_requested_can_be_measure(list_wavelength_requested=[1.5, 4.4])
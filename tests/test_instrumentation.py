@@ -0,0 +1,68 @@
+import json
+import pytest
+
+from shutter_value_generator import instrumentation
+from shutter_value_generator.instrumentation import InMemorySink, PrometheusTextSink, JsonLinesSink
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+
+LIST_STAGES = ['validation', 'dead_time_conversion', 'frame_construction', 'divider_lookup', 'formatting',
+               'file_writing']
+
+
+def run_plan(output_folder):
+	o_make = MakeShutterValueFile(output_folder=output_folder,
+	                              detector_sample_distance=21,
+	                              detector_offset=6000,
+	                              epics_chopper_wavelength_range=[2, 10])
+	return o_make.run(list_lambda_dead_time=[3, 5])
+
+@pytest.fixture
+def sink():
+	yield instrumentation.enable_instrumentation(PrometheusTextSink())
+	instrumentation.disable_instrumentation()
+
+def test_disabled_instrumentation_returns_null_span():
+	instrumentation.disable_instrumentation()
+	assert instrumentation.span('validation') is instrumentation.NULL_SPAN
+	with instrumentation.span('validation'):
+		pass
+
+def test_every_stage_is_recorded(sink, tmp_path):
+	run_plan(tmp_path)
+	run_plan(tmp_path)
+	assert list(sink.spans.keys()) == LIST_STAGES
+	for _stage in LIST_STAGES:
+		assert sink.spans[_stage]['count'] == 2
+	assert sink.counters == {'frames': 8, 'plans': 2}
+
+def test_prometheus_dump(sink, tmp_path):
+	run_plan(tmp_path)
+	text = sink.dump()
+	assert 'shutter_value_span_seconds_count{stage="formatting"} 1' in text
+	assert 'shutter_value_plans_total 1' in text
+
+def test_in_memory_sink_aggregates():
+	o_sink = InMemorySink()
+	o_sink.record_span(name='stage', duration=1.)
+	o_sink.record_span(name='stage', duration=3.)
+	assert o_sink.spans['stage'] == {'count': 2, 'total': 4., 'min': 1., 'max': 3.}
+	o_sink.reset()
+	assert not o_sink.spans
+
+def test_json_lines_sink(tmp_path):
+	o_sink = instrumentation.enable_instrumentation(JsonLinesSink(filename=tmp_path / "metrics.jsonl"))
+	try:
+		run_plan(tmp_path)
+	finally:
+		instrumentation.disable_instrumentation()
+		o_sink.close()
+	with open(tmp_path / "metrics.jsonl", 'r') as f:
+		list_records = [json.loads(_line) for _line in f]
+	assert [_record['name'] for _record in list_records if _record['type'] == 'span'] == LIST_STAGES
+
+def test_run_with_profile(tmp_path):
+	shutter_values_string = instrumentation.run_with_profile(function=lambda: run_plan(tmp_path),
+	                                                         output_folder=tmp_path)
+	assert shutter_values_string
+	assert (tmp_path / instrumentation.PROFILE_FILE_NAME).exists()
+	assert (tmp_path / instrumentation.MEMORY_PROFILE_FILE_NAME).exists()
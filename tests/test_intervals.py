@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator import intervals
+from shutter_value_generator.core import make_list_tof_frames, make_list_tof_frames_ticks, get_tof_frames
+from shutter_value_generator.core import MIN_TOF_BETWEEN_FRAMES
+
+
+def test_merge():
+	merged = intervals.merge([[5, 6], [0, 2], [1, 3], [3, 4], [7, 7]])
+	np.testing.assert_allclose(merged, [[0, 4], [5, 6]])
+	np.testing.assert_allclose(intervals.merge([[0, 1], [1.5, 2], [3, 4]], min_gap=1), [[0, 2], [3, 4]])
+	assert intervals.merge([]).shape == (0, 2)
+
+def test_union_and_intersection():
+	intervals_a = [[0, 2], [5, 8], [9, 10]]
+	intervals_b = [[1, 6], [7, 12]]
+	np.testing.assert_allclose(intervals.union(intervals_a, intervals_b), [[0, 12]])
+	np.testing.assert_allclose(intervals.intersection(intervals_a, intervals_b), [[1, 2], [5, 6], [7, 8], [9, 10]])
+	assert intervals.intersection(intervals_a, []).shape == (0, 2)
+
+def test_difference():
+	intervals_a = [[0, 2], [5, 8], [9, 10]]
+	np.testing.assert_allclose(intervals.difference(intervals_a, [[1, 6], [7, 12]]), [[0, 1], [6, 7]])
+	np.testing.assert_allclose(intervals.difference(intervals_a, []), intervals_a)
+	assert intervals.difference(intervals_a, [[-1, 11]]).shape == (0, 2)
+
+def test_get_gaps():
+	np.testing.assert_allclose(intervals.get_gaps([[5, 6], [0, 2], [1, 3], [8, 9]]), [[3, 5], [6, 8]])
+	assert intervals.get_gaps([[0, 1]]).shape == (0, 2)
+
+def test_integer_intervals_stay_integer():
+	intervals_a = np.array([[0, 200], [500, 800]], dtype=np.int64)
+	intervals_b = np.array([[100, 600]], dtype=np.int64)
+	for _result in (intervals.union(intervals_a, intervals_b, []),
+	                intervals.intersection(intervals_a, intervals_b),
+	                intervals.difference(intervals_a, intervals_b),
+	                intervals.get_gaps(intervals_a)):
+		assert _result.dtype == np.int64
+	np.testing.assert_array_equal(intervals.difference(intervals_a, intervals_b), [[0, 100], [600, 800]])
+	assert intervals.union([[0.5, 1]], intervals_a).dtype == float
+
+def test_frames_are_built_in_ticks():
+	list_tof_frames_ticks = make_list_tof_frames_ticks(list_tof_dead_time=[9e-3])
+	assert list_tof_frames_ticks.dtype == np.int64
+	np.testing.assert_array_equal(list_tof_frames_ticks, [[200, 500000], [580000, 1160000], [1240000, 1720000],
+	                                                      [1880000, 3180000]])
+	# the frames in s are the closest floats to the exact values
+	assert make_list_tof_frames(list_tof_dead_time=[9e-3])[1] == (2.9e-3, 5.8e-3)
+
+def test_no_sliver_frame_next_to_a_readout_gap():
+	# the dead interval starts 0.1 ms after the 2.5-2.9 ms readout gap
+	list_tof_frames = make_list_tof_frames(list_tof_dead_time=[3e-3 + MIN_TOF_BETWEEN_FRAMES, 12e-3])
+	np.testing.assert_allclose(list_tof_frames, [[1e-6, 2.5e-3],
+	                                             [3.4e-3 + MIN_TOF_BETWEEN_FRAMES, 5.8e-3],
+	                                             [6.2e-3, 12e-3 - MIN_TOF_BETWEEN_FRAMES],
+	                                             [12e-3 + MIN_TOF_BETWEEN_FRAMES, 15.9e-3]])
+
+def test_large_sets_match_a_boolean_grid():
+	random_generator = np.random.default_rng(0)
+	start = random_generator.integers(0, 10000, size=(2, 5000))
+	list_intervals = [np.column_stack([_start, _start + random_generator.integers(1, 20, size=len(_start))])
+	                  for _start in start]
+	grid = np.zeros((2, 10100), dtype=bool)
+	for _index, _intervals in enumerate(list_intervals):
+		for _start, _stop in _intervals:
+			grid[_index, _start:_stop] = True
+
+	def covered(result):
+		_grid = np.zeros(10100, dtype=bool)
+		for _start, _stop in result.astype(int):
+			_grid[_start:_stop] = True
+		return _grid
+
+	assert np.array_equal(covered(intervals.union(*list_intervals)), grid[0] | grid[1])
+	assert np.array_equal(covered(intervals.intersection(*list_intervals)), grid[0] & grid[1])
+	assert np.array_equal(covered(intervals.difference(*list_intervals)), grid[0] & ~grid[1])
+
+@pytest.mark.parametrize('source_frequency', [60, 30])
+def test_frames_keep_the_readout_gaps(source_frequency):
+	tof_frames = np.array(get_tof_frames(source_frequency=source_frequency))
+	# crossing dead times and a dead time inside a readout gap
+	list_tof_dead_time = [9e-3, 2.7e-3, 9.3e-3]
+	list_tof_frames = np.array(make_list_tof_frames(list_tof_dead_time=list_tof_dead_time,
+	                                                source_frequency=source_frequency))
+	assert np.all(list_tof_frames[:, 1] > list_tof_frames[:, 0])
+	assert np.all(list_tof_frames[1:, 0] - list_tof_frames[:-1, 1] >= MIN_TOF_BETWEEN_FRAMES - 1e-12)
+	assert len(intervals.difference(list_tof_frames, tof_frames)) == 0
+	np.testing.assert_allclose(list_tof_frames[:4], [[1e-6, 2.7e-3 - MIN_TOF_BETWEEN_FRAMES],
+	                                                 [3.1e-3, 5.8e-3],
+	                                                 [6.2e-3, 9e-3 - MIN_TOF_BETWEEN_FRAMES],
+	                                                 [9.3e-3 + MIN_TOF_BETWEEN_FRAMES, 15.9e-3]])
+	assert len(list_tof_frames) == len(tof_frames) + 1
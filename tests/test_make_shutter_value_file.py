@@ -13,6 +13,8 @@ from shutter_value_generator.make_shutter_value_file import DEFAULT_SHUTTER_VALU
 from shutter_value_generator.make_shutter_value_file import MIN_TOF_BETWEEN_FRAMES
 from shutter_value_generator.make_shutter_value_file import TOF_FRAMES
 from shutter_value_generator.make_shutter_value_file import COEFF
+from shutter_value_generator.core import get_list_bin_width
+from shutter_value_generator.bin_lookup import read_shutter_values_string
 
 def make_tmp_ascii_filename():
 	ascii_filename = NamedTemporaryFile(prefix='TestingShutterValue', suffix='.txt').name
@@ -190,13 +192,13 @@ def test_create_shutter_value_for_resonance_mode():
 	file_contain_expected = RESONANCE_SHUTTER_VALUES
 	assert file_contain_created == file_contain_expected
 
-# @pytest.mark.parametrize('list_wavelength_requested, epics_chopper_wavelength_range',
-#                          [([10, 20], [9.8, 30]),
-#                           ([12, 29.9], [9.8, 30])])
-# def test_lambda_to_close_to_edge_of_epics_chopper_raise_error(list_wavelength_requested, epics_chopper_wavelength_range):
-# 	with pytest.raises(ValueError):
-# 		MakeShutterValueFile.check_overlap_wavelength_requested_with_chopper_settings(list_wavelength_requested=list_wavelength_requested,
-# 								                                                     epics_chopper_wavelength_range=epics_chopper_wavelength_range)
+@pytest.mark.parametrize('list_wavelength_requested, epics_chopper_wavelength_range',
+                         [([10, 20], [9.8, 30]),
+                          ([12, 29.9], [9.8, 30])])
+def test_lambda_to_close_to_edge_of_epics_chopper_raise_error(list_wavelength_requested, epics_chopper_wavelength_range):
+	with pytest.raises(ValueError):
+		MakeShutterValueFile.check_overlap_wavelength_requested_with_chopper_settings(list_wavelength_requested=list_wavelength_requested,
+								                                                     epics_chopper_wavelength_range=epics_chopper_wavelength_range)
 
 # def test_initialize_dictionary_of_list_of_wavelength_requested():
 # 	list_of_wavelength_requested = [2, 5, 10, 20]
@@ -290,28 +292,35 @@ def test_list_lambda_dead_time_3_elements():
 	                             detector_sample_distance=detector_sample_distance,
 	                             epics_chopper_wavelength_range=epics_chopper_wavelength_range)
 	list_lambda_dead_time = [3, 5, 8]
-	o_make.run(list_lambda_dead_time=list_lambda_dead_time)
+	shutter_values = read_shutter_values_string(o_make.run(list_lambda_dead_time=list_lambda_dead_time))
 
 	final_list_tof_frames_calculated = o_make.final_list_tof_frames
 	list_tof_dead_time = o_make.list_tof_dead_time
+	# the readout gaps of TOF_FRAMES are kept, the dead times at 5 and 8 Angstroms are after the last frame
 	final_list_tof_frames_expected = []
-	final_list_tof_frames_expected.append([TOF_FRAMES[0][0],
+	final_list_tof_frames_expected.append(list(TOF_FRAMES[0]))
+	final_list_tof_frames_expected.append(list(TOF_FRAMES[1]))
+	final_list_tof_frames_expected.append([TOF_FRAMES[2][0],
 	                                       list_tof_dead_time[0] - MIN_TOF_BETWEEN_FRAMES])
 	final_list_tof_frames_expected.append([list_tof_dead_time[0] + MIN_TOF_BETWEEN_FRAMES,
-	                                       list_tof_dead_time[1] - MIN_TOF_BETWEEN_FRAMES])
-	final_list_tof_frames_expected.append([list_tof_dead_time[1] + MIN_TOF_BETWEEN_FRAMES,
-	                                       list_tof_dead_time[2] - MIN_TOF_BETWEEN_FRAMES])
-	final_list_tof_frames_expected.append([list_tof_dead_time[2] + MIN_TOF_BETWEEN_FRAMES,
-	                                       TOF_FRAMES[-1][1]])
-	for _calculated_range, _expected_range in zip(final_list_tof_frames_calculated, final_list_tof_frames_expected):
-		assert _calculated_range == _expected_range
-
-@pytest.mark.parametrize('delta_tof, above_closest_expected',
-                         [(2.5e-3, 5),
-                          (0.1e-3, 9),
-                          (25e-3, 2)])
-def test_getting_right_above_closest_divided(delta_tof, above_closest_expected):
-	above_closest_divided = MakeShutterValueFile.get_above_closest_divided(delta_tof=delta_tof)
+	                                       TOF_FRAMES[2][1]])
+	assert len(final_list_tof_frames_calculated) == len(final_list_tof_frames_expected)
+	# the frames are snapped to the bins of their divider, they are the values written in the file
+	np.testing.assert_array_equal(final_list_tof_frames_calculated, shutter_values[:, 0:2])
+	list_bin_width = get_list_bin_width(list_divider=shutter_values[:, 2], time_bin=o_make.time_bin) * 1e-6
+	for _calculated_range, _expected_range, _bin_width in zip(final_list_tof_frames_calculated,
+	                                                          final_list_tof_frames_expected, list_bin_width):
+		assert _expected_range[0] - 1e-12 <= _calculated_range[0] < _expected_range[0] + _bin_width
+		assert _expected_range[1] - _bin_width < _calculated_range[1] <= _expected_range[1] + 1e-12
+
+@pytest.mark.parametrize('delta_tof, time_bin, above_closest_expected',
+                         [(2.5e-3, 10.24, 5),
+                          (0.1e-3, 10.24, 0),
+                          (25e-3, 10.24, 8),
+                          (25e-3, 5.12, 8),
+                          (100, 10.24, -1)])
+def test_getting_right_above_closest_divided(delta_tof, time_bin, above_closest_expected):
+	above_closest_divided = MakeShutterValueFile.get_above_closest_divided(delta_tof=delta_tof, time_bin=time_bin)
 	assert above_closest_divided == above_closest_expected
 
 def test_make_shutter_value_string():
@@ -330,6 +339,5 @@ def test_make_shutter_value_string():
 	                                                                output_units='s')
 	list_tof_frames = o_make.make_list_tof_frames(list_tof_dead_time=list_tof_dead_time)
 	shutter_value_string = o_make.make_shutter_values_string(list_tof_frames=list_tof_frames)
-	shutter_values_string_expected = "1e-06\t0.009525040036703266\t3\t10.24\n0.010325040036703264\t" + \
-		"0.02014173339450544\t3\t10.24\n0.020941733394505443\t0.036066773431208704\t2\t10.24\n" + \
-		                             "0.0368667734312087\t0.0159\t19\t10.24"
+	shutter_values_string_expected = "0.00000128\t0.00249984\t5\t10.24\n0.00290016\t0.0058\t5\t10.24\n" + \
+		                             "0.0062\t0.0095248\t5\t10.24\n0.01032512\t0.01589952\t6\t10.24"
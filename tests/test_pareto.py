@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shutter_value_generator.core import make_plan_config, compute_plan
+from shutter_value_generator.pareto import ParetoExplorer, get_pareto_front, stack_plans, DICT_METRICS
+
+LIST_WAVELENGTH_REQUESTED = [2.0, 3.0, 4.2]
+
+
+@pytest.fixture
+def explorer():
+	return ParetoExplorer(detector_sample_distance=25,
+	                      detector_offset=3000,
+	                      list_wavelength_requested=LIST_WAVELENGTH_REQUESTED,
+	                      epics_chopper_wavelength_range=[0.5, 6])
+
+
+def test_get_pareto_front():
+	metrics = [[3, 1.0],
+	           [2, 2.0],
+	           [1, 1.5],
+	           [3, 1.0],
+	           [3, 0.5]]
+	is_on_front = get_pareto_front(metrics=metrics, list_maximize=[True, True])
+	assert is_on_front.tolist() == [True, True, False, False, False]
+
+def test_stack_plans_pads_with_nan():
+	frames, bin_width = stack_plans(list_shutter_values=[[[1e-6, 1e-3, 5, 10.24]],
+	                                                     [[1e-6, 1e-3, 5, 10.24], [2e-3, 3e-3, 6, 10.24]]])
+	assert frames.shape == (2, 2, 2)
+	assert np.isnan(frames[0, 1]).all() and np.isnan(bin_width[0, 1])
+	assert bin_width[1, 1] == pytest.approx(2 * bin_width[1, 0])
+
+def test_score(explorer):
+	metrics = explorer.score(list_shutter_values=[[[1e-6, 1e-3 + 1e-6, 0, 10.24]],
+	                                              [[1e-6, 1e-3 + 1e-6, 1, 10.24]]])
+	assert metrics['total_number_of_bins'].tolist() == [100000, 50000]
+	assert metrics['mean_lambda_per_bin'][1] == pytest.approx(2 * metrics['mean_lambda_per_bin'][0])
+	# the edges are all outside of this single frame
+	assert metrics['number_of_edges_covered'].tolist() == [0, 0]
+	assert (metrics['worst_edge_margin'] < 0).all()
+
+def test_run_keeps_the_trade_offs(explorer):
+	list_list_lambda_dead_time = [[1.0, 2.5], [1.0, 1.5], [2.0, 2.5]]
+	front = explorer.run(list_list_lambda_dead_time=list_list_lambda_dead_time)
+	metrics = front[list(DICT_METRICS)]
+	assert set(front['list_lambda_dead_time']) == {tuple(_list) for _list in list_list_lambda_dead_time}
+	assert front['number_of_edges_covered'].tolist() == [1, 1, 0]
+	assert metrics['mean_lambda_per_bin'].idxmin() == metrics['total_number_of_bins'].idxmax()
+
+def test_identical_plans_are_kept_once(explorer):
+	front = explorer.run(list_list_lambda_dead_time=[[1.5, 2.5], [1.5, 2.5]])
+	assert len(front) == 1
+
+def test_five_twelve_time_bin_trades_bins_for_resolution(explorer):
+	front = explorer.run(list_list_lambda_dead_time=[[1.5, 2.5]], list_time_bin=[10.24, 5.12]).set_index('time_bin')
+	assert len(front) == 2
+	assert front.loc[5.12, 'mean_lambda_per_bin'] == pytest.approx(front.loc[10.24, 'mean_lambda_per_bin'] / 2,
+	                                                               rel=1e-3)
+	assert front.loc[5.12, 'total_number_of_bins'] > 1.99 * front.loc[10.24, 'total_number_of_bins']
+
+def test_score_matches_compute_plan(explorer):
+	config = make_plan_config(detector_sample_distance=25, detector_offset=3000,
+	                          epics_chopper_wavelength_range=[0.5, 6])
+	plan = compute_plan(config=config, list_lambda_dead_time=[1.5, 2.5])
+	candidates, _ = explorer.make_candidates(list_list_lambda_dead_time=[[1.5, 2.5]])
+	assert candidates['shutter_values_string'][0] == plan.shutter_values_string
+
+def test_save(explorer, tmp_path):
+	front = explorer.run(list_list_lambda_dead_time=[[1.0, 2.5], [1.5, 2.5]])
+	ParetoExplorer.save(front=front, filename=tmp_path / 'front.csv')
+	ParetoExplorer.save(front=front, filename=tmp_path / 'front.npz')
+	assert len(pd.read_csv(tmp_path / 'front.csv')) == len(front)
+	with np.load(tmp_path / 'front.npz') as data:
+		assert set(data.files) == set(front.columns)
+		assert len(data['worst_edge_margin']) == len(front)
@@ -0,0 +1,62 @@
+import time
+import threading
+import numpy as np
+import pytest
+
+from notebooks.planning_dashboard import DashboardState, compute_dashboard_plan, parse_list_values, make_traces
+from notebooks.planning_dashboard import get_changed_traces, make_summary, Debouncer
+
+STATE = DashboardState(detector_sample_distance=25,
+                       detector_offset=3000,
+                       source_frequency=60,
+                       time_bin=10.24,
+                       list_lambda_dead_time=(1.5, 2.5),
+                       list_wavelength_requested=(1., 2., 4.),
+                       epics_chopper_wavelength_range=(0.5, 6),
+                       detector='mcp')
+
+
+def test_parse_list_values():
+	assert parse_list_values("1.5, 2.5;3") == (1.5, 2.5, 3.)
+	assert parse_list_values("") == ()
+	with pytest.raises(ValueError):
+		parse_list_values("1.5, a")
+
+def test_compute_dashboard_plan_is_cached():
+	result = compute_dashboard_plan(state=STATE)
+	assert result.error is None
+	assert len(result.list_tof_frames) == 4
+	assert len(result.list_number_of_bins) == 4
+	# the window of the 1 Angstrom edge crosses the 2.5-2.9 ms readout gap
+	assert result.list_is_feasible == (False, True, False)
+	assert compute_dashboard_plan(state=STATE) is result
+
+def test_invalid_state_reports_error():
+	result = compute_dashboard_plan(state=STATE._replace(list_lambda_dead_time=(1.5, 1.6)))
+	assert result.error is not None
+	assert "red" in make_summary(result=result)
+
+def test_only_changed_traces_are_updated():
+	traces = make_traces(state=STATE, result=compute_dashboard_plan(state=STATE))
+	assert get_changed_traces(previous_traces=None, traces=traces) == list(traces.keys())
+	assert get_changed_traces(previous_traces=traces, traces=traces) == []
+
+	state = STATE._replace(list_wavelength_requested=(1., 2.))
+	new_traces = make_traces(state=state, result=compute_dashboard_plan(state=state))
+	assert get_changed_traces(previous_traces=traces, traces=new_traces) == ['infeasible_edges']
+	np.testing.assert_allclose(new_traces['frames'][0], traces['frames'][0])
+
+def test_debouncer():
+	list_calls = []
+	called = threading.Event()
+
+	def _function(value):
+		list_calls.append(value)
+		called.set()
+
+	o_debouncer = Debouncer(function=_function, debounce_time=0.05)
+	for _value in range(5):
+		o_debouncer(_value)
+	assert called.wait(1)
+	time.sleep(0.1)
+	assert list_calls == [4]
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import COEFF
+from shutter_value_generator.make_shutter_value_file import MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+from shutter_value_generator.resolution import Resolution
+
+DISTANCE = 25
+# 1 micros of tof is LAMBDA_PER_MICROS Angstroms
+LAMBDA_PER_MICROS = COEFF / (DISTANCE * 100)
+SHUTTER_VALUES = [[1e-6, 2.5e-3, 5, 10.24],
+                  [2.9e-3, 5.8e-3, 6, 10.24]]
+
+
+@pytest.fixture
+def resolution():
+	return Resolution(detector_sample_distance=DISTANCE, detector_offset=0)
+
+
+def test_delta_lambda_per_edge(resolution):
+	list_wavelength_requested = [1e3 * LAMBDA_PER_MICROS, 4e3 * LAMBDA_PER_MICROS, 2.7e3 * LAMBDA_PER_MICROS]
+	report = resolution.run_plan(shutter_values=SHUTTER_VALUES, list_wavelength_requested=list_wavelength_requested)
+	assert report['frame_index'].tolist() == [0, 1, -1]
+	assert report['delta_lambda'][0] == pytest.approx(0.32 * LAMBDA_PER_MICROS)
+	assert report['delta_lambda'][1] == pytest.approx(0.64 * LAMBDA_PER_MICROS)
+	assert np.isnan(report['delta_lambda'][2])
+	assert report['relative_resolution'][0] == pytest.approx(0.32 / 1e3)
+
+def test_number_of_bins_in_window(resolution):
+	wavelength = 5e3 * LAMBDA_PER_MICROS
+	report = resolution.run_plan(shutter_values=[[1e-6, 10e-3, 6, 10.24]], list_wavelength_requested=[wavelength])
+	expected = 2 * MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME / (0.64 * LAMBDA_PER_MICROS)
+	assert report['number_of_bins_in_window'][0] == pytest.approx(expected, abs=2)
+
+def test_window_across_frames_counts_bins_of_both_frames(resolution):
+	# the window covers the end of the first frame, the gap and the start of the second frame
+	wavelength = 2.7e3 * LAMBDA_PER_MICROS
+	left = wavelength - MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+	right = wavelength + MIN_LAMBDA_PEAK_VALUE_FROM_EDGE_OF_FRAME
+	report = resolution.run_plan(shutter_values=SHUTTER_VALUES, list_wavelength_requested=[wavelength])
+	expected = (2.5e3 - left / LAMBDA_PER_MICROS) / 0.32 + (right / LAMBDA_PER_MICROS - 2.9e3) / 0.64
+	assert report['number_of_bins_in_window'][0] == pytest.approx(expected, abs=3)
+
+def test_vectorized_across_plans(resolution):
+	list_wavelength_requested = [0.2, 0.3, 0.45, 0.3]
+	list_shutter_values = [SHUTTER_VALUES, SHUTTER_VALUES[:1], [[1e-6, 16e-3, 9, 10.24]]]
+	report = resolution.run(list_shutter_values=list_shutter_values,
+	                        list_wavelength_requested=list_wavelength_requested)
+	assert report.delta_lambda.shape == (3, 4)
+	for _index, _shutter_values in enumerate(list_shutter_values):
+		_report = resolution.run_plan(shutter_values=_shutter_values,
+		                              list_wavelength_requested=list_wavelength_requested)
+		assert np.array_equal(report.frame_index[_index], _report['frame_index'])
+		assert np.allclose(report.delta_lambda[_index], _report['delta_lambda'], equal_nan=True)
+		assert np.array_equal(report.number_of_bins_in_window[_index], _report['number_of_bins_in_window'])
+	assert report.delta_lambda[0, 1] == report.delta_lambda[0, 3]
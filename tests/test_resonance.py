@@ -0,0 +1,136 @@
+import warnings
+import numpy as np
+import pytest
+from pathlib import Path
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile, MIN_TOF_BETWEEN_FRAMES
+from shutter_value_generator.make_shutter_value_file import RESONANCE_SHUTTER_VALUES, TOF_FRAMES, COEFF, MN, H
+from shutter_value_generator.resonance import ResonancePlanner, convert_energy_to_lambda, EV
+from shutter_value_generator.core import make_plan_config, compute_plan
+from shutter_value_generator import detector
+from shutter_value_generator.detector import get_detector
+
+DETECTOR_SAMPLE_DISTANCE = 25  # m
+ONE_ROW_DETECTOR = """# name: one_row
+# time_bins: 10.24
+# reference_time_bin: 10.24
+# max_rows: 1
+# max_bins_per_frame: 100000
+Clock, Divided, TimeBin(micros), Range(ms)
+100, 0, 1, 100
+"""
+
+
+def convert_tof_to_energy(list_tof=None):
+	wavelength = np.asarray(list_tof) * 1e6 * COEFF / (DETECTOR_SAMPLE_DISTANCE * 100)
+	return (H / (wavelength * 1e-10)) ** 2 / (2 * MN * EV)
+
+def test_convert_energy_to_lambda():
+	# 25.3 meV thermal neutrons are 1.798 Angstroms
+	assert np.abs(convert_energy_to_lambda(energy=[0.0253])[0] - 1.798) < 1e-3
+
+def test_get_list_resonance_energy_from_bundled_table():
+	o_planner = ResonancePlanner(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE)
+	list_resonance_energy = o_planner.get_list_resonance_energy(list_isotopes=['U-238'])
+	assert list_resonance_energy[0] == 6.674
+	assert np.all(np.diff(list_resonance_energy) > 0)
+	with pytest.raises(ValueError):
+		o_planner.get_list_resonance_energy(list_isotopes=['Xx-999'])
+
+def test_user_resonance_table(tmp_path):
+	table_file = tmp_path / "resonances.csv"
+	with open(table_file, 'w') as f:
+		f.write("Isotope, Energy(eV)\nMy-1, 10\nMy-1, 20\n")
+	o_planner = ResonancePlanner(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                             resonance_energies_table=table_file)
+	assert list(o_planner.get_list_resonance_energy(list_isotopes=['My-1'])) == [10, 20]
+
+def test_make_list_tof_frames():
+	o_planner = ResonancePlanner(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE)
+	tof = o_planner.convert_energy_to_tof(list_resonance_energy=[6.674])[0]
+	[[start, stop]] = o_planner.make_list_tof_frames(list_resonance_energy=[6.674])
+	assert start < tof < stop
+	assert np.abs((stop - start) - 0.1 * tof) < 1e-12
+
+def test_close_resonances_share_a_frame():
+	list_tof_frames = ResonancePlanner.merge_list_tof_frames(list_tof_frames=[[1e-3, 2e-3],
+	                                                                         [5e-3, 6e-3],
+	                                                                         [2.1e-3, 3e-3]])
+	assert list_tof_frames.tolist() == [[1e-3, 3e-3], [5e-3, 6e-3]]
+
+def test_combined_plan_keeps_bragg_frames_after_resonances():
+	o_planner = ResonancePlanner(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE)
+	list_tof_frames = o_planner.make_combined_list_tof_frames(list_resonance_energy=[20.87, 36.68],
+	                                                          list_tof_bragg_frames=[[1e-6, 5e-3],
+	                                                                                 [5.4e-3, 15.9e-3]])
+	assert list_tof_frames[-1] == [5.4e-3, 15.9e-3]
+	for _left, _right in zip(list_tof_frames[:-1], list_tof_frames[1:]):
+		assert _right[0] - _left[1] >= MIN_TOF_BETWEEN_FRAMES - 1e-12
+
+def test_generator_resonance_mode_with_isotopes(tmp_path):
+	o_make = MakeShutterValueFile(output_folder=tmp_path,
+	                              resonance_mode=True,
+	                              detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                              detector_offset=0,
+	                              list_resonance_isotopes=['Ta-181'])
+	o_make.run()
+	with open(Path(tmp_path) / "ShutterValues.txt", 'r') as f:
+		file_contain_created = f.read()
+	assert file_contain_created != RESONANCE_SHUTTER_VALUES
+	assert len(file_contain_created.split("\n")) == len(o_make.final_list_tof_frames)
+
+def test_timepix_resonance_plan(tmp_path):
+	o_make = MakeShutterValueFile(output_folder=tmp_path,
+	                              resonance_mode=True,
+	                              detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                              detector_offset=0,
+	                              list_resonance_isotopes=['U-238'],
+	                              detector='timepix',
+	                              time_bin=0.025,
+	                              no_output_file=True)
+	with warnings.catch_warnings():
+		warnings.simplefilter('error')
+		shutter_values = np.array([_line.split() for _line in o_make.run().split("\n")], dtype=float)
+	assert len(shutter_values) == len(o_make.final_list_tof_frames)
+	assert np.all(shutter_values[:, 1] > shutter_values[:, 0])
+	assert np.all(shutter_values[:, 3] == 0.025)
+	# frames snapped on the timepix bins of their divider (25 ns for divider 0)
+	bin_width = 25e-9 * 2 ** shutter_values[:, 2:3]
+	assert np.allclose(np.round(shutter_values[:, 0:2] / bin_width), shutter_values[:, 0:2] / bin_width)
+
+def test_resonance_frames_stop_at_the_readout_gaps():
+	o_planner = ResonancePlanner(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE)
+	list_tof = np.array([2.6e-3, 5.6e-3, 6e-3, 10e-3])
+	list_resonance_energy = convert_tof_to_energy(list_tof=list_tof)
+	np.testing.assert_allclose(o_planner.convert_energy_to_tof(list_resonance_energy=list_resonance_energy), list_tof)
+	list_tof_frames = np.array(o_planner.make_list_tof_frames(list_resonance_energy=list_resonance_energy))
+	# each frame is inside one frame of the source
+	frame_index = np.searchsorted(np.array(TOF_FRAMES)[:, 0], list_tof_frames[:, 0], side='right') - 1
+	assert np.all(list_tof_frames[:, 1] <= np.array(TOF_FRAMES)[frame_index, 1])
+	# the slivers left next to the readout gaps ([2.47e-3, 2.5e-3] and [6.2e-3, 6.3e-3]) are dropped
+	np.testing.assert_allclose(list_tof_frames, [[5.32e-3, 5.8e-3],
+	                                             [9.5e-3, 10.5e-3]])
+
+def test_short_resonance_frames_are_kept_when_not_cut():
+	o_planner = ResonancePlanner(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE)
+	[[start, stop]] = o_planner.make_list_tof_frames(list_resonance_energy=[6.674])
+	assert stop - start < MIN_TOF_BETWEEN_FRAMES
+
+def test_resonance_plan_is_validated(tmp_path, monkeypatch):
+	config = make_plan_config(resonance_mode=True, detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                          list_resonance_energy=convert_tof_to_energy(list_tof=[4e-3, 10e-3]).tolist())
+	assert len(compute_plan(config=config).list_tof_frames) > 1
+	with pytest.raises(ValueError):
+		compute_plan(config=config, list_lambda_dead_time=[2.])
+	with pytest.raises(ValueError):
+		compute_plan(config=config, list_lambda_dead_time=[2., 2.1])
+
+	with open(tmp_path / "one_row.txt", 'w') as f:
+		f.write(ONE_ROW_DETECTOR)
+	monkeypatch.setattr(detector, 'DETECTORS_FOLDER', tmp_path)
+	get_detector.cache_clear()
+	try:
+		with pytest.raises(ValueError):
+			compute_plan(config=config._replace(detector='one_row'))
+	finally:
+		get_detector.cache_clear()
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+
+from shutter_value_generator.result_store import ResultStore, parse_query
+
+SCHEMA = [('source_frequency', 'i2'),
+          ('time_bin', 'f8'),
+          ('worst_edge_margin', 'f8'),
+          ('total_number_of_bins', 'i8'),
+          ('list_lambda_dead_time', 'S32')]
+
+
+def make_rows(number_of_rows=1000, seed=0):
+	random_generator = np.random.default_rng(seed)
+	return {'source_frequency': random_generator.choice([30, 60], size=number_of_rows),
+	        'time_bin': random_generator.choice([10.24, 5.12], size=number_of_rows),
+	        'worst_edge_margin': random_generator.uniform(-1, 1, size=number_of_rows),
+	        'total_number_of_bins': random_generator.integers(1000, 10000, size=number_of_rows),
+	        'list_lambda_dead_time': np.array(['1.5,2.5'] * number_of_rows)}
+
+
+def _append(arguments):
+	folder, seed = arguments
+	return ResultStore(folder=folder).append(make_rows(number_of_rows=100, seed=seed))
+
+
+def test_parse_query():
+	assert parse_query("source_frequency == 30 and worst_edge_margin > 0.4 and total_number_of_bins < 5000") == \
+	       [('source_frequency', '==', 30.), ('worst_edge_margin', '>', 0.4), ('total_number_of_bins', '<', 5000.)]
+	with pytest.raises(ValueError):
+		parse_query("source_frequency is 30")
+
+def test_append_and_reopen(tmp_path):
+	store = ResultStore(folder=tmp_path / 'store', schema=SCHEMA)
+	rows = make_rows()
+	store.append(rows)
+	store.append(make_rows(seed=1))
+	reopened = ResultStore(folder=tmp_path / 'store')
+	assert reopened.number_of_rows == 2000
+	column = reopened.get_column('worst_edge_margin')
+	assert isinstance(column, np.memmap)
+	assert np.array_equal(column[:1000], rows['worst_edge_margin'])
+	assert reopened.get_column('list_lambda_dead_time')[0] == b'1.5,2.5'
+	assert len(reopened.query("list_lambda_dead_time == '1.5,2.5'")) == 2000
+
+def test_query_with_and_without_index(tmp_path):
+	store = ResultStore(folder=tmp_path, schema=SCHEMA)
+	rows = make_rows()
+	store.append(rows)
+	query = "source_frequency == 30 and worst_edge_margin > 0.4 and total_number_of_bins < 5000"
+	expected = np.flatnonzero((rows['source_frequency'] == 30) & (rows['worst_edge_margin'] > 0.4) &
+	                          (rows['total_number_of_bins'] < 5000))
+	assert list(store.query(query).index) == list(expected)
+
+	for _column in ['source_frequency', 'worst_edge_margin', 'total_number_of_bins']:
+		store.build_index(_column)
+	assert list(store.query(query).index) == list(expected)
+
+	# the rows appended after the index are scanned
+	new_rows = make_rows(seed=2)
+	store.append(new_rows)
+	result = store.query(query, list_columns=['worst_edge_margin'])
+	assert len(result) == len(expected) + np.count_nonzero((new_rows['source_frequency'] == 30) &
+	                                                       (new_rows['worst_edge_margin'] > 0.4) &
+	                                                       (new_rows['total_number_of_bins'] < 5000))
+	assert list(result.columns) == ['worst_edge_margin']
+	assert (result['worst_edge_margin'] > 0.4).all()
+
+def test_index_rebuilt_by_another_worker(tmp_path):
+	store = ResultStore(folder=tmp_path, schema=SCHEMA)
+	rows = make_rows()
+	store.append(rows)
+	store.build_index('worst_edge_margin')
+	reader = ResultStore(folder=tmp_path)
+
+	# another worker appends and indexes more rows than the reader has seen
+	store.append(make_rows(seed=1))
+	store.build_index('worst_edge_margin')
+	mask = reader.select(column='worst_edge_margin', operator_name='>', value=0.4)
+	assert list(np.flatnonzero(mask)) == list(np.flatnonzero(rows['worst_edge_margin'] > 0.4))
+	reader.refresh()
+	assert np.count_nonzero(reader.select(column='worst_edge_margin', operator_name='>', value=0.4)) == \
+	       np.count_nonzero(store.get_column('worst_edge_margin') > 0.4)
+
+def test_interrupted_append_is_overwritten(tmp_path):
+	store = ResultStore(folder=tmp_path, schema=SCHEMA)
+	store.append(make_rows(number_of_rows=10))
+	with open(store.get_column_file_name('time_bin'), 'ab') as f:
+		f.write(np.zeros(3).tobytes())
+	store.append(make_rows(number_of_rows=10, seed=1))
+	assert store.get_column_file_name('time_bin').stat().st_size == 20 * 8
+	assert np.array_equal(store.get_column('time_bin')[10:], make_rows(number_of_rows=10, seed=1)['time_bin'])
+
+def test_parallel_appends(tmp_path):
+	ResultStore(folder=tmp_path, schema=SCHEMA)
+	with ProcessPoolExecutor(max_workers=4) as executor:
+		list(executor.map(_append, [(tmp_path, _seed) for _seed in range(8)]))
+	store = ResultStore(folder=tmp_path)
+	assert store.number_of_rows == 800
+	assert sorted(np.unique(store.get_column('total_number_of_bins')).tolist()) == \
+	       sorted(np.unique(np.concatenate([make_rows(100, _seed)['total_number_of_bins']
+	                                        for _seed in range(8)])).tolist())
+
+def test_errors(tmp_path):
+	with pytest.raises(AttributeError):
+		ResultStore(folder=tmp_path)
+	store = ResultStore(folder=tmp_path, schema=SCHEMA)
+	with pytest.raises(ValueError):
+		store.append({'time_bin': [10.24]})
+	with pytest.raises(ValueError):
+		store.get_column('detector_offset')
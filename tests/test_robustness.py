@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import COEFF
+from shutter_value_generator.robustness import GeometryRobustness, count_edges_out_of_margin
+
+DETECTOR_SAMPLE_DISTANCE = 25  # m
+LIST_TOF_FRAMES = [[1e-3, 10e-3], [10.4e-3, 15.9e-3]]
+
+
+def lambda_right_at_end_of_first_frame(margin=0.3):
+	return LIST_TOF_FRAMES[0][1] * 1e6 * COEFF / (DETECTOR_SAMPLE_DISTANCE * 100) - margin
+
+def test_parameters_are_required():
+	with pytest.raises(AttributeError):
+		GeometryRobustness(detector_sample_distance=DETECTOR_SAMPLE_DISTANCE, detector_offset=0)
+	with pytest.raises(AttributeError):
+		GeometryRobustness(list_tof_frames=LIST_TOF_FRAMES, detector_offset=0)
+
+def test_count_edges_out_of_margin():
+	number_out_of_margin = count_edges_out_of_margin(list_tof_frames=np.array(LIST_TOF_FRAMES),
+	                                                 list_wavelength_requested=np.array([0.95, 1.6, 5]),
+	                                                 detector_sample_distance=np.array([25., 25.]),
+	                                                 detector_offset=np.array([0., 0.]),
+	                                                 margin=0.3)
+	assert list(number_out_of_margin) == [0, 2, 2]
+
+def test_probability_out_of_margin():
+	o_robustness = GeometryRobustness(list_tof_frames=LIST_TOF_FRAMES,
+	                                  detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                                  detector_offset=0)
+	report = o_robustness.run(list_wavelength_requested=[0.95, lambda_right_at_end_of_first_frame()],
+	                          number_of_draws=20000, chunk_size=3000, seed=1)
+	assert report.number_of_draws == 20000
+	assert report.probability_out_of_margin[0] == 0
+	assert np.abs(report.probability_out_of_margin[1] - 0.5) < 0.02
+
+def test_process_pool_gives_same_statistics():
+	o_robustness = GeometryRobustness(list_tof_frames=LIST_TOF_FRAMES,
+	                                  detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                                  detector_offset=0)
+	report = o_robustness.run(list_wavelength_requested=[lambda_right_at_end_of_first_frame()],
+	                          number_of_draws=20000, chunk_size=5000, seed=2, max_workers=2)
+	assert np.abs(report.probability_out_of_margin[0] - 0.5) < 0.02
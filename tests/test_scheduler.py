@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shutter_value_generator.scheduler import BeamtimeScheduler, Geometry, get_greedy_set_cover, order_list_geometry
+from shutter_value_generator.scheduler import BEAMTIME_SCHEDULE_FILE_NAME
+from shutter_value_generator.sequence import SequencePlanner, get_list_wavelength_from_lattice_parameter
+
+LIST_HKL = [[1, 1, 0], [2, 0, 0], [2, 1, 1], [2, 2, 0], [3, 1, 0]]
+
+
+@pytest.fixture
+def scheduler():
+	return BeamtimeScheduler(detector_sample_distance=25, epics_chopper_wavelength_range=[0.5, 10])
+
+
+def make_proposal(number_of_samples=40):
+	"""
+	ferritic and austenitic samples, one sample out of three can also use the 30 Hz setup
+	"""
+	random_generator = np.random.default_rng(0)
+	list_lattice_parameter = np.concatenate([random_generator.uniform(2.86, 2.90, number_of_samples // 2),
+	                                         random_generator.uniform(3.55, 3.62, number_of_samples // 2)])
+	list_list_wavelength_requested = [get_list_wavelength_from_lattice_parameter(lattice_parameter=_lattice_parameter,
+	                                                                             list_hkl=LIST_HKL)
+	                                  for _lattice_parameter in list_lattice_parameter]
+	list_list_geometry = [[(6000, 60), (6000, 30)] if _index % 3 == 0 else [(3000, 60), (6000, 60)]
+	                      for _index in range(number_of_samples)]
+	return list_list_wavelength_requested, list_list_geometry
+
+
+def test_get_greedy_set_cover():
+	matrix = np.array([[1, 0, 1],
+	                   [1, 1, 0],
+	                   [0, 1, 0],
+	                   [0, 0, 0]], dtype=bool)
+	assert get_greedy_set_cover(matrix=matrix) == [0, 1]
+	assert get_greedy_set_cover(matrix=np.zeros((3, 0), dtype=bool)) == []
+
+def test_order_list_geometry():
+	list_geometry = [Geometry(6000, 60), Geometry(3000, 60), Geometry(6000, 30)]
+	# one parameter changes at each step
+	assert order_list_geometry(list_geometry=list_geometry) == [Geometry(6000, 30), Geometry(6000, 60),
+	                                                            Geometry(3000, 60)]
+
+def test_run_groups_the_samples(scheduler):
+	list_list_wavelength_requested, list_list_geometry = make_proposal()
+	schedule, list_plans = scheduler.run(list_list_wavelength_requested=list_list_wavelength_requested,
+	                                     list_list_geometry=list_list_geometry)
+	assert sorted(schedule['sample_index']) == list(range(40))
+	assert (schedule['plan_index'] >= 0).all()
+	assert schedule['is_switch'].sum() == len(list_plans) <= 3
+	# each geometry is set up once, and each sample uses one of its geometries
+	number_of_geometries = len(schedule[['detector_offset', 'source_frequency']].drop_duplicates())
+	assert schedule['is_reconfiguration'].sum() == number_of_geometries
+	for _, _row in schedule.iterrows():
+		assert (_row['detector_offset'], _row['source_frequency']) in list_list_geometry[_row['sample_index']]
+
+def test_plans_cover_all_the_measurable_edges(scheduler):
+	list_list_wavelength_requested, list_list_geometry = make_proposal(number_of_samples=10)
+	schedule, list_plans = scheduler.run(list_list_wavelength_requested=list_list_wavelength_requested,
+	                                     list_list_geometry=list_list_geometry)
+	for _, _row in schedule.iterrows():
+		_list_wavelength_requested = list_list_wavelength_requested[_row['sample_index']]
+		_list_windows = [scheduler.get_planner(geometry=Geometry(*_geometry)).get_measurable_windows(
+				list_wavelength_requested=_list_wavelength_requested)
+				for _geometry in list_list_geometry[_row['sample_index']]]
+		windows = scheduler.get_planner(geometry=Geometry(_row['detector_offset'], _row['source_frequency'])). \
+			get_measurable_windows(list_wavelength_requested=_list_wavelength_requested)
+		# the geometry used measures as many edges as the best one allowed, and the plan covers all of them
+		assert _row['number_of_edges_covered'] == len(windows) == max(len(_windows) for _windows in _list_windows)
+		assert SequencePlanner.is_plan_valid(list_tof_frames=list_plans[_row['plan_index']].list_tof_frames,
+		                                     windows=windows)
+
+def test_sample_without_plan_is_last(scheduler):
+	list_list_wavelength_requested, list_list_geometry = make_proposal(number_of_samples=4)
+	list_list_wavelength_requested.append([20.])
+	list_list_geometry.append([(3000, 60)])
+	schedule, _ = scheduler.run(list_list_wavelength_requested=list_list_wavelength_requested,
+	                            list_list_geometry=list_list_geometry,
+	                            list_sample_name=['a', 'b', 'c', 'd', 'out_of_range'])
+	assert schedule['sample_name'].iloc[-1] == 'out_of_range'
+	assert schedule['plan_index'].iloc[-1] == -1
+	assert not schedule['is_reconfiguration'].iloc[-1]
+	with pytest.raises(ValueError):
+		scheduler.run(list_list_wavelength_requested=list_list_wavelength_requested,
+		              list_list_geometry=list_list_geometry[:-1])
+
+def test_export_schedule(scheduler, tmp_path):
+	list_list_wavelength_requested, list_list_geometry = make_proposal(number_of_samples=12)
+	schedule, list_plans = scheduler.run(list_list_wavelength_requested=list_list_wavelength_requested,
+	                                     list_list_geometry=list_list_geometry)
+	exported = BeamtimeScheduler.export_schedule(schedule=schedule, list_plans=list_plans, output_folder=tmp_path)
+	written = pd.read_csv(tmp_path / BEAMTIME_SCHEDULE_FILE_NAME)
+	assert written['sample_index'].tolist() == schedule['sample_index'].tolist()
+	assert written['file_name'].tolist() == exported['file_name'].tolist()
+	assert all((tmp_path / _file_name).exists() for _file_name in written['file_name'])
+	assert len(list(tmp_path.glob('ShutterValues_plan_*.txt'))) == len(list_plans)
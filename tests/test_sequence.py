@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shutter_value_generator.sequence import SequencePlanner, get_list_wavelength_from_lattice_parameter
+from shutter_value_generator.sequence import SCHEDULE_FILE_NAME
+
+LIST_HKL = [[1, 1, 0], [2, 0, 0], [2, 1, 1], [2, 2, 0], [3, 1, 0]]
+IRON_LATTICE_PARAMETER = 2.8665  # Angstroms
+
+
+@pytest.fixture
+def planner():
+	return SequencePlanner(detector_sample_distance=25, detector_offset=6000, epics_chopper_wavelength_range=[0.5, 6])
+
+
+def make_ramp(number_of_steps=50, expansion=0.15):
+	ramp = np.linspace(IRON_LATTICE_PARAMETER, IRON_LATTICE_PARAMETER * (1 + expansion), number_of_steps)
+	return np.concatenate([ramp, ramp[::-1]])
+
+
+def test_get_list_wavelength_from_lattice_parameter():
+	list_wavelength = get_list_wavelength_from_lattice_parameter(lattice_parameter=IRON_LATTICE_PARAMETER,
+	                                                             list_hkl=LIST_HKL)
+	assert list_wavelength[1] == pytest.approx(IRON_LATTICE_PARAMETER)
+	assert list_wavelength[0] == pytest.approx(IRON_LATTICE_PARAMETER * np.sqrt(2))
+
+def test_dead_times_are_away_from_the_edges(planner):
+	list_wavelength = get_list_wavelength_from_lattice_parameter(lattice_parameter=IRON_LATTICE_PARAMETER,
+	                                                             list_hkl=LIST_HKL)
+	windows = planner.get_measurable_windows(list_wavelength_requested=list_wavelength)
+	list_lambda_dead_time = planner.pick_list_lambda_dead_time(windows=windows)
+	assert len(list_lambda_dead_time) >= 2
+	assert np.all(np.diff(list_lambda_dead_time) > 0.3)
+	# the edges whose window crosses a readout gap of the source are not measurable
+	list_wavelength_measurable = planner.convert_tof_to_lambda(windows.mean(axis=1))
+	assert 0 < len(list_wavelength_measurable) < len(list_wavelength)
+	distance = np.abs(np.subtract.outer(list_lambda_dead_time, list_wavelength_measurable))
+	assert distance.min() > 0.3
+
+def test_is_plan_valid():
+	windows = np.array([[1e-3, 2e-3], [5e-3, 6e-3]])
+	assert SequencePlanner.is_plan_valid(list_tof_frames=[[0, 3e-3], [4e-3, 7e-3]], windows=windows)
+	assert not SequencePlanner.is_plan_valid(list_tof_frames=[[0, 3e-3], [5.5e-3, 7e-3]], windows=windows)
+	assert SequencePlanner.is_plan_valid(list_tof_frames=[[0, 3e-3]], windows=np.zeros((0, 2)))
+
+def test_run_reuses_the_plans(planner):
+	list_lattice_parameter = make_ramp()
+	schedule, list_plans = planner.run_lattice_parameter(list_lattice_parameter=list_lattice_parameter,
+	                                                     list_hkl=LIST_HKL)
+	assert len(schedule) == len(list_lattice_parameter)
+	assert (schedule['number_of_edges_covered'] == schedule['number_of_edges_measurable']).all()
+	# the ramp down switches back to the plans of the ramp up
+	assert 1 < len(list_plans) <= schedule['is_switch'].sum() <= len(list_lattice_parameter) / 4
+	assert schedule['plan_index'].max() == len(list_plans) - 1
+
+def test_constant_edges_need_one_plan(planner):
+	list_wavelength = get_list_wavelength_from_lattice_parameter(lattice_parameter=IRON_LATTICE_PARAMETER,
+	                                                             list_hkl=LIST_HKL)
+	schedule, list_plans = planner.run(list_list_wavelength_requested=[list_wavelength] * 20)
+	assert len(list_plans) == 1
+	assert schedule['is_switch'].tolist() == [True] + [False] * 19
+
+def test_export_schedule(planner, tmp_path):
+	schedule, list_plans = planner.run_lattice_parameter(list_lattice_parameter=make_ramp(), list_hkl=LIST_HKL)
+	list_time = np.arange(len(schedule)) * 60.
+	switches = SequencePlanner.export_schedule(schedule=schedule, list_plans=list_plans, output_folder=tmp_path,
+	                                           list_time=list_time)
+	assert len(switches) == schedule['is_switch'].sum()
+	assert switches['time'].tolist() == list(list_time[schedule['is_switch']])
+	written = pd.read_csv(tmp_path / SCHEDULE_FILE_NAME)
+	assert written['file_name'].tolist() == switches['file_name'].tolist()
+	assert all((tmp_path / _file_name).exists() for _file_name in written['file_name'])
+	assert len(list(tmp_path.glob('ShutterValues_plan_*.txt'))) == len(list_plans)
@@ -0,0 +1,86 @@
+import json
+import threading
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import DEFAULT_SHUTTER_VALUES
+from shutter_value_generator import service
+from shutter_value_generator.service import ShutterValueService, request_plan
+
+PLAN_REQUEST = {'detector_sample_distance': 25,
+                'detector_offset': 3000,
+                'epics_chopper_wavelength_range': [1, 5],
+                'list_lambda_dead_time': [1.5, 2.]}
+
+
+def start_server(server):
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	return thread
+
+def test_compute_uses_cache(monkeypatch):
+	o_service = ShutterValueService(cache_size=1)
+	result = o_service.compute(request=PLAN_REQUEST)
+	assert len(result['list_tof_frames']) == 4
+
+	def compute_plan(**kwargs):
+		raise AssertionError("the plan should come from the cache")
+	monkeypatch.setattr(service, 'compute_plan', compute_plan)
+	assert o_service.compute(request=dict(PLAN_REQUEST)) == result
+	monkeypatch.undo()
+
+	o_service.compute(request={'default_mode': True})
+	assert len(o_service.cache) == 1
+
+def test_cached_result_can_not_be_modified_by_the_caller():
+	o_service = ShutterValueService()
+	result = o_service.compute(request=PLAN_REQUEST)
+	expected = o_service.compute(request=PLAN_REQUEST)
+	result['shutter_values'] = ''
+	result['list_tof_frames'][0][0] = -1
+	assert o_service.compute(request=PLAN_REQUEST) == expected
+	assert o_service.compute(request=PLAN_REQUEST)['list_tof_frames'][0][0] != -1
+
+def test_unexpected_error_returns_json_error(monkeypatch):
+	def compute_plan(**kwargs):
+		raise RuntimeError("clock cycle table missing")
+	monkeypatch.setattr(service, 'compute_plan', compute_plan)
+	status, payload = ShutterValueService().handle(body=b'{"default_mode": true}')
+	assert status == 500
+	assert json.loads(payload.decode('utf-8')) == {'error': "RuntimeError: clock cycle table missing"}
+
+def test_compute_default_mode():
+	o_service = ShutterValueService()
+	assert o_service.compute(request={'default_mode': True})['shutter_values'] == DEFAULT_SHUTTER_VALUES
+
+def test_compute_rejects_unknown_parameters():
+	o_service = ShutterValueService()
+	with pytest.raises(ValueError):
+		o_service.compute(request={'output_folder': '/'})
+	status, _ = o_service.handle(body=b'{"detector_sample_distance": 25}')
+	assert status == 400
+
+def test_http_server():
+	o_service = ShutterValueService()
+	server = o_service.make_http_server(port=0)
+	start_server(server)
+	try:
+		port = server.server_address[1]
+		result = request_plan(request=PLAN_REQUEST, port=port)
+		assert result['shutter_values'] == o_service.compute(request=PLAN_REQUEST)['shutter_values']
+		with pytest.raises(ValueError):
+			request_plan(request={'detector_sample_distance': 25}, port=port)
+	finally:
+		server.shutdown()
+		server.server_close()
+
+def test_unix_socket_server(tmp_path):
+	socket_path = tmp_path / "shutter_value.sock"
+	o_service = ShutterValueService()
+	server = o_service.make_unix_server(socket_path=socket_path)
+	start_server(server)
+	try:
+		result = request_plan(request={'default_mode': True}, socket_path=socket_path)
+		assert result['shutter_values'] == DEFAULT_SHUTTER_VALUES
+	finally:
+		server.shutdown()
+		server.server_close()
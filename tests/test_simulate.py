@@ -0,0 +1,53 @@
+import math
+import numpy as np
+import pytest
+
+from shutter_value_generator.simulate import EdgeSimulator, erf, make_step, fit_edge_position
+
+SHUTTER_VALUES = [[1e-6, 2.5e-3, 5, 10.24],
+                  [2.9e-3, 5.8e-3, 6, 10.24],
+                  [6.2e-3, 15.9e-3, 7, 10.24]]
+LIST_WAVELENGTH_REQUESTED = [1.2, 1.7, 2.3]
+
+
+def make_simulator(**kwargs):
+	return EdgeSimulator(detector_sample_distance=25, detector_offset=3000,
+	                     list_wavelength_requested=LIST_WAVELENGTH_REQUESTED, number_of_realizations=20, **kwargs)
+
+
+def test_erf():
+	x = np.linspace(-4, 4, 81)
+	assert np.allclose(erf(x), [math.erf(_x) for _x in x], atol=2e-7)
+
+def test_make_transmission():
+	simulator = make_simulator(list_edge_height=[0.1, 0.2, 0.5], base_transmission=0.9)
+	transmission = simulator.make_transmission([1.0, 1.5, 2.0, 3.0])
+	assert transmission == pytest.approx([0.9 * 0.9 * 0.8 * 0.5, 0.9 * 0.8 * 0.5, 0.9 * 0.5, 0.9], abs=1e-6)
+
+def test_fit_edge_position_without_noise():
+	wavelength = np.linspace(1.5, 2.1, 200)
+	transmission = 0.3 + 0.4 * make_step(wavelength=wavelength, position=1.8123)[np.newaxis, :]
+	list_position = np.linspace(1.65, 1.95, 201)
+	assert fit_edge_position(wavelength=wavelength, transmission=transmission,
+	                         list_position=list_position)[0] == pytest.approx(1.8123, abs=2e-4)
+
+def test_precision_improves_with_run_time():
+	report_short = make_simulator(run_time=10).run(shutter_values=SHUTTER_VALUES,
+	                                               random_generator=np.random.default_rng(0))
+	report_long = make_simulator(run_time=1000).run(shutter_values=SHUTTER_VALUES,
+	                                                random_generator=np.random.default_rng(0))
+	assert (report_long['precision'] < report_short['precision']).all()
+	assert (np.abs(report_long['bias']) < 5 * report_long['precision'] + 1e-3).all()
+
+def test_edge_not_recorded_is_not_fitted():
+	report = make_simulator().run(shutter_values=SHUTTER_VALUES[:1], random_generator=np.random.default_rng(0))
+	assert report['number_of_fits'].tolist()[1:] == [0, 0]
+	assert np.isnan(report['precision'][2])
+
+def test_run_batch_does_not_depend_on_the_number_of_workers():
+	simulator = make_simulator()
+	list_shutter_values = [SHUTTER_VALUES, [[1e-6, 2.5e-3, 8, 10.24], [2.9e-3, 15.9e-3, 9, 10.24]]]
+	report = simulator.run_batch(list_shutter_values=list_shutter_values, seed=3)
+	report_pool = simulator.run_batch(list_shutter_values=list_shutter_values, seed=3, max_workers=2)
+	assert report['plan_index'].tolist() == [0, 0, 0, 1, 1, 1]
+	assert report.equals(report_pool)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import TOF_FRAMES
+from shutter_value_generator.storage_budget import StorageBudget
+from shutter_value_generator.core import make_plan_config, compute_plan
+from shutter_value_generator.bin_lookup import read_shutter_values_string, make_bin_lookup
+
+
+def test_calculate_number_of_bins():
+	shutter_values = [[1e-6, 1e-6 + 100 * 0.32e-6, 5, 10.24],
+	                  [1e-3, 1e-3 + 100 * 0.32e-6, 5, 5.12]]
+	list_number_of_bins = StorageBudget.calculate_number_of_bins(shutter_values=shutter_values)
+	assert list(list_number_of_bins) == [100, 200]
+
+def test_five_twelve_time_bin_doubles_the_volume():
+	list_report = []
+	for _time_bin in [10.24, 5.12]:
+		config = make_plan_config(detector_sample_distance=25, detector_offset=3000,
+		                          epics_chopper_wavelength_range=[0.5, 6], time_bin=_time_bin)
+		plan = compute_plan(config=config, list_lambda_dead_time=[1.5, 2.5])
+		shutter_values = read_shutter_values_string(plan.shutter_values_string)
+		assert list(shutter_values[:, 3]) == [_time_bin] * len(shutter_values)
+		assert list(shutter_values[:, 2]) == [5, 5, 6, 5]
+		list_report.append(StorageBudget(shutter_values=shutter_values).run(run_length=600))
+	report_ten, report_five = list_report
+	# same dividers, bins half as wide (the frames are snapped to the bins, one bin each side at most)
+	assert report_five.total_number_of_bins == pytest.approx(2 * report_ten.total_number_of_bins,
+	                                                         abs=2 * len(report_ten.list_number_of_bins))
+	assert report_five.total_volume > 1.99 * report_ten.total_volume
+
+def test_timepix_plan_has_the_bins_of_the_lookup():
+	config = make_plan_config(detector_sample_distance=25, detector_offset=3000,
+	                          epics_chopper_wavelength_range=[1, 5], time_bin=0.025, detector='timepix')
+	plan = compute_plan(config=config, list_lambda_dead_time=[1.5, 2.5])
+	shutter_values = read_shutter_values_string(plan.shutter_values_string)
+	lookup = make_bin_lookup(shutter_values=shutter_values, detector_sample_distance=25, detector_offset=3000,
+	                         detector='timepix')
+	report = StorageBudget(shutter_values=shutter_values, detector='timepix').run()
+	assert report.total_number_of_bins == len(lookup) == 217201
+	assert report.list_number_of_bins == np.bincount(lookup['frame_index']).tolist()
+	o_budget = StorageBudget(list_tof_frames=plan.list_tof_frames, detector='timepix')
+	assert o_budget.shutter_values[:, 2].tolist() == shutter_values[:, 2].tolist()
+	assert o_budget.shutter_values[:, 3].tolist() == [0.025] * 4
+
+def test_volume_and_write_rate():
+	shutter_values = [[1e-6, 1e-6 + 100 * 0.32e-6, 5, 10.24]]
+	o_budget = StorageBudget(shutter_values=shutter_values, detector_size=[10, 10], bytes_per_pixel=4)
+	report = o_budget.run(run_length=100, stack_duration=10)
+	assert report.stack_size == 100 * 10 * 10 * 4
+	assert report.number_of_stacks == 10
+	assert report.total_volume == 10 * report.stack_size
+	assert report.write_rate == report.stack_size / 10
+	assert report.is_within_budget
+
+def test_flag_plans_over_budget():
+	o_budget = StorageBudget(list_tof_frames=TOF_FRAMES)
+	report = o_budget.run(run_length=100, stack_duration=1,
+	                      detector_buffer=1000,
+	                      file_system_budget=1000,
+	                      write_rate_budget=1000)
+	assert not report.is_within_budget
+	assert len(report.list_warnings) == 3
+
+def test_flag_frames_past_the_pulse():
+	o_budget = StorageBudget(shutter_values=[[1e-6, 20e-3, 8, 10.24]], source_frequency=60)
+	report = o_budget.run()
+	assert len(report.list_warnings) == 1
+
+def test_run_length_must_be_positive():
+	o_budget = StorageBudget(list_tof_frames=TOF_FRAMES)
+	with pytest.raises(ValueError):
+		o_budget.run(run_length=0)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile, COEFF, MIN_TOF_BETWEEN_FRAMES
+from shutter_value_generator.make_shutter_value_file import MIN_LAMBDA_PEAK_VALUE_INTERVAL
+from shutter_value_generator.stress_harness import StressHarness, LIST_INVARIANTS, MAX_NUMBER_OF_DEAD_TIME
+from shutter_value_generator.stress_harness import generate_cases, get_reference_divider, check_invariants
+from shutter_value_generator.stress_harness import make_reference_list_tof_frames, get_reference_tof_frames
+
+TOF_FRAMES = get_reference_tof_frames()
+
+
+def test_generate_cases():
+	detector_sample_distance, detector_offset, lambda_dead_time = generate_cases(
+			number_of_cases=1000,
+			random_generator=np.random.default_rng(0))
+	assert lambda_dead_time.shape == (1000, MAX_NUMBER_OF_DEAD_TIME)
+	number_of_dead_time = np.count_nonzero(~np.isnan(lambda_dead_time), axis=1)
+	assert number_of_dead_time.min() >= 2
+	assert np.all(np.nan_to_num(np.diff(lambda_dead_time, axis=1), nan=1) > MIN_LAMBDA_PEAK_VALUE_INTERVAL)
+
+def test_reference_divider_matches_get_above_closest_divided():
+	list_delta_tof = np.concatenate([np.random.default_rng(0).uniform(0, 0.1, 200), [1e-4, 3.776e-3, 100]])
+	for _time_bin in [10.24, 5.12]:
+		list_divider = get_reference_divider(delta_tof=list_delta_tof, time_bin=_time_bin)
+		list_expected = [MakeShutterValueFile.get_above_closest_divided(delta_tof=_delta_tof, time_bin=_time_bin)
+		                 for _delta_tof in list_delta_tof]
+		assert list(list_divider) == list_expected
+
+def test_reference_list_tof_frames():
+	list_tof_dead_time = [[-1e-3, 4.9e-3, 10e-3, np.nan],
+	                      [3.5e-3, 6.5e-3, np.nan, np.nan]]
+	list_tof_frames = make_reference_list_tof_frames(list_tof_dead_time=list_tof_dead_time, tof_frames=TOF_FRAMES)
+	gap = MIN_TOF_BETWEEN_FRAMES
+	assert list_tof_frames.shape == (2, 7, 2)
+	# the readout gaps of the source stay between the frames
+	np.testing.assert_allclose(list_tof_frames[0, :5], [[1e-6, 2.5e-3],
+	                                                    [2.9e-3, 4.9e-3 - gap],
+	                                                    [4.9e-3 + gap, 5.8e-3],
+	                                                    [6.2e-3, 10e-3 - gap],
+	                                                    [10e-3 + gap, 15.9e-3]])
+	# the 0.2 ms left between the readout gap and the dead time at 3.5 ms is not a frame
+	np.testing.assert_allclose(list_tof_frames[1, :3], [[1e-6, 2.5e-3],
+	                                                    [3.5e-3 + gap, 5.8e-3],
+	                                                    [6.5e-3 + gap, 15.9e-3]])
+	assert np.all(np.isnan(list_tof_frames[0, 5:]))
+	assert np.all(np.isnan(list_tof_frames[1, 3:]))
+
+def test_check_invariants():
+	nan = np.nan
+	list_tof_frames = np.array([[[1e-6, 2.5e-3], [2.9e-3, 5.8e-3]],    # valid
+	                            [[1e-6, 2.5e-3], [2.6e-3, 5.8e-3]],    # gap too small
+	                            [[1e-6, 2.5e-3], [2.4e-3, 2e-3]],      # reversed
+	                            [[1e-6, 2.5e-3], [2.9e-3, 20e-3]],     # after the 60 Hz pulse
+	                            [[1e-6, 9e-3], [nan, nan]]])           # does not fit divider 5
+	list_divider = np.array([[5, 5], [5, 5], [5, 5], [5, 10], [5, -1]])
+	dict_violations = check_invariants(list_tof_frames=list_tof_frames, list_divider=list_divider)
+	assert list(dict_violations.keys()) == LIST_INVARIANTS
+	assert list(dict_violations['ordered']) == [False, False, True, False, False]
+	assert list(dict_violations['minimum_gap']) == [False, True, True, False, False]
+	assert list(dict_violations['divider_range']) == [False, False, False, False, True]
+	assert list(dict_violations['frequency_window']) == [False, False, False, True, False]
+
+def test_reference_model_satisfies_invariants():
+	detector_sample_distance, detector_offset, lambda_dead_time = generate_cases(
+			number_of_cases=5000,
+			random_generator=np.random.default_rng(1))
+	list_tof_dead_time = (lambda_dead_time * (detector_sample_distance[:, np.newaxis] * 100) / COEFF -
+	                      detector_offset[:, np.newaxis]) * 1e-6
+	list_tof_frames = make_reference_list_tof_frames(list_tof_dead_time=list_tof_dead_time, tof_frames=TOF_FRAMES)
+	list_divider = get_reference_divider(delta_tof=list_tof_frames[..., 1] - list_tof_frames[..., 0])
+	dict_violations = check_invariants(list_tof_frames=list_tof_frames, list_divider=list_divider)
+	for _invariant in LIST_INVARIANTS:
+		assert not dict_violations[_invariant].any()
+
+@pytest.mark.parametrize('source_frequency, time_bin', [(60, 10.24), (30, 5.12)])
+def test_stress_harness_run(source_frequency, time_bin):
+	o_harness = StressHarness(source_frequency=source_frequency, time_bin=time_bin)
+	report = o_harness.run(number_of_cases=300, chunk_size=100, seed=2)
+	assert report.number_of_cases == 300
+	assert report.dict_crashes == {}
+	assert all(_value == 0 for _value in report.dict_violations.values())
+	assert report.number_of_reference_mismatches == 0
+	assert report.cases_per_second > 0
+	assert len(report.list_failing_cases) <= 5
+
+def test_stress_harness_does_not_depend_on_the_number_of_processes():
+	o_harness = StressHarness()
+	report_one = o_harness.run(number_of_cases=200, chunk_size=50, seed=3, max_workers=1)
+	report_two = o_harness.run(number_of_cases=200, chunk_size=50, seed=3, max_workers=2)
+	assert report_one[:6] == report_two[:6]
@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+from pathlib import Path
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.make_shutter_value_file import DEFAULT_SHUTTER_VALUES
+from shutter_value_generator.verify_time_spectra import VerifyTimeSpectra
+from shutter_value_generator.core import make_plan_config, compute_plan
+from shutter_value_generator.bin_lookup import read_shutter_values_string, make_bin_lookup
+
+
+def make_default_shutter_values_file(folder):
+	shutter_values_file = Path(folder) / "ShutterValues.txt"
+	MakeShutterValueFile.make_ascii_file_from_string(text=DEFAULT_SHUTTER_VALUES, filename=shutter_values_file)
+	return shutter_values_file
+
+def make_spectra_file(filename, time):
+	counts = np.ones(len(time))
+	np.savetxt(filename, np.column_stack([time, counts]), delimiter='\t')
+
+def test_read_shutter_values_file(tmp_path):
+	shutter_values_file = make_default_shutter_values_file(tmp_path)
+	shutter_values = MakeShutterValueFile.read_shutter_values_file(filename=shutter_values_file)
+	assert shutter_values.shape == (3, 4)
+	assert shutter_values[1][0] == 2.9e-3
+	assert list(shutter_values[:, 2]) == [5, 6, 7]
+
+def test_get_time_bin_width():
+	width = MakeShutterValueFile.get_time_bin_width(divider=[5, 6], time_bin=10.24)
+	assert np.allclose(width, [0.32, 0.64])
+	width = MakeShutterValueFile.get_time_bin_width(divider=5, time_bin=5.12)
+	assert np.abs(width - 0.16) < 1e-9
+
+def test_make_expected_bins():
+	shutter_values = [[1e-6, 1e-6 + 10 * 0.32e-6, 5, 10.24],
+	                  [1e-3, 1e-3 + 4 * 0.64e-6, 6, 10.24]]
+	bins, frame_index = VerifyTimeSpectra.make_expected_bins(shutter_values=shutter_values)
+	assert len(bins) == 14
+	assert list(frame_index) == [0] * 10 + [1] * 4
+	assert np.abs(bins[1] - bins[0] - 0.32e-6) < 1e-12
+	assert np.abs(bins[10] - 1e-3) < 1e-12
+
+def test_verify_single_bin_frame(tmp_path):
+	o_verify = VerifyTimeSpectra(shutter_values=[[1e-6, 1e-6 + 0.32e-6, 5, 10.24]], tolerance=1e-7)
+	assert len(o_verify.expected_bins) == 1
+	spectra_file = tmp_path / "run_Spectra.txt"
+	make_spectra_file(spectra_file, [1e-6 + 5e-8])
+	report = o_verify.verify(spectra_file=spectra_file)
+	assert report.is_valid
+	assert report.number_of_bins_acquired == 1
+	assert report.first_mismatch_index == -1
+	# the extra row is reported even though the first one matches its bin
+	make_spectra_file(spectra_file, [1e-6, 2e-6])
+	report = o_verify.verify(spectra_file=spectra_file)
+	assert not report.is_valid
+	assert report.number_of_mismatches == 0
+	assert report.first_mismatch_index == 1
+	assert report.number_of_bins_acquired == 2
+
+def test_verify_plan_without_bins(tmp_path):
+	o_verify = VerifyTimeSpectra(shutter_values=[[1e-6, 1e-6, 5, 10.24]])
+	assert len(o_verify.expected_bins) == 0
+	spectra_file = tmp_path / "run_Spectra.txt"
+	make_spectra_file(spectra_file, [1e-6, 2e-6])
+	report = o_verify.verify(spectra_file=spectra_file)
+	assert report.number_of_bins_expected == 0
+	assert report.first_mismatch_index == 0
+	assert report.missing_frames == []
+	assert not report.is_valid
+
+def test_verify_timepix_spectra_file(tmp_path):
+	config = make_plan_config(detector_sample_distance=25, detector_offset=3000,
+	                          epics_chopper_wavelength_range=[1, 5], time_bin=0.025, detector='timepix')
+	plan = compute_plan(config=config, list_lambda_dead_time=[1.5, 2.5])
+	shutter_values = read_shutter_values_string(plan.shutter_values_string)
+	lookup = make_bin_lookup(shutter_values=shutter_values, detector_sample_distance=25, detector_offset=3000,
+	                         detector='timepix')
+	o_verify = VerifyTimeSpectra(shutter_values=shutter_values, detector='timepix')
+	assert len(o_verify.expected_bins) == len(lookup)
+	np.testing.assert_allclose(o_verify.expected_bins, lookup['tof_start'], rtol=0, atol=1e-12)
+	spectra_file = tmp_path / "run_Spectra.npy"
+	np.save(spectra_file, np.column_stack([lookup['tof_start'], np.ones(len(lookup))]))
+	assert o_verify.verify(spectra_file=spectra_file).is_valid
+
+def test_verify_matching_spectra_file(tmp_path):
+	o_verify = VerifyTimeSpectra(shutter_values_file=make_default_shutter_values_file(tmp_path),
+	                             chunk_size=1000)
+	spectra_file = tmp_path / "run_Spectra.txt"
+	make_spectra_file(spectra_file, o_verify.expected_bins)
+	report = o_verify.verify(spectra_file=spectra_file)
+	assert report.is_valid
+	assert report.number_of_bins_acquired == report.number_of_bins_expected
+	assert np.abs(report.drift_offset) < 1e-9
+
+def test_verify_reports_missing_frame(tmp_path):
+	o_verify = VerifyTimeSpectra(shutter_values_file=make_default_shutter_values_file(tmp_path),
+	                             tolerance=1e-7)
+	acquired = o_verify.expected_bins[o_verify.expected_frame_index != 1] + 5e-8
+	spectra_file = tmp_path / "run_Spectra.txt"
+	make_spectra_file(spectra_file, acquired)
+	report = o_verify.verify(spectra_file=spectra_file)
+	assert not report.is_valid
+	assert report.missing_frames == [1]
+	assert report.incomplete_frames == []
+	# the bins of the last frame are compared with the bins expected for the missing one
+	assert report.first_mismatch_index == np.count_nonzero(o_verify.expected_frame_index == 0)
+	assert report.number_of_mismatches > 0
+
+def test_verify_reports_a_whole_bin_shift(tmp_path):
+	o_verify = VerifyTimeSpectra(shutter_values_file=make_default_shutter_values_file(tmp_path),
+	                             tolerance=1e-7)
+	# the second bin is lost, every time after it lands on the start of the previous bin
+	acquired = np.delete(o_verify.expected_bins, 1)
+	spectra_file = tmp_path / "run_Spectra.txt"
+	make_spectra_file(spectra_file, acquired)
+	report = o_verify.verify(spectra_file=spectra_file)
+	assert not report.is_valid
+	assert report.first_mismatch_index == 1
+	assert report.number_of_mismatches == report.number_of_bins_acquired - 1
+	assert report.incomplete_frames == [0]
+
+def test_verify_duplicated_rows_do_not_hide_missing_bins(tmp_path):
+	o_verify = VerifyTimeSpectra(shutter_values_file=make_default_shutter_values_file(tmp_path),
+	                             tolerance=1e-7)
+	acquired = np.array(o_verify.expected_bins)
+	acquired[5] = acquired[4]
+	spectra_file = tmp_path / "run_Spectra.txt"
+	make_spectra_file(spectra_file, acquired)
+	report = o_verify.verify(spectra_file=spectra_file)
+	assert report.number_of_bins_acquired == report.number_of_bins_expected
+	assert report.first_mismatch_index == 5
+	assert report.number_of_mismatches == 1
+	assert not report.is_valid
+
+def test_verify_fits_the_drift_on_all_rows(tmp_path):
+	o_verify = VerifyTimeSpectra(shutter_values_file=make_default_shutter_values_file(tmp_path),
+	                             tolerance=1e-7)
+	# the drift goes well beyond the tolerance at the end of the pulse
+	acquired = o_verify.expected_bins + 5e-8 + 1e-4 * o_verify.expected_bins
+	spectra_file = tmp_path / "run_Spectra.npy"
+	np.save(spectra_file, acquired)
+	report = o_verify.verify(spectra_file=spectra_file)
+	assert report.number_of_mismatches > 0
+	assert np.abs(report.drift_offset - 5e-8) < 1e-10
+	assert np.abs(report.drift_slope - 1e-4) < 1e-8
+
+@pytest.mark.parametrize('shift, number_of_mismatches', [(0, 0), (1e-6, 10)])
+def test_verify_run_directory(tmp_path, shift, number_of_mismatches):
+	o_verify = VerifyTimeSpectra(shutter_values_file=make_default_shutter_values_file(tmp_path))
+	for _run in range(3):
+		acquired = np.array(o_verify.expected_bins)
+		acquired[:10] += shift
+		np.save(tmp_path / "run{}_Spectra.npy".format(_run), np.column_stack([acquired, acquired]))
+	list_reports = o_verify.verify_run_directory(folder=tmp_path, pattern="*_Spectra.npy")
+	assert len(list_reports) == 3
+	for _report in list_reports:
+		assert _report.number_of_mismatches == number_of_mismatches
+	dataframe = VerifyTimeSpectra.make_reports_dataframe(list_reports=list_reports)
+	assert list(dataframe['is_valid']) == [number_of_mismatches == 0] * 3
@@ -0,0 +1,113 @@
+import json
+import time
+import pytest
+from pathlib import Path
+
+from shutter_value_generator.watch import ShutterValueWatcher, SimulatedPVServer, FileProvider
+from shutter_value_generator.bin_lookup import read_shutter_values_string
+
+DETECTOR_SAMPLE_DISTANCE = 25  # m
+LIST_LAMBDA_DEAD_TIME = [1.5, 2.]
+INITIAL_VALUES = {'epics_chopper_wavelength_range': [1, 5],
+                  'detector_offset': 3000,
+                  'source_frequency': 60}
+
+
+def make_watcher(provider, output_folder):
+	return ShutterValueWatcher(provider=provider,
+	                           output_folder=output_folder,
+	                           detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                           list_lambda_dead_time=LIST_LAMBDA_DEAD_TIME,
+	                           debounce_time=0.02)
+
+def wait_for_regeneration(o_watcher, timeout=2):
+	assert o_watcher.regenerated.wait(timeout)
+	o_watcher.regenerated.clear()
+
+def read_file(filename):
+	with open(filename, 'r') as f:
+		return f.read()
+
+def test_watcher_needs_provider_and_output_folder(tmp_path):
+	with pytest.raises(AttributeError):
+		ShutterValueWatcher(output_folder=tmp_path)
+	with pytest.raises(AttributeError):
+		ShutterValueWatcher(provider=SimulatedPVServer())
+
+def test_regenerate_only_when_plan_changes(tmp_path):
+	o_server = SimulatedPVServer(values=INITIAL_VALUES)
+	o_watcher = make_watcher(o_server, tmp_path)
+	o_watcher.start()
+	wait_for_regeneration(o_watcher)
+	first_plan = read_file(tmp_path / "ShutterValues.txt")
+
+	# bursts of changes are debounced into one regeneration
+	for _offset in [3100, 3200, 3300]:
+		o_server.put('detector_offset', _offset)
+	wait_for_regeneration(o_watcher)
+	assert o_watcher.number_of_regenerations == 2
+	assert read_file(tmp_path / "ShutterValues.txt") != first_plan
+
+	# same plan, file is not rewritten
+	o_server.put('detector_offset', 3300)
+	time.sleep(0.1)
+	assert o_watcher.number_of_regenerations == 2
+	o_watcher.stop()
+
+def test_invalid_values_keep_previous_plan(tmp_path):
+	o_server = SimulatedPVServer(values=INITIAL_VALUES)
+	o_watcher = make_watcher(o_server, tmp_path)
+	o_watcher.start()
+	wait_for_regeneration(o_watcher)
+	plan = read_file(tmp_path / "ShutterValues.txt")
+	o_server.put('epics_chopper_wavelength_range', [1])
+	time.sleep(0.1)
+	assert o_watcher.last_error is not None
+	assert read_file(tmp_path / "ShutterValues.txt") == plan
+	o_watcher.stop()
+
+def test_malformed_value_is_reported(tmp_path):
+	o_server = SimulatedPVServer(values=INITIAL_VALUES)
+	o_watcher = make_watcher(o_server, tmp_path)
+	o_watcher.start()
+	wait_for_regeneration(o_watcher)
+	plan = read_file(tmp_path / "ShutterValues.txt")
+	o_server.put('detector_offset', '3100')
+	time.sleep(0.1)
+	assert isinstance(o_watcher.last_error, TypeError)
+	assert read_file(tmp_path / "ShutterValues.txt") == plan
+	# the watcher keeps going once the value is fixed
+	o_server.put('detector_offset', 3100)
+	wait_for_regeneration(o_watcher)
+	assert o_watcher.last_error is None
+	assert read_file(tmp_path / "ShutterValues.txt") != plan
+	o_watcher.stop()
+
+def test_file_provider(tmp_path):
+	pv_folder = tmp_path / "pv"
+	pv_folder.mkdir()
+	with open(pv_folder / "pv.json", 'w') as f:
+		json.dump(INITIAL_VALUES, f)
+	o_watcher = make_watcher(FileProvider(path=pv_folder), tmp_path)
+	start = time.time()
+	o_watcher.start()
+	wait_for_regeneration(o_watcher)
+	assert time.time() - start < 1
+	assert Path(tmp_path / "ShutterValues.txt").exists()
+	o_watcher.stop()
+
+@pytest.mark.parametrize('detector, time_bin', [('mcp', 5.12), ('timepix', 0.025)])
+def test_watcher_uses_the_detector_and_time_bin(tmp_path, detector, time_bin):
+	o_server = SimulatedPVServer(values=INITIAL_VALUES)
+	o_watcher = ShutterValueWatcher(provider=o_server,
+	                                output_folder=tmp_path,
+	                                detector_sample_distance=DETECTOR_SAMPLE_DISTANCE,
+	                                time_bin=time_bin,
+	                                list_lambda_dead_time=LIST_LAMBDA_DEAD_TIME,
+	                                debounce_time=0.02,
+	                                detector=detector)
+	o_watcher.start()
+	wait_for_regeneration(o_watcher)
+	o_watcher.stop()
+	shutter_values = read_shutter_values_string(read_file(tmp_path / "ShutterValues.txt"))
+	assert list(shutter_values[:, 3]) == [time_bin] * len(shutter_values)
@@ -0,0 +1,80 @@
+import os
+import tarfile
+import zipfile
+import pytest
+from pathlib import Path
+
+from shutter_value_generator.make_shutter_value_file import MakeShutterValueFile
+from shutter_value_generator.writer import write_file_atomically, write_to_destinations, write_archive
+from shutter_value_generator.writer import ArchiveFormat
+
+
+def read_file(filename):
+	with open(filename, 'r') as f:
+		return f.read()
+
+def test_write_file_atomically(tmp_path):
+	filename = tmp_path / "ShutterValues.txt"
+	write_file_atomically(text="first", filename=filename)
+	write_file_atomically(text="second", filename=filename)
+	assert read_file(filename) == "second"
+	assert [_file.name for _file in tmp_path.iterdir()] == ["ShutterValues.txt"]
+
+@pytest.mark.skipif(not hasattr(os, 'fchmod'), reason="no file permissions")
+def test_write_file_atomically_keeps_the_permissions(tmp_path):
+	filename = tmp_path / "ShutterValues.txt"
+	with open(tmp_path / "reference.txt", 'w') as f:
+		f.write("open")
+	write_file_atomically(text="first", filename=filename)
+	assert os.stat(filename).st_mode & 0o777 == os.stat(tmp_path / "reference.txt").st_mode & 0o777
+	os.chmod(filename, 0o640)
+	write_file_atomically(text="second", filename=filename)
+	assert os.stat(filename).st_mode & 0o777 == 0o640
+
+def test_failed_write_keeps_previous_file(tmp_path):
+	filename = tmp_path / "ShutterValues.txt"
+	write_file_atomically(text="first", filename=filename)
+	with pytest.raises(AttributeError):
+		write_file_atomically(text=None, filename=filename)
+	assert read_file(filename) == "first"
+	assert len(os.listdir(tmp_path)) == 1
+
+def test_write_to_destinations(tmp_path):
+	list_output_folder = [tmp_path / _name for _name in ["share", "archive", "backup"]]
+	for _folder in list_output_folder:
+		_folder.mkdir()
+	list_filename = write_to_destinations(text="plan", list_output_folder=list_output_folder,
+	                                      file_name="ShutterValues.txt")
+	assert len(list_filename) == 3
+	for _filename in list_filename:
+		assert read_file(_filename) == "plan"
+
+def test_write_to_destinations_reports_failures(tmp_path):
+	with pytest.raises(OSError):
+		write_to_destinations(text="plan", list_output_folder=[tmp_path, tmp_path / "missing"],
+		                      file_name="ShutterValues.txt")
+	assert read_file(tmp_path / "ShutterValues.txt") == "plan"
+
+@pytest.mark.parametrize('archive_format', [ArchiveFormat.tar, ArchiveFormat.zip])
+def test_write_archive(tmp_path, archive_format):
+	dict_files = {"ShutterValues_60_hz_{}_micros.txt".format(_offset): "plan {}".format(_offset)
+	              for _offset in [6000, 6500]}
+	archive_file_name = tmp_path / "sweep.{}".format(archive_format)
+	write_archive(dict_files=dict_files, archive_file_name=archive_file_name, archive_format=archive_format)
+	if archive_format == ArchiveFormat.tar:
+		with tarfile.open(archive_file_name) as archive:
+			assert archive.extractfile("ShutterValues_60_hz_6500_micros.txt").read() == b"plan 6500"
+	else:
+		with zipfile.ZipFile(archive_file_name) as archive:
+			assert archive.read("ShutterValues_60_hz_6000_micros.txt") == b"plan 6000"
+	with pytest.raises(ValueError):
+		write_archive(dict_files=dict_files, archive_file_name=archive_file_name, archive_format='rar')
+
+def test_generator_writes_extra_output_folders(tmp_path):
+	backup_folder = tmp_path / "backup"
+	backup_folder.mkdir()
+	o_make = MakeShutterValueFile(output_folder=tmp_path, default_mode=True,
+	                              list_extra_output_folder=[backup_folder])
+	shutter_values_string = o_make.run()
+	assert read_file(tmp_path / "ShutterValues.txt") == shutter_values_string
+	assert read_file(backup_folder / "ShutterValues.txt") == shutter_values_string